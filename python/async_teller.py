@@ -0,0 +1,102 @@
+import asyncio
+from typing import Dict, Iterable, List, Optional
+
+from catalog import SupermarketCatalog
+from model_objects import Product
+from money import FLOAT_MONEY
+from receipt import Receipt
+from receipt_journal import ReceiptJournal
+from shopping_cart import ShoppingCart
+from teller import Teller
+
+
+class AsyncSupermarketCatalog:
+    """
+    Catalog whose prices come from a network service, looked up without blocking the event loop.
+    """
+
+    async def unit_price(self, product: Product) -> float:
+        raise Exception("cannot be called from a unit test - it accesses the price service")
+
+    async def unit_prices(self, products: Iterable[Product],
+                          max_concurrency: Optional[int] = None) -> Dict[Product, float]:
+        """
+        Resolves the prices of many products at once.
+        Services with a bulk endpoint should override this with a single request;
+        the default looks up the distinct products concurrently.
+        :param products: Iterable of products, duplicates allowed
+        :param max_concurrency: Maximum number of lookups in flight, or None for no limit
+        :return: Dict of product -> unit price
+        """
+        distinct = list(dict.fromkeys(products))
+        if max_concurrency is None:
+            prices = await asyncio.gather(*(self.unit_price(product) for product in distinct))
+        else:
+            semaphore = asyncio.Semaphore(max_concurrency)
+
+            async def limited_unit_price(product: Product) -> float:
+                async with semaphore:
+                    return await self.unit_price(product)
+
+            prices = await asyncio.gather(*(limited_unit_price(product) for product in distinct))
+        return dict(zip(distinct, prices))
+
+
+class _AsyncPricesOnly(SupermarketCatalog):
+    """
+    Catalog of the Teller wrapped by an AsyncTeller, whose prices only come from the asynchronous catalog.
+    """
+
+    def add_product(self, product, price):
+        raise TypeError("An AsyncTeller's prices come from its asynchronous catalog")
+
+    def unit_price(self, product):
+        raise TypeError("An AsyncTeller's prices come from its asynchronous catalog")
+
+
+class AsyncTeller:
+    """
+    Teller for an AsyncSupermarketCatalog: the distinct products of a checkout are priced
+    concurrently, so one event loop can serve many lanes. It wraps a Teller, which holds the
+    offers and builds the receipts exactly as for a synchronous catalog; register offers on
+    `teller`. Everything that needs prices is a coroutine here.
+    """
+
+    def __init__(self, catalog: AsyncSupermarketCatalog, max_concurrency: Optional[int] = 16,
+                 money=FLOAT_MONEY, journal: Optional[ReceiptJournal] = None):
+        """
+        :param catalog: Asynchronous catalog to resolve unit prices from
+        :param max_concurrency: Maximum number of price lookups in flight per checkout, or None for no limit
+        :param money: Money policy, as for Teller
+        :param journal: Optional receipt journal, as for Teller; its commits run in worker threads,
+                        so concurrent checkouts share fsyncs without blocking the event loop
+        """
+        if max_concurrency is not None and max_concurrency <= 0:
+            raise ValueError("Concurrency limit must be positive")
+        self.catalog = catalog
+        self.max_concurrency = max_concurrency
+        self.journal = journal
+        self.teller = Teller(_AsyncPricesOnly(), money)
+
+    async def checks_out_articles_from(self, the_cart: ShoppingCart) -> Receipt:
+        """
+        Creates the same receipt as Teller.checks_out_articles_from, awaiting the price lookups.
+        """
+        unit_prices = self.teller.money.prices(
+            await self.catalog.unit_prices(the_cart.product_quantities, self.max_concurrency))
+        receipt = self.teller._build_receipt(the_cart, unit_prices)
+        if self.journal is not None:
+            await asyncio.to_thread(self.journal.append, receipt)
+        return receipt
+
+    async def checks_out_many(self, carts: Iterable[ShoppingCart]) -> List[Receipt]:
+        """
+        Checks out several carts, resolving every distinct product of the batch in one bulk lookup.
+        """
+        carts = list(carts)
+        products = (product for cart in carts for product in cart.product_quantities)
+        unit_prices = self.teller.money.prices(await self.catalog.unit_prices(products, self.max_concurrency))
+        receipts = [self.teller._build_receipt(cart, unit_prices) for cart in carts]
+        if self.journal is not None:
+            await asyncio.to_thread(self.journal.append_many, receipts)
+        return receipts
@@ -0,0 +1,163 @@
+"""
+Vectorized checkout of many shopping carts at once.
+
+All cart lines are laid out as NumPy columns (cart index, product index,
+quantity, unit price) so that line totals and every SpecialOfferType discount
+are computed as array operations instead of per-line Python loops. The result
+is the same list of Receipt objects the scalar Teller path produces.
+"""
+from typing import Iterable, List
+
+import numpy as np
+
+from model_objects import Discount, SpecialOfferType
+from receipt import Receipt
+from shopping_cart import ShoppingCart
+
+# Offer type codes used in the per-product offer column. Offer types without a
+# vectorized kernel here are evaluated with their compiled PricingPlan rule.
+_NO_OFFER = 0
+_COMPILED_RULE = -1
+_OFFER_CODES = {
+    SpecialOfferType.THREE_FOR_TWO: 1,
+    SpecialOfferType.TEN_PERCENT_DISCOUNT: 2,
+    SpecialOfferType.TWO_FOR_AMOUNT: 3,
+    SpecialOfferType.FIVE_FOR_AMOUNT: 4,
+}
+
+
+def checks_out_many(teller, carts: Iterable[ShoppingCart]) -> List[Receipt]:
+    """
+    Checks out every cart in one vectorized pass.
+    :param teller: Teller providing the catalog and the registered offers
+    :param carts: Shopping carts to check out
+    :return: One Receipt per cart, in the same order as the carts
+    """
+    carts = list(carts)
+
+    # Lay all cart lines out as columns, assigning each distinct product an index
+    product_index = {}
+    products = []
+    cart_column = []
+    product_column = []
+    quantities = []
+    for cart_number, cart in enumerate(carts):
+        for product, quantity in cart.lines():
+            index = product_index.get(product)
+            if index is None:
+                index = product_index[product] = len(products)
+                products.append(product)
+            cart_column.append(cart_number)
+            product_column.append(index)
+            quantities.append(quantity)
+
+    # Each distinct product is priced exactly once for the whole batch
+    resolved = teller.catalog.unit_prices(products)
+    unit_prices = [resolved[product] for product in products]
+
+    cart_ids = np.asarray(cart_column, dtype=np.int64)
+    product_ids = np.asarray(product_column, dtype=np.int64)
+    line_quantities = np.asarray(quantities, dtype=np.float64)
+    price_column = np.asarray(unit_prices, dtype=np.float64)
+    line_totals = (line_quantities * price_column[product_ids]).tolist()
+
+    plan = teller.pricing_plan
+    discounts = _compute_discounts(teller.active_offers, plan, products, price_column,
+                                   cart_ids, product_ids, line_quantities)
+
+    receipts = [Receipt() for _ in carts]
+    for row, (cart_number, index) in enumerate(zip(cart_column, product_column)):
+        receipts[cart_number].add_product(products[index], quantities[row],
+                                          unit_prices[index], line_totals[row])
+    for cart_number, discount in discounts:
+        receipts[cart_number].add_discount(discount)
+    return receipts
+
+
+def _compute_discounts(offers, plan, products, price_column, cart_ids, product_ids, line_quantities):
+    """
+    Aggregates quantities per (cart, product) and evaluates all offers as array operations.
+    :return: (cart index, Discount) pairs in the order the scalar path emits them
+    """
+    product_count = len(products)
+    offer_codes = np.zeros(product_count, dtype=np.int64)
+    arguments = np.zeros(product_count, dtype=np.float64)
+    descriptions = [None] * product_count
+    for index, product in enumerate(products):
+        product_offers = offers.get(product)
+        if not product_offers:
+            continue
+        if len(product_offers) > 1:
+            # Several offers on one product go through the plan's optimizer
+            offer_codes[index] = _COMPILED_RULE
+        else:
+            offer = product_offers[0]
+            offer_codes[index] = _OFFER_CODES.get(offer.offer_type, _COMPILED_RULE)
+            arguments[index] = offer.argument
+        descriptions[index] = plan.rule_for(product).description
+
+    # Group lines per (cart, product), ordered by first appearance like cart.product_quantities
+    keys = cart_ids * product_count + product_ids
+    group_keys, first_rows, group_of_line = np.unique(keys, return_index=True, return_inverse=True)
+    order = np.argsort(first_rows, kind="stable")
+    group_keys = group_keys[order]
+    group_quantities = np.bincount(group_of_line.ravel(), weights=line_quantities,
+                                   minlength=len(first_rows))[order]
+    group_carts = group_keys // product_count if product_count else group_keys
+    group_products = group_keys % product_count if product_count else group_keys
+
+    codes = offer_codes[group_products]
+    has_offer = codes != _NO_OFFER
+    group_carts = group_carts[has_offer]
+    group_products = group_products[has_offer]
+    codes = codes[has_offer]
+    quantity = group_quantities[has_offer]
+    unit_price = price_column[group_products]
+    argument = arguments[group_products]
+    quantity_as_int = np.trunc(quantity)
+
+    amounts = np.zeros(len(codes), dtype=np.float64)
+    applies = np.zeros(len(codes), dtype=bool)
+
+    three_for_two = (codes == _OFFER_CODES[SpecialOfferType.THREE_FOR_TWO]) & (quantity_as_int >= 3)
+    number_of_trios = quantity_as_int // 3
+    discounted_total = (number_of_trios * 2 * unit_price) + (quantity_as_int % 3 * unit_price)
+    amounts = np.where(three_for_two, quantity_as_int * unit_price - discounted_total, amounts)
+    applies |= three_for_two
+
+    for offer_type, bundle_size in ((SpecialOfferType.TWO_FOR_AMOUNT, 2),
+                                    (SpecialOfferType.FIVE_FOR_AMOUNT, 5)):
+        x_for_amount = (codes == _OFFER_CODES[offer_type]) & (quantity_as_int >= bundle_size)
+        number_of_bundles = quantity_as_int // bundle_size
+        discounted_total = number_of_bundles * argument + (quantity_as_int % bundle_size) * unit_price
+        amounts = np.where(x_for_amount, quantity_as_int * unit_price - discounted_total, amounts)
+        applies |= x_for_amount
+
+    percent = codes == _OFFER_CODES[SpecialOfferType.TEN_PERCENT_DISCOUNT]
+    amounts = np.where(percent, quantity * unit_price * argument / 100.0, amounts)
+    applies |= percent
+
+    # Compiled rules may describe each discount differently, e.g. by the offers an OfferSet used
+    rule_descriptions = {}
+    for row in np.flatnonzero(codes == _COMPILED_RULE).tolist():
+        rule = plan.rule_for(products[group_products[row]])
+        discount = rule.apply(float(quantity[row]), float(unit_price[row]))
+        if discount is not None:
+            amounts[row] = -discount.discount_amount
+            applies[row] = True
+            rule_descriptions[row] = discount.description
+
+    amounts = -amounts
+    # Security Note: discount amounts should always be negative
+    if np.any(amounts[applies] > 0):
+        raise ValueError("Discount amount should not be positive")
+
+    result = []
+    for row, cart_number, index, amount in zip(np.flatnonzero(applies).tolist(),
+                                               group_carts[applies].tolist(),
+                                               group_products[applies].tolist(),
+                                               amounts[applies].tolist()):
+        description = rule_descriptions.get(row, descriptions[index])
+        result.append((cart_number, Discount(products[index], description, amount)))
+    return result
+
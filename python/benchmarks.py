@@ -0,0 +1,202 @@
+"""
+Micro-benchmarks for checkout, offer handling, receipt totals and printing.
+
+Generates catalogs and carts from 10 to 1,000,000 lines with different offer
+mixes, times each stage separately and writes the results as JSON. With
+--compare, results are checked against a stored baseline and regressions
+beyond the tolerance make the run exit with status 1.
+
+    python benchmarks.py --output bench.json
+    python benchmarks.py --sizes 10 1000 1000000 --compare bench.json
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from model_objects import Product, ProductUnit, SpecialOfferType
+from receipt import Receipt
+from receipt_printer import ReceiptPrinter
+from shopping_cart import ShoppingCart
+from sku_catalog import SkuCatalog
+from teller import Teller
+
+DEFAULT_SIZES = [10, 100, 1_000, 10_000, 100_000]
+
+# A cached hash keeps Product lookups about 3x an identity lookup; hashing the fields on every lookup is over 10x
+MAX_PRODUCT_LOOKUP_OVERHEAD = 6.0
+
+# Share of catalog products carrying each offer type
+OFFER_MIXES: Dict[str, Dict[SpecialOfferType, float]] = {
+    "none": {},
+    "percent": {SpecialOfferType.TEN_PERCENT_DISCOUNT: 0.5},
+    "mixed": {
+        SpecialOfferType.THREE_FOR_TWO: 0.1,
+        SpecialOfferType.TEN_PERCENT_DISCOUNT: 0.1,
+        SpecialOfferType.TWO_FOR_AMOUNT: 0.1,
+        SpecialOfferType.FIVE_FOR_AMOUNT: 0.1,
+    },
+}
+
+
+def generate_teller(product_count: int, offer_mix: str, seed: int = 0) -> Tuple[Teller, List[Product]]:
+    """
+    Builds a catalog of random products and registers offers according to the mix.
+    """
+    rng = random.Random(seed)
+    catalog = SkuCatalog()
+    products = []
+    for sku in range(1, product_count + 1):
+        unit = ProductUnit.KILO if rng.random() < 0.2 else ProductUnit.EACH
+        product = Product(f"product {sku}", unit, sku)
+        catalog.add_product(product, round(rng.uniform(0.1, 20.0), 2))
+        products.append(product)
+
+    teller = Teller(catalog)
+    shuffled = rng.sample(products, len(products))
+    start = 0
+    for offer_type, share in OFFER_MIXES[offer_mix].items():
+        count = int(len(products) * share)
+        for product in shuffled[start:start + count]:
+            price = catalog.unit_price(product)
+            argument = {
+                SpecialOfferType.THREE_FOR_TWO: 0,
+                SpecialOfferType.TEN_PERCENT_DISCOUNT: 10.0,
+                SpecialOfferType.TWO_FOR_AMOUNT: round(price * 1.5, 2),
+                SpecialOfferType.FIVE_FOR_AMOUNT: round(price * 4, 2),
+            }[offer_type]
+            teller.add_special_offer(offer_type, product, argument)
+        start += count
+    return teller, products
+
+
+def generate_cart(products: Sequence[Product], line_count: int, seed: int = 0) -> ShoppingCart:
+    rng = random.Random(seed)
+    cart = ShoppingCart()
+    for _ in range(line_count):
+        product = rng.choice(products)
+        quantity = round(rng.uniform(0.1, 3.0), 3) if product.unit == ProductUnit.KILO else rng.randint(1, 6)
+        cart.add_item_quantity(product, quantity)
+    return cart
+
+
+def time_call(function: Callable[[], object], repeat: int) -> float:
+    """
+    Median wall time of the function over the given number of runs, in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run_benchmarks(sizes: Sequence[int], offer_mixes: Sequence[str], repeat: int = 5) -> List[dict]:
+    results = []
+    for offer_mix in offer_mixes:
+        for line_count in sizes:
+            # Catalog grows with the cart so large carts aren't just repeats of a few products
+            teller, products = generate_teller(max(10, min(line_count // 4, 50_000)), offer_mix)
+            cart = generate_cart(products, line_count)
+            receipt = teller.checks_out_articles_from(cart)
+            unit_prices = teller.catalog.unit_prices(cart.product_quantities)
+            plan = teller.pricing_plan
+            printer = ReceiptPrinter()
+
+            stages = {
+                "checks_out_articles_from": lambda: teller.checks_out_articles_from(cart),
+                "handle_offers": lambda: cart.handle_offers(Receipt(), plan, teller.catalog, unit_prices),
+                "total_price": receipt.total_price,
+                "print_receipt": lambda: printer.print_receipt(receipt),
+            }
+            for benchmark, function in stages.items():
+                seconds = time_call(function, repeat)
+                results.append({
+                    "benchmark": benchmark,
+                    "offer_mix": offer_mix,
+                    "lines": line_count,
+                    "seconds": seconds,
+                    "ns_per_line": seconds * 1e9 / line_count,
+                })
+    return results
+
+
+def product_lookup_overhead(count: int = 10_000, repeat: int = 5) -> float:
+    """
+    How many times slower a dict lookup keyed by Product is than one keyed by identity-hashed objects.
+    Every cart, price and offer lookup hashes products, so this must stay close to 1.
+    """
+    products = [Product(f"product {sku}", ProductUnit.EACH, sku) for sku in range(1, count + 1)]
+    plain_keys = [object() for _ in range(count)]
+    by_product = dict.fromkeys(products)
+    by_identity = dict.fromkeys(plain_keys)
+
+    def look_up(table: dict, keys: list):
+        for key in keys:
+            table[key]
+
+    return (min(time_call(lambda: look_up(by_product, products), 1) for _ in range(repeat))
+            / min(time_call(lambda: look_up(by_identity, plain_keys), 1) for _ in range(repeat)))
+
+
+def compare_results(results: List[dict], baseline: List[dict], tolerance: float = 0.15) -> List[str]:
+    """
+    Lists the benchmarks that got slower than the baseline by more than the tolerance.
+    :param tolerance: Allowed slowdown as a fraction, e.g. 0.15 for 15%
+    """
+    baseline_seconds = {(b["benchmark"], b["offer_mix"], b["lines"]): b["seconds"] for b in baseline}
+    regressions = []
+    for result in results:
+        key = (result["benchmark"], result["offer_mix"], result["lines"])
+        previous = baseline_seconds.get(key)
+        if previous is None or previous <= 0:
+            continue
+        change = result["seconds"] / previous - 1
+        if change > tolerance:
+            regressions.append(f"{key[0]} [{key[1]}, {key[2]} lines]: "
+                               f"{previous * 1e3:.3f} ms -> {result['seconds'] * 1e3:.3f} ms (+{change:.0%})")
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Supermarket receipt micro-benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Cart sizes in lines")
+    parser.add_argument("--mixes", nargs="+", default=list(OFFER_MIXES), choices=list(OFFER_MIXES),
+                        help="Offer mixes to benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline JSON file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown before flagging")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.mixes, args.repeat)
+    for result in results:
+        print(f"{result['benchmark']:<26} {result['offer_mix']:<8} {result['lines']:>9} lines "
+              f"{result['seconds'] * 1e3:>10.3f} ms {result['ns_per_line']:>9.0f} ns/line")
+
+    overhead = product_lookup_overhead()
+    print(f"product dict lookup: {overhead:.1f}x an identity-hashed lookup")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"python": platform.python_version(), "results": results}, f, indent=2)
+
+    regressions = []
+    if overhead > MAX_PRODUCT_LOOKUP_OVERHEAD:
+        regressions.append(f"product dict lookup: {overhead:.1f}x, limit {MAX_PRODUCT_LOOKUP_OVERHEAD}x")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions += compare_results(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Matching of cart quantities to bundle and mix-and-match group offers.
+
+Offers are indexed by product, so a checkout only looks at the offers that
+share a product with the cart. Applications are chosen greedily from a
+max-heap on the saving of one more application: savings only shrink as
+units get used up, so an offer whose re-evaluated saving still tops the
+heap is the best next choice.
+
+Given the per-product offers, applications are ranked by their saving net
+of the per-product discount their units no longer earn, so a bundle is not
+chosen for breaking e.g. a 3 for 2 that saves more. Net savings can grow
+back as units get used up, so this ranking is only greedy; the discount
+recorded is still the bundle's own saving.
+"""
+from heapq import heapify, heappop, heappush
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from model_objects import BundleOffer, Discount, GroupOffer, Product
+
+MultiProductOffer = Union[BundleOffer, GroupOffer]
+
+
+class BundleMatcher:
+
+    def __init__(self, offers: Sequence[MultiProductOffer], money):
+        """
+        :param offers: Bundle and group offers to match carts against
+        :param money: Money policy of the unit prices the matcher will be given
+        """
+        self._offers = list(offers)
+        self._prices = [money.from_price(offer.price) for offer in self._offers]
+        self._index: Dict[Product, List[int]] = {}
+        for number, offer in enumerate(self._offers):
+            for product in offer.products:
+                self._index.setdefault(product, []).append(number)
+
+    def __len__(self) -> int:
+        return len(self._offers)
+
+    def match(self, quantities: Dict[Product, float], unit_prices: Dict[Product, float],
+              rule_for: Optional[Callable] = None) -> Tuple[List[Discount], Dict[Product, float]]:
+        """
+        Assigns cart units to bundle and group offers to maximize the customer's saving.
+        :param quantities: Total quantity per product in the cart
+        :param unit_prices: Unit price of every product in the cart
+        :param rule_for: Per-product offer lookup (e.g. PricingPlan.rule_for); when given, an application
+                         only counts as saving what it adds over the per-product discount it breaks
+        :return: One discount per offer used, and the quantities left for per-product offers
+        """
+        index = self._index
+        available = {product: int(quantity) for product, quantity in quantities.items()
+                     if product in index and quantity >= 1}
+        candidates = sorted({number for product in available for number in index[product]})
+        if not candidates:
+            return [], quantities
+
+        # Group members sorted by price, most expensive first, to pick the units saving the most
+        by_price = {number: sorted((p for p in self._offers[number].products if p in available),
+                                   key=unit_prices.__getitem__, reverse=True)
+                    for number in candidates if isinstance(self._offers[number], GroupOffer)}
+
+        lost = None
+        if rule_for is not None:
+            def lost(units: List[Tuple[Product, int]]) -> float:
+                amount = 0
+                for product, count in units:
+                    rule = rule_for(product)
+                    if rule is not None:
+                        left = quantities[product] - int(quantities[product]) + available[product]
+                        unit_price = unit_prices[product]
+                        amount += _rule_saving(rule, left, unit_price) - _rule_saving(rule, left - count, unit_price)
+                return amount
+
+        heap = []
+        for number in candidates:
+            saving = self._saving(number, available, unit_prices, by_price, lost)
+            if saving is not None and saving > 0:
+                heap.append((-saving, number))
+        heapify(heap)
+
+        savings: Dict[int, float] = {}
+        first_products: Dict[int, Product] = {}
+        while heap:
+            best, number = heappop(heap)
+            saving = self._saving(number, available, unit_prices, by_price, lost)
+            if saving is None or saving <= 0:
+                continue
+            if saving < -best:
+                heappush(heap, (-saving, number))
+                continue
+            units = self._take(number, available, by_price)
+            savings[number] = savings.get(number, 0) + self._bundle_saving(number, units, unit_prices)
+            first_products.setdefault(number, units[0][0])
+            heappush(heap, (-saving, number))
+
+        discounts = [Discount(first_products[number], self._offers[number].description, -saving)
+                     for number, saving in sorted(savings.items())]
+        remaining = {}
+        for product, quantity in quantities.items():
+            if product in available:
+                quantity -= int(quantity) - available[product]
+                if quantity <= 0:
+                    continue
+            remaining[product] = quantity
+        return discounts, remaining
+
+    def _units(self, number: int, available: Dict[Product, int],
+               by_price: Dict[int, List[Product]]) -> Optional[List[Tuple[Product, int]]]:
+        """
+        The units one more application of the offer would use, or None if the cart can't fill it.
+        """
+        offer = self._offers[number]
+        if isinstance(offer, BundleOffer):
+            for product, units in offer.components:
+                if available.get(product, 0) < units:
+                    return None
+            return list(offer.components)
+
+        needed = offer.size
+        units = []
+        for product in by_price[number]:
+            take = min(available[product], needed)
+            if take:
+                units.append((product, take))
+                needed -= take
+                if not needed:
+                    return units
+        return None
+
+    def _saving(self, number: int, available: Dict[Product, int], unit_prices: Dict[Product, float],
+                by_price: Dict[int, List[Product]], lost: Optional[Callable]) -> Optional[float]:
+        units = self._units(number, available, by_price)
+        if units is None:
+            return None
+        saving = self._bundle_saving(number, units, unit_prices)
+        return saving if lost is None else saving - lost(units)
+
+    def _bundle_saving(self, number: int, units: List[Tuple[Product, int]],
+                       unit_prices: Dict[Product, float]) -> float:
+        return sum(count * unit_prices[product] for product, count in units) - self._prices[number]
+
+    def _take(self, number: int, available: Dict[Product, int],
+              by_price: Dict[int, List[Product]]) -> List[Tuple[Product, int]]:
+        units = self._units(number, available, by_price)
+        for product, count in units:
+            available[product] -= count
+        return units
+
+
+def _rule_saving(rule, quantity: float, unit_price: float) -> float:
+    if quantity <= 0:
+        return 0
+    discount = rule.apply(quantity, unit_price)
+    return -discount.discount_amount if discount else 0
@@ -0,0 +1,119 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from catalog import SupermarketCatalog
+from model_objects import Product
+
+
+class CachingCatalog(SupermarketCatalog):
+    """
+    Read-through cache in front of any SupermarketCatalog.
+
+    Prices are kept in a bounded LRU with a per-entry time-to-live, so repeated
+    lookups of the same product don't go back to the database.
+    """
+
+    def __init__(self, catalog: SupermarketCatalog, max_entries: int = 10_000,
+                 ttl_seconds: Optional[float] = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        :param catalog: The catalog to cache prices from
+        :param max_entries: Maximum number of cached prices before the least recently used is evicted
+        :param ttl_seconds: How long a cached price stays valid, or None to never expire
+        :param clock: Time source in seconds, injectable for tests
+        """
+        if max_entries <= 0:
+            raise ValueError("Cache size must be positive")
+        if ttl_seconds is not None and ttl_seconds <= 0:
+            raise ValueError("TTL must be positive")
+
+        self.catalog = catalog
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Product, Tuple[float, float]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def add_product(self, product: Product, price: float):
+        self.catalog.add_product(product, price)
+        self.invalidate(product)
+
+    def unit_price(self, product: Product) -> float:
+        entry = self._entries.get(product)
+        if entry is not None:
+            price, expires_at = entry
+            if expires_at >= self._clock():
+                self._entries.move_to_end(product)
+                self.hits += 1
+                return price
+            del self._entries[product]
+            self.expirations += 1
+
+        self.misses += 1
+        price = self.catalog.unit_price(product)
+        self._store(product, price)
+        return price
+
+    def unit_prices(self, products) -> Dict[Product, float]:
+        """
+        Serves cached prices and fetches all misses from the wrapped catalog in one bulk call.
+        """
+        prices = {}
+        missing = []
+        now = self._clock()
+        for product in dict.fromkeys(products):
+            entry = self._entries.get(product)
+            if entry is not None:
+                if entry[1] >= now:
+                    self._entries.move_to_end(product)
+                    self.hits += 1
+                    prices[product] = entry[0]
+                    continue
+                del self._entries[product]
+                self.expirations += 1
+            missing.append(product)
+
+        if missing:
+            self.misses += len(missing)
+            fetched = self.catalog.unit_prices(missing)
+            for product in missing:
+                price = prices[product] = fetched[product]
+                self._store(product, price)
+        return prices
+
+    def invalidate(self, product: Product):
+        """
+        Drops the cached price of a product, e.g. after a price change.
+        """
+        self._entries.pop(product, None)
+
+    def invalidate_all(self):
+        self._entries.clear()
+
+    @property
+    def products(self):
+        """
+        The wrapped catalog's products by name; they are not cached, since only prices can change.
+        """
+        return self.catalog.products
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _store(self, product: Product, price: float):
+        expires_at = float("inf") if self.ttl_seconds is None else self._clock() + self.ttl_seconds
+        self._entries[product] = (price, expires_at)
+        self._entries.move_to_end(product)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
@@ -7,3 +7,13 @@ class SupermarketCatalog:
     def unit_price(self, product):
         raise Exception("cannot be called from a unit test - it accesses the database")
 
+    def unit_prices(self, products):
+        """
+        Resolves the prices of many products at once.
+        Catalogs backed by a remote store should override this with a single bulk query;
+        the default falls back to one unit_price call per distinct product.
+        :param products: Iterable of products, duplicates allowed
+        :return: Dict of product -> unit price
+        """
+        return {product: self.unit_price(product) for product in dict.fromkeys(products)}
+
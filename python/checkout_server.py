@@ -0,0 +1,322 @@
+"""
+Local checkout service, so all lanes of a store share one warm teller.
+
+Lanes send JSON-line requests over TCP or a Unix socket:
+
+    {"id": 1, "op": "checkout", "lines": [["toothbrush", 3], ["apples", 0.5]]}
+    {"id": 2, "op": "stats"}
+
+and get one JSON line back per request, matched by id; a connection may
+pipeline requests. Checkouts arriving together are coalesced into
+micro-batches, priced and evaluated with one Teller.checks_out_many call.
+A bounded number of requests is in flight at once; beyond that the server
+stops reading from the connections, pushing back on the lanes.
+
+    python checkout_server.py --catalog catalog.bin --offers offers.csv --port 7070
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+from receipt import Receipt
+from shopping_cart import ShoppingCart, cart_from_lines
+from teller import Teller
+
+
+class CheckoutServer:
+
+    def __init__(self, teller: Teller, max_batch: int = 64, batch_window: float = 0.001,
+                 max_in_flight: int = 1024, latency_window: int = 10_000):
+        """
+        :param teller: Teller whose catalog (with products by name) and offers serve every lane
+        :param max_batch: Most checkouts priced together in one micro-batch
+        :param batch_window: Longest a checkout waits, in seconds, for others to join its batch
+        :param max_in_flight: Most requests being served at once, over all connections
+        :param latency_window: Number of recent request latencies kept for the percentiles
+        """
+        if max_batch <= 0 or max_in_flight <= 0:
+            raise ValueError("Batch size and in-flight limit must be positive")
+        self.teller = teller
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.max_in_flight = max_in_flight
+        self.requests = 0
+        self.batches = 0
+        self._latencies: Deque[float] = deque(maxlen=latency_window)
+        self._pending: Optional[asyncio.Queue] = None
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._servers: List[asyncio.AbstractServer] = []
+
+    async def start_tcp(self, host: str = "127.0.0.1", port: int = 0) -> Tuple[str, int]:
+        """
+        Starts serving on a TCP socket.
+        :param port: Port to listen on, 0 for any free port
+        :return: The (host, port) actually listened on
+        """
+        self._start_batcher()
+        server = await asyncio.start_server(self._serve_connection, host, port)
+        self._servers.append(server)
+        return server.sockets[0].getsockname()[:2]
+
+    async def start_unix(self, path: str):
+        self._start_batcher()
+        self._servers.append(await asyncio.start_unix_server(self._serve_connection, path))
+
+    async def close(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+
+    async def checkout(self, cart: ShoppingCart) -> Receipt:
+        """
+        Checks out a cart as part of the next micro-batch.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._pending.put((cart, future))
+        return await future
+
+    def stats(self) -> Dict[str, float]:
+        latencies = list(self._latencies)
+        if len(latencies) > 1:
+            p50, p99 = statistics.median(latencies), statistics.quantiles(latencies, n=100)[98]
+        else:
+            p50 = p99 = latencies[0] if latencies else 0.0
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "p50_ms": p50 * 1e3,
+            "p99_ms": p99 * 1e3,
+        }
+
+    def _start_batcher(self):
+        if self._batcher is None:
+            self._pending = asyncio.Queue()
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+            self._batcher = asyncio.create_task(self._run_batches())
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._pending.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                if not self._pending.empty():
+                    batch.append(self._pending.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._pending.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                receipts = await self._check_out([cart for cart, _ in batch])
+            except Exception:
+                # One bad cart must not fail the whole batch: check the carts out one at a time
+                receipts = None
+            self.batches += 1
+            for number, (cart, future) in enumerate(batch):
+                if future.done():
+                    continue
+                if receipts is not None:
+                    future.set_result(receipts[number])
+                    continue
+                try:
+                    future.set_result((await self._check_out([cart]))[0])
+                except Exception as error:
+                    future.set_exception(error)
+
+    async def _check_out(self, carts: List[ShoppingCart]) -> List[Receipt]:
+        if self.teller.journal is not None:
+            # Journal commits block on fsync, so keep them off the event loop
+            return await asyncio.to_thread(self.teller.checks_out_many, carts)
+        return self.teller.checks_out_many(carts)
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                start = time.perf_counter()
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("Request must be a JSON object")
+                except ValueError as error:
+                    await _send(writer, {"id": None, "error": f"{type(error).__name__}: {error}"})
+                    continue
+                # Only requests hold a slot, not idle connections; waiting for one pushes back on the lane
+                await self._in_flight.acquire()
+                task = asyncio.create_task(self._serve_request(request, start, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def _serve_request(self, request: dict, start: float, writer: asyncio.StreamWriter):
+        try:
+            response = await self._dispatch(request)
+        except Exception as error:
+            # Every request gets an answer, or its lane would wait for it forever
+            response = {"error": f"{type(error).__name__}: {error}"}
+        finally:
+            self._in_flight.release()
+        response["id"] = request.get("id")
+        self.requests += 1
+        self._latencies.append(time.perf_counter() - start)
+        await _send(writer, response)
+
+    async def _dispatch(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "checkout":
+            lines = ((name, float(quantity)) for name, quantity in request["lines"])
+            cart = cart_from_lines(self.teller.catalog.products, lines)
+            return _receipt_response(await self.checkout(cart))
+        if op == "stats":
+            return self.stats()
+        raise ValueError(f"Unknown op: {op!r}")
+
+
+async def _send(writer: asyncio.StreamWriter, response: dict):
+    writer.write(json.dumps(response).encode("utf-8") + b"\n")
+    try:
+        await writer.drain()
+    except ConnectionError:
+        pass  # The lane hung up; there is no one left to answer
+
+
+def _receipt_response(receipt: Receipt) -> dict:
+    return {
+        "total": receipt.total_price(),
+        "items": [[item.product.name, item.quantity, item.price, item.total_price] for item in receipt.items],
+        "discounts": [[discount.product.name, discount.description, discount.discount_amount]
+                      for discount in receipt.discounts],
+    }
+
+
+class CheckoutClient:
+    """
+    Lane-side client; requests may be sent concurrently over one connection.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._next_id = 0
+        self._waiting: Dict[int, asyncio.Future] = {}
+        self._receiver = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect_tcp(cls, host: str, port: int) -> "CheckoutClient":
+        return cls(*await asyncio.open_connection(host, port))
+
+    @classmethod
+    async def connect_unix(cls, path: str) -> "CheckoutClient":
+        return cls(*await asyncio.open_unix_connection(path))
+
+    async def checkout(self, lines: Sequence[Tuple[str, float]]) -> dict:
+        """
+        :param lines: (product name, quantity) per cart line
+        :return: The receipt as total, items and discounts
+        """
+        return await self.request({"op": "checkout", "lines": [list(line) for line in lines]})
+
+    async def stats(self) -> dict:
+        return await self.request({"op": "stats"})
+
+    async def request(self, request: dict) -> dict:
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        self._writer.write(json.dumps(dict(request, id=request_id)).encode("utf-8") + b"\n")
+        await self._writer.drain()
+        response = await future
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._receiver.cancel()
+        try:
+            await self._receiver
+        except asyncio.CancelledError:
+            pass
+
+    async def _receive(self):
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                for future in self._waiting.values():
+                    future.set_exception(ConnectionError("Checkout server closed the connection"))
+                self._waiting.clear()
+                return
+            response = json.loads(line)
+            future = self._waiting.pop(response["id"], None)
+            if future is not None:
+                future.set_result(response)
+
+
+async def serve(teller: Teller, host: str, port: int, unix_path: Optional[str] = None):
+    server = CheckoutServer(teller)
+    if unix_path:
+        await server.start_unix(unix_path)
+        print(f"Serving checkouts on {unix_path}", file=sys.stderr)
+    else:
+        host, port = await server.start_tcp(host, port)
+        print(f"Serving checkouts on {host}:{port}", file=sys.stderr)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    # Imported here: only the command line needs the file formats
+    from mapped_catalog import MappedCatalog
+    from transaction_log import load_offers
+
+    parser = argparse.ArgumentParser(description="Local checkout service for the lanes of a store")
+    parser.add_argument("--catalog", required=True, help="Binary catalog built with compile_catalog")
+    parser.add_argument("--offers", help="Offers CSV (name, offer, argument)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7070)
+    parser.add_argument("--unix", help="Serve on this Unix socket path instead of TCP")
+    args = parser.parse_args(argv)
+
+    with MappedCatalog(args.catalog) as catalog:
+        teller = Teller(catalog)
+        if args.offers:
+            with open(args.offers, newline="") as offers:
+                load_offers(offers, teller)
+        try:
+            asyncio.run(serve(teller, args.host, args.port, args.unix))
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
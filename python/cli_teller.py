@@ -6,28 +6,41 @@ This CLI lets you:
 - Add items to a shopping cart
 - Apply discount offers
 - Checkout and print the receipt
+
+With --batch it runs a command file (or stdin with "-") without any prompts,
+one CSV command per line, writing receipts through one buffered writer:
+
+    product,<name>,<each|kilo>,<price>
+    scan,<name>[,<quantity>]
+    offer,<name>,<offer type, e.g. THREE_FOR_TWO>,<argument>
+    checkout
+
+Blank lines and lines starting with # are skipped.
+
+    python cli_teller.py --batch session.csv --output receipts.txt --timings timings.csv
 """
+import argparse
+import csv
+import statistics
+import sys
+import time
+from array import array
+from typing import Iterable, Optional, Sequence, TextIO
+
 from model_objects import Product, ProductUnit, SpecialOfferType
 from teller import Teller
 from receipt_printer import ReceiptPrinter
 from shopping_cart import ShoppingCart
-from catalog import SupermarketCatalog
+from sku_catalog import SkuCatalog
+
+OUTPUT_BUFFER_SIZE = 1024 * 1024
 
 
-class CLIFakeCatalog(SupermarketCatalog):
+class CLIFakeCatalog(SkuCatalog):
     """
     A CLI version of the FakeCatalog for adding products via user input.
+    Prices are indexed by SKU; products are looked up by name through `products`.
     """
-    def __init__(self):
-        self.products = {}
-        self.prices = {}
-
-    def add_product(self, product: Product, price: float):
-        self.products[product.name] = product
-        self.prices[product.name] = price
-
-    def unit_price(self, product: Product) -> float:
-        return self.prices[product.name]
 
 
 def get_product_unit():
@@ -53,7 +66,102 @@ def get_offer_type():
             print("Invalid selection. Try again.")
 
 
-def main():
+def add_catalog_product(catalog: CLIFakeCatalog, name: str, unit: ProductUnit, price: float) -> Product:
+    existing = catalog.products.get(name)
+    sku = existing.sku if existing else catalog.next_sku()
+    product = Product(name, unit, sku)
+    catalog.add_product(product, price)
+    return product
+
+
+def run_batch(commands: Iterable[str], output: TextIO, timings: Optional[TextIO] = None) -> array:
+    """
+    Runs a command stream without prompts, writing every receipt to output.
+    :param commands: Command lines, e.g. an open file
+    :param output: Writer receiving the receipts, one blank line after each
+    :param timings: Optional writer receiving "checkout,lines,seconds" CSV rows
+    :return: Duration of each checkout in seconds
+    """
+    catalog = CLIFakeCatalog()
+    teller = Teller(catalog)
+    printer = ReceiptPrinter()
+    products = catalog.products
+    cart = ShoppingCart()
+    durations = array("d")
+    if timings is not None:
+        timings.write("checkout,lines,seconds\n")
+
+    for line_number, row in enumerate(csv.reader(commands), 1):
+        # Names are matched exactly, so whitespace around any field is dropped
+        row = [field.strip() for field in row]
+        if not any(row) or row[0].startswith("#"):
+            continue
+        command = row[0]
+        try:
+            if command == "scan":
+                quantity = float(row[2]) if len(row) > 2 else 1.0
+                cart.add_item_quantity(products[row[1]], quantity)
+            elif command == "checkout":
+                start = time.perf_counter()
+                receipt = teller.checks_out_articles_from(cart)
+                seconds = time.perf_counter() - start
+                durations.append(seconds)
+                printer.write_receipt(receipt, output)
+                output.write("\n")
+                if timings is not None:
+                    timings.write(f"{len(durations)},{len(receipt.items)},{seconds:.9f}\n")
+                cart = ShoppingCart()
+            elif command == "product":
+                add_catalog_product(catalog, row[1], ProductUnit[row[2].upper()], float(row[3]))
+            elif command == "offer":
+                teller.add_special_offer(SpecialOfferType[row[2].upper()], products[row[1]],
+                                         float(row[3]))
+            else:
+                raise ValueError(f"Unknown command: {command}")
+        except (KeyError, IndexError, ValueError) as error:
+            raise ValueError(f"Line {line_number}: {row!r}: {error!r}") from error
+    return durations
+
+
+def summarize(durations: Sequence[float]) -> str:
+    if not durations:
+        return "0 checkouts"
+    total = sum(durations)
+    p99 = statistics.quantiles(durations, n=100)[98] if len(durations) > 1 else durations[0]
+    return (f"{len(durations)} checkouts in {total:.3f} s: mean {total / len(durations) * 1e6:.1f} us, "
+            f"p50 {statistics.median(durations) * 1e6:.1f} us, p99 {p99 * 1e6:.1f} us")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Supermarket CLI teller")
+    parser.add_argument("--batch", metavar="FILE", help="Run the commands in FILE (- for stdin) without prompts")
+    parser.add_argument("--output", help="Write batch receipts to this file instead of stdout")
+    parser.add_argument("--timings", help="Write per-checkout timings as CSV to this file")
+    args = parser.parse_args(argv)
+    if args.batch is None:
+        interactive()
+        return 0
+
+    commands = sys.stdin if args.batch == "-" else open(args.batch, newline="")
+    if args.output:
+        output = open(args.output, "w", buffering=OUTPUT_BUFFER_SIZE)
+    else:
+        output = open(sys.stdout.fileno(), "w", buffering=OUTPUT_BUFFER_SIZE, closefd=False)
+    timings = open(args.timings, "w", buffering=OUTPUT_BUFFER_SIZE) if args.timings else None
+    try:
+        durations = run_batch(commands, output, timings)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 1
+    finally:
+        for stream in (commands, output, timings):
+            if stream is not None and stream is not sys.stdin:
+                stream.close()
+    print(summarize(durations), file=sys.stderr)
+    return 0
+
+
+def interactive():
     catalog = CLIFakeCatalog()
     teller = Teller(catalog)
     cart = ShoppingCart()
@@ -74,8 +182,7 @@ def main():
             name = input("Product name: ").strip()
             unit = get_product_unit()
             price = float(input("Price: "))
-            product = Product(name, unit)
-            catalog.add_product(product, price)
+            add_catalog_product(catalog, name, unit, price)
             print(f"Added '{name}' to catalog.")
 
         elif choice == "2":
@@ -115,4 +222,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
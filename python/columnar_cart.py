@@ -0,0 +1,66 @@
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from model_objects import Product, ProductQuantity
+from shopping_cart import ShoppingCart
+
+
+class ColumnarCart:
+    """
+    Shopping cart for very large orders, storing lines as columns instead of objects.
+
+    Each line costs one product id and one quantity in compact array buffers, and
+    per-product totals are accumulated in a parallel column, so adding a line is
+    O(1) and product_quantities is only materialized when asked for.
+    """
+
+    def __init__(self):
+        self._products: List[Product] = []  # product id -> product
+        self._product_ids: Dict[Product, int] = {}
+        self._line_product_ids = array("q")
+        self._line_quantities = array("d")
+        self._product_totals = array("d")  # product id -> total quantity
+        self._product_quantities: Optional[Dict[Product, float]] = None
+
+    @property
+    def items(self) -> List[ProductQuantity]:
+        """
+        The lines as ProductQuantity objects, built on each access; prefer lines() for large carts.
+        """
+        return [ProductQuantity(product, quantity) for product, quantity in self.lines()]
+
+    @property
+    def product_quantities(self) -> Dict[Product, float]:
+        if self._product_quantities is None:
+            self._product_quantities = dict(zip(self._products, self._product_totals))
+        return self._product_quantities
+
+    def __len__(self) -> int:
+        return len(self._line_quantities)
+
+    def add_item(self, product: Product):
+        self.add_item_quantity(product, 1.0)
+
+    def add_item_quantity(self, product: Product, quantity: float):
+        if quantity <= 0:
+            raise ValueError("Quantity must be positive")
+
+        product_id = self._product_ids.get(product)
+        if product_id is None:
+            product_id = self._product_ids[product] = len(self._products)
+            self._products.append(product)
+            self._product_totals.append(quantity)
+        else:
+            self._product_totals[product_id] += quantity
+        self._line_product_ids.append(product_id)
+        self._line_quantities.append(quantity)
+        self._product_quantities = None
+
+    def lines(self) -> Iterator[Tuple[Product, float]]:
+        """
+        Iterates (product, quantity) per line without building per-line objects.
+        """
+        return zip(map(self._products.__getitem__, self._line_product_ids), self._line_quantities)
+
+    # Offer handling only needs product_quantities, so it is shared with ShoppingCart
+    handle_offers = ShoppingCart.handle_offers
@@ -0,0 +1,232 @@
+"""
+Opt-in hot-path instrumentation for checkout.
+
+A Metrics registry collects counters and histograms and renders them in the
+Prometheus text exposition format. Hooks registered with add_hook receive
+every observation, so a tracer can turn them into spans. Components only
+record when they were given a Metrics instance; without one the checkout path
+is unchanged.
+"""
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from catalog import SupermarketCatalog
+from pricing_plan import CompiledOffer, OfferSet
+
+# Latency buckets in seconds, from 10 microseconds to 10 seconds
+DEFAULT_LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001,
+                           0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Size buckets, e.g. lines per receipt
+DEFAULT_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000, 10000, 100000)
+
+METRIC_HELP = {
+    "checkout_seconds": "Duration of checks_out_articles_from.",
+    "checkout_phase_seconds": "Duration of each checkout phase.",
+    "checkout_offer_evaluation_seconds": "Duration of one offer evaluation, by offer type.",
+    "catalog_calls_total": "Catalog calls by method.",
+    "catalog_products_resolved_total": "Products priced by the catalog.",
+    "catalog_call_seconds": "Catalog call latency by method.",
+    "receipt_lines": "Item lines per receipt.",
+    "receipt_discounts": "Discount lines per receipt.",
+    "receipt_render_seconds": "Duration of print_receipt.",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+# Called with (metric name, observed value, labels) for every observation
+Hook = Callable[[str, float, Dict[str, str]], None]
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Histogram:
+    __slots__ = ("buckets", "bucket_counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.bucket_counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    Registry of counters and histograms, with observation hooks.
+    """
+
+    def __init__(self, latency_buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+                 size_buckets: Sequence[float] = DEFAULT_SIZE_BUCKETS):
+        self.latency_buckets = tuple(latency_buckets)
+        self.size_buckets = tuple(size_buckets)
+        self._counters: Dict[str, Dict[Labels, Counter]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._help: Dict[str, str] = dict(METRIC_HELP)
+        self._hooks: List[Hook] = []
+
+    def add_hook(self, hook: Hook):
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Hook):
+        self._hooks.remove(hook)
+
+    def describe(self, name: str, help_text: str):
+        self._help[name] = help_text
+
+    def inc(self, name: str, amount: float = 1.0, **labels: str):
+        family = self._counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        counter = family.get(key)
+        if counter is None:
+            counter = family[key] = Counter()
+        counter.inc(amount)
+
+    def observe(self, name: str, value: float, buckets: Optional[Sequence[float]] = None, **labels: str):
+        """
+        Records a value in a histogram and passes it on to the hooks.
+        :param buckets: Bucket upper bounds, defaults to the latency buckets
+        """
+        family = self._histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        histogram = family.get(key)
+        if histogram is None:
+            histogram = family[key] = Histogram(self.latency_buckets if buckets is None else buckets)
+        histogram.observe(value)
+        for hook in self._hooks:
+            hook(name, value, labels)
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        """
+        Observes the wall time of the block, in seconds.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def counter_value(self, name: str, **labels: str) -> float:
+        counter = self._counters.get(name, {}).get(tuple(sorted(labels.items())))
+        return counter.value if counter else 0.0
+
+    def histogram(self, name: str, **labels: str) -> Optional[Histogram]:
+        return self._histograms.get(name, {}).get(tuple(sorted(labels.items())))
+
+    def render_prometheus(self) -> str:
+        """
+        Renders all metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for name, family in sorted(self._counters.items()):
+            self._render_header(lines, name, "counter")
+            for labels, counter in family.items():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(counter.value)}")
+        for name, family in sorted(self._histograms.items()):
+            self._render_header(lines, name, "histogram")
+            for labels, histogram in family.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + (float("inf"),), histogram.bucket_counts):
+                    cumulative += count
+                    le = (("le", _format_value(bound)),)
+                    lines.append(f"{name}_bucket{_format_labels(labels + le)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def _render_header(self, lines: List[str], name: str, metric_type: str):
+        if name in self._help:
+            lines.append(f"# HELP {name} {self._help[name]}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+
+class InstrumentedCatalog(SupermarketCatalog):
+    """
+    Catalog wrapper counting calls, products resolved and call latency.
+    Other attributes (e.g. products) are passed through to the wrapped catalog.
+    """
+
+    def __init__(self, catalog: SupermarketCatalog, metrics: Metrics):
+        self.catalog = catalog
+        self.metrics = metrics
+
+    def add_product(self, product, price):
+        self.catalog.add_product(product, price)
+
+    def unit_price(self, product):
+        start = time.perf_counter()
+        price = self.catalog.unit_price(product)
+        self._record("unit_price", 1, time.perf_counter() - start)
+        return price
+
+    def unit_prices(self, products):
+        start = time.perf_counter()
+        prices = self.catalog.unit_prices(products)
+        self._record("unit_prices", len(prices), time.perf_counter() - start)
+        return prices
+
+    def __getattr__(self, name):
+        return getattr(self.catalog, name)
+
+    def _record(self, method: str, products: int, seconds: float):
+        self.metrics.inc("catalog_calls_total", method=method)
+        self.metrics.inc("catalog_products_resolved_total", products)
+        self.metrics.observe("catalog_call_seconds", seconds, method=method)
+
+
+class TimedOffer(CompiledOffer):
+    """
+    Compiled offer recording how long each evaluation takes, labelled with its offer type;
+    several offers on one product are labelled with their types joined, e.g. "THREE_FOR_TWO+TEN_PERCENT_DISCOUNT".
+    """
+    __slots__ = ("_rule", "_metrics", "_offer_type_name")
+
+    def __init__(self, rule: CompiledOffer, metrics: Metrics):
+        super().__init__(rule.product, rule.description, rule._discount_amount, rule.offer_type,
+                         rule.bundle_size)
+        self._rule = rule
+        self._metrics = metrics
+        self._offer_type_name = _offer_type_label(rule)
+
+    def apply(self, quantity, unit_price):
+        start = time.perf_counter()
+        discount = self._rule.apply(quantity, unit_price)
+        self._metrics.observe("checkout_offer_evaluation_seconds", time.perf_counter() - start,
+                              offer_type=self._offer_type_name)
+        return discount
+
+
+def _offer_type_label(rule: CompiledOffer) -> str:
+    if isinstance(rule, OfferSet):
+        return "+".join(sorted({_offer_type_label(offer) for offer in rule.competing + rule.stackable}))
+    return rule.offer_type.name if rule.offer_type is not None else "unknown"
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{key}="{_escape(value)}"' for key, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
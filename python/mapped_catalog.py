@@ -0,0 +1,232 @@
+"""
+Memory-mapped binary catalog.
+
+compile_catalog turns a catalog CSV (name, unit, price and optionally sku)
+into a fixed-layout binary file; write_catalog does the same for products
+already loaded, e.g. from a SkuCatalog. MappedCatalog mmaps that file and
+answers lookups by binary search over a name index and a SKU index, so a
+lane starts instantly and all lanes on a machine share one copy of the
+catalog through the page cache.
+
+File layout (little endian):
+    header   magic "SRCATLG\\0", version u16, 2 pad bytes, record count u32, SKU count u32,
+             SKU index offset u64, names offset u64
+    records  count x (name offset u32, name length u16, unit u8, has sku u8, sku i64, price f64),
+             sorted by name
+    skus     SKU count x (sku i64, record index u32, 4 pad bytes), sorted by SKU
+    names    UTF-8 product names, concatenated
+"""
+import csv
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+from catalog import SupermarketCatalog
+from model_objects import Product, ProductTable, ProductUnit
+
+MAGIC = b"SRCATLG\0"
+VERSION = 2
+
+_HEADER = struct.Struct("<8sHxxIIQQ")
+_RECORD = struct.Struct("<IHBBqd")
+_SKU_ENTRY = struct.Struct("<qI4x")
+
+# (name offset, name length, unit, has sku, sku, price)
+_Record = Tuple[int, int, int, int, int, float]
+
+
+def compile_catalog(lines: Iterable[str], path: Union[str, os.PathLike]) -> int:
+    """
+    Compiles a catalog CSV into the binary catalog format.
+    :param lines: An open file or any iterable of CSV lines, header included; the sku column is optional
+    :param path: Where to write the binary catalog
+    :return: Number of products written
+    """
+    def entries():
+        for row in csv.DictReader(lines):
+            sku = row.get("sku")
+            product = Product(row["name"], ProductUnit[row["unit"]], int(sku) if sku else None)
+            yield product, float(row["price"])
+
+    return write_catalog(entries(), path)
+
+
+def write_catalog(entries: Iterable[Tuple[Product, float]], path: Union[str, os.PathLike]) -> int:
+    """
+    Writes products and their prices in the binary catalog format.
+    :param entries: (product, unit price) pairs; names and SKUs must be unique
+    :param path: Where to write the binary catalog
+    :return: Number of products written
+    """
+    by_name = {}
+    skus = set()
+    for product, price in entries:
+        name = product.name.encode("utf-8")
+        if name in by_name:
+            raise ValueError(f"Duplicate product in catalog: {product.name}")
+        if product.sku is not None:
+            if product.sku in skus:
+                raise ValueError(f"Duplicate SKU in catalog: {product.sku}")
+            skus.add(product.sku)
+        by_name[name] = (product, price)
+
+    names = sorted(by_name)
+    sku_index = sorted((by_name[name][0].sku, index) for index, name in enumerate(names)
+                       if by_name[name][0].sku is not None)
+    sku_offset = _HEADER.size + _RECORD.size * len(names)
+    names_offset = sku_offset + _SKU_ENTRY.size * len(sku_index)
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(names), len(sku_index), sku_offset, names_offset))
+        name_offset = 0
+        for name in names:
+            product, price = by_name[name]
+            has_sku = product.sku is not None
+            f.write(_RECORD.pack(name_offset, len(name), product.unit.value, has_sku,
+                                 product.sku if has_sku else 0, price))
+            name_offset += len(name)
+        for sku, index in sku_index:
+            f.write(_SKU_ENTRY.pack(sku, index))
+        for name in names:
+            f.write(name)
+    return len(names)
+
+
+class MappedCatalog(SupermarketCatalog):
+    """
+    Read-only catalog served straight from a memory-mapped binary catalog file.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        # Each product is built once, on its first lookup, and shared by every later one
+        self._interned = ProductTable()
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _HEADER.size:
+            self.close()
+            raise ValueError(f"Not a binary catalog: {path}")
+        (magic, version, self._count, self._sku_count, self._sku_offset,
+         self._names_offset) = _HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Not a binary catalog (version {VERSION}): {path}")
+        self.products = _MappedProducts(self)
+
+    def add_product(self, product: Product, price: float):
+        raise ValueError("Mapped catalog is read-only; recompile it to change prices")
+
+    def unit_price(self, product: Product) -> float:
+        """
+        Looks the product up by SKU when it has one, else by name; unit and SKU must match the catalog's.
+        """
+        if product.sku is None:
+            record = self._find(product.name)
+        else:
+            record = self._find_sku(product.sku)
+            if record is not None and self._name(record) != product.name.encode("utf-8"):
+                record = None
+        if record is None or record[2] != product.unit.value or self._sku(record) != product.sku:
+            raise KeyError(product.name)
+        return record[5]
+
+    def product_with_name(self, name: str) -> Optional[Product]:
+        product = self._interned.get(name)
+        if product is not None:
+            return product
+        record = self._find(name)
+        if record is None:
+            return None
+        return self._interned.intern(name, ProductUnit(record[2]), self._sku(record))
+
+    def product_with_sku(self, sku: int) -> Optional[Product]:
+        product = self._interned.get_by_sku(sku)
+        if product is not None:
+            return product
+        record = self._find_sku(sku)
+        if record is None:
+            return None
+        return self._interned.intern(self._name(record).decode("utf-8"), ProductUnit(record[2]), sku)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self) -> "MappedCatalog":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _record(self, index: int) -> _Record:
+        return _RECORD.unpack_from(self._map, _HEADER.size + index * _RECORD.size)
+
+    def _name(self, record: _Record) -> bytes:
+        start = self._names_offset + record[0]
+        return self._map[start:start + record[1]]
+
+    @staticmethod
+    def _sku(record: _Record) -> Optional[int]:
+        return record[4] if record[3] else None
+
+    def _find_sku(self, sku: int) -> Optional[_Record]:
+        """
+        Binary search over the SKU index.
+        """
+        low, high = 0, self._sku_count
+        while low < high:
+            middle = (low + high) // 2
+            candidate, index = _SKU_ENTRY.unpack_from(self._map, self._sku_offset + middle * _SKU_ENTRY.size)
+            if candidate < sku:
+                low = middle + 1
+            elif candidate > sku:
+                high = middle
+            else:
+                return self._record(index)
+        return None
+
+    def _find(self, name: str) -> Optional[_Record]:
+        """
+        Binary search over the sorted records.
+        """
+        key = name.encode("utf-8")
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            record = self._record(middle)
+            candidate = self._name(record)
+            if candidate < key:
+                low = middle + 1
+            elif candidate > key:
+                high = middle
+            else:
+                return record
+        return None
+
+
+class _MappedProducts(Mapping):
+    """
+    Name -> Product view of a mapped catalog, for callers resolving products by name.
+    """
+
+    def __init__(self, catalog: MappedCatalog):
+        self._catalog = catalog
+
+    def __getitem__(self, name: str) -> Product:
+        product = self._catalog.product_with_name(name)
+        if product is None:
+            raise KeyError(name)
+        return product
+
+    def __contains__(self, name) -> bool:
+        return isinstance(name, str) and self._catalog._find(name) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        catalog = self._catalog
+        for index in range(len(catalog)):
+            yield catalog._name(catalog._record(index)).decode("utf-8")
+
+    def __len__(self) -> int:
+        return len(self._catalog)
@@ -1,16 +1,6 @@
+from dataclasses import dataclass, field
 from enum import Enum
-
-
-class Product:
-    def __init__(self, name, unit):
-        self.name = name
-        self.unit = unit
-
-
-class ProductQuantity:
-    def __init__(self, product, quantity):
-        self.product = product
-        self.quantity = quantity
+from typing import Dict, Optional, Tuple
 
 
 class ProductUnit(Enum):
@@ -24,15 +14,149 @@ class SpecialOfferType(Enum):
     TWO_FOR_AMOUNT = 3
     FIVE_FOR_AMOUNT = 4
 
+
+@dataclass(frozen=True, slots=True)
+class Product:
+    """
+    Immutable product; equal name, unit and SKU mean the same product, so it is a stable dict key.
+    The hash is computed once, as every cart, price and offer lookup hashes the product.
+    :param sku: Integer SKU or EAN barcode identifying the product in the store, if known
+    """
+    name: str
+    unit: ProductUnit
+    sku: Optional[int] = None
+    _hash: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "_hash", hash((self.name, self.unit, self.sku)))
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __reduce__(self):
+        # String hashes differ between processes, so never pickle the cached one
+        return Product, (self.name, self.unit, self.sku)
+
+
+@dataclass(frozen=True, slots=True)
+class ProductQuantity:
+    product: Product
+    quantity: float
+
+
+@dataclass(frozen=True, slots=True)
 class Offer:
-    def __init__(self, offer_type, product, argument):
-        self.offer_type = offer_type
-        self.product = product
-        self.argument = argument
+    """
+    :param stackable: Stackable offers apply on top of the others; non-stackable offers on
+                      the same product compete for its units
+    """
+    offer_type: SpecialOfferType
+    product: Product
+    argument: float
+    stackable: bool = False
+
+
+@dataclass(frozen=True, slots=True)
+class ScheduledOffer:
+    """
+    An offer valid from start (inclusive) to end (exclusive), in seconds since the epoch.
+    """
+    offer: Offer
+    start: float
+    end: float
+
 
+@dataclass(frozen=True, slots=True)
+class BundleOffer:
+    """
+    A fixed set of products sold together for one price, e.g. toothbrush + toothpaste for 3.00.
+    :param components: (product, units per bundle) pairs
+    """
+    components: Tuple[Tuple[Product, int], ...]
+    price: float
 
+    @property
+    def products(self) -> Tuple[Product, ...]:
+        return tuple(product for product, _ in self.components)
+
+    @property
+    def description(self) -> str:
+        names = " + ".join(product.name if units == 1 else f"{units} {product.name}"
+                           for product, units in self.components)
+        return f"{names} for {self.price}"
+
+
+@dataclass(frozen=True, slots=True)
+class GroupOffer:
+    """
+    Mix-and-match offer: any `size` units from a group of products for one price.
+    """
+    name: str
+    products: Tuple[Product, ...]
+    size: int
+    price: float
+
+    @property
+    def description(self) -> str:
+        return f"any {self.size} {self.name} for {self.price}"
+
+
+@dataclass(frozen=True, slots=True)
 class Discount:
-    def __init__(self, product, description, discount_amount):
-        self.product = product
-        self.description = description
-        self.discount_amount = discount_amount
+    product: Product
+    description: str
+    discount_amount: float
+
+
+class ProductTable:
+    """
+    Interns products by SKU, or by name for products without one,
+    so every load of the same product yields one shared object.
+    """
+
+    def __init__(self):
+        self._by_name: Dict[str, Product] = {}
+        self._by_sku: Dict[int, Product] = {}
+        # First product interned under each name with a SKU, for get() when none is without one
+        self._sku_by_name: Dict[str, Product] = {}
+
+    def intern(self, name: str, unit: ProductUnit, sku: Optional[int] = None) -> Product:
+        """
+        Returns the product registered under this SKU, or under this name when it has none,
+        creating it on first use. A product without a SKU never stands in for one with a SKU, nor the reverse.
+        """
+        index, key = (self._by_name, name) if sku is None else (self._by_sku, sku)
+        product = index.get(key)
+        if product is None:
+            product = index[key] = Product(name, unit, sku)
+            if sku is not None:
+                self._sku_by_name.setdefault(name, product)
+        elif product.name != name or product.unit != unit:
+            raise ValueError(f"Product '{key}' is already registered as {product.name} ({product.unit.name})")
+        return product
+
+    def get(self, name: str) -> Optional[Product]:
+        """
+        The product without a SKU of this name, else the first one interned with a SKU.
+        """
+        product = self._by_name.get(name)
+        return product if product is not None else self._sku_by_name.get(name)
+
+    def get_by_sku(self, sku: int) -> Optional[Product]:
+        return self._by_sku.get(sku)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name or name in self._sku_by_name
+
+    def __len__(self) -> int:
+        return len(self._by_name) + len(self._by_sku)
+
+
+PRODUCTS = ProductTable()
+
+
+def intern_product(name: str, unit: ProductUnit, sku: Optional[int] = None) -> Product:
+    """
+    Interns a product in the process-wide product table.
+    """
+    return PRODUCTS.intern(name, unit, sku)
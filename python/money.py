@@ -0,0 +1,108 @@
+"""
+Money representations for the pricing pipeline.
+
+Teller, PricingPlan, ShoppingCart and ReceiptPrinter never do money arithmetic
+that involves rounding themselves: they go through a money policy. FloatMoney
+keeps the historical float behaviour. MinorUnitMoney represents every price,
+line total and discount as an integer number of minor units (cents), so totals
+are exact while the hot loop stays on integer arithmetic.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Union
+
+from model_objects import Product
+
+Amount = Union[int, float]
+
+# Kilo-weighted quantities are counted in thousandths (grams) before pricing
+QUANTITY_SCALE = 1000
+# Percentages are counted in hundredths of a percent (basis points)
+PERCENT_SCALE = 100
+
+
+def div_round_half_up(numerator: int, denominator: int) -> int:
+    """
+    Integer division rounding halves away from zero, e.g. 2.5 cents -> 3 cents.
+    """
+    if numerator >= 0:
+        return (numerator + denominator // 2) // denominator
+    return -((-numerator + denominator // 2) // denominator)
+
+
+class FloatMoney:
+    """
+    Prices and amounts as floats, exactly as the pipeline has always computed them.
+    """
+
+    def from_price(self, price: float) -> float:
+        return price
+
+    def prices(self, unit_prices: Dict[Product, float]) -> Dict[Product, float]:
+        return unit_prices
+
+    def line_total(self, quantity: float, unit_price: float) -> float:
+        return quantity * unit_price
+
+    def percent_of(self, amount: float, percent: float) -> float:
+        return amount * percent / 100.0
+
+    def format(self, amount: float) -> str:
+        return f"{amount:.2f}"
+
+
+class MinorUnitMoney:
+    """
+    Prices and amounts as integer minor units (e.g. cents).
+
+    Rounding rules, applied once each:
+    - catalog and offer prices are rounded half-up to the nearest minor unit
+    - quantities are rounded to thousandths, and line totals half-up to the nearest minor unit
+    - percent discounts are rounded half-up to the nearest minor unit
+    """
+
+    def __init__(self, decimals: int = 2):
+        """
+        :param decimals: Number of minor-unit digits, 2 for cents
+        """
+        if decimals < 0:
+            raise ValueError("Decimals must not be negative")
+        self.decimals = decimals
+        self.scale = 10 ** decimals
+        self._quantum = Decimal(1).scaleb(-decimals)
+        # A catalog has few distinct prices, so each one goes through Decimal only once
+        self._minor_units: Dict[Amount, int] = {}
+
+    def from_price(self, price: Amount) -> int:
+        """
+        Converts a price in major units (e.g. 1.99) to minor units (199).
+        """
+        minor_units = self._minor_units.get(price)
+        if minor_units is None:
+            rounded = Decimal(str(price)).quantize(self._quantum, rounding=ROUND_HALF_UP)
+            minor_units = self._minor_units[price] = int(rounded.scaleb(self.decimals))
+        return minor_units
+
+    def prices(self, unit_prices: Dict[Product, float]) -> Dict[Product, int]:
+        converted = self._minor_units
+        from_price = self.from_price
+        return {product: converted[price] if price in converted else from_price(price)
+                for product, price in unit_prices.items()}
+
+    def line_total(self, quantity: float, unit_price: int) -> int:
+        if type(quantity) is int:
+            return quantity * unit_price
+        return div_round_half_up(round(quantity * QUANTITY_SCALE) * unit_price, QUANTITY_SCALE)
+
+    def percent_of(self, amount: int, percent: float) -> int:
+        return div_round_half_up(amount * round(percent * PERCENT_SCALE), 100 * PERCENT_SCALE)
+
+    def format(self, amount: int) -> str:
+        sign = "-" if amount < 0 else ""
+        major, minor = divmod(abs(amount), self.scale)
+        if not self.decimals:
+            return f"{sign}{major}"
+        return f"{sign}{major}.{minor:0{self.decimals}d}"
+
+
+FLOAT_MONEY = FloatMoney()
+CENTS = MinorUnitMoney(2)
@@ -0,0 +1,82 @@
+"""
+Interval index of time-windowed offers.
+
+For each product the start and end times of its scheduled offers split the
+time line into segments with a fixed set of active offers, so "which offers
+are active for this product at time T" is one binary search. A sorted list of
+every switch time gives the window around T in which nothing changes, which
+lets the teller skip the schedule entirely until the window ends.
+"""
+from bisect import bisect_right, insort
+from typing import Dict, List, Tuple
+
+from model_objects import Offer, Product, ScheduledOffer
+
+_NEVER = float("inf")
+
+
+class OfferSchedule:
+
+    def __init__(self):
+        self._scheduled: Dict[Product, List[ScheduledOffer]] = {}
+        # Per product: sorted segment start times, and the offers active in each segment
+        self._segments: Dict[Product, Tuple[List[float], List[Tuple[Offer, ...]]]] = {}
+        self._switch_times: List[float] = []
+        self._count = 0
+
+    def add(self, scheduled: ScheduledOffer):
+        if scheduled.start >= scheduled.end:
+            raise ValueError("Offer must end after it starts")
+        product = scheduled.offer.product
+        offers = self._scheduled.setdefault(product, [])
+        offers.append(scheduled)
+        self._segments[product] = _build_segments(offers)
+        insort(self._switch_times, scheduled.start)
+        insort(self._switch_times, scheduled.end)
+        self._count += 1
+
+    def offers_for(self, product: Product, at: float) -> Tuple[Offer, ...]:
+        """
+        The scheduled offers active for the product at the given time.
+        """
+        segments = self._segments.get(product)
+        if segments is None:
+            return ()
+        starts, active = segments
+        number = bisect_right(starts, at) - 1
+        return active[number] if number >= 0 else ()
+
+    def active_at(self, at: float) -> Dict[Product, Tuple[Offer, ...]]:
+        """
+        The active scheduled offers of every product that has any at the given time.
+        """
+        active = {}
+        for product in self._segments:
+            offers = self.offers_for(product, at)
+            if offers:
+                active[product] = offers
+        return active
+
+    def window_at(self, at: float) -> Tuple[float, float]:
+        """
+        The time range around the given time in which no scheduled offer starts or ends.
+        :return: (start, end), open-ended sides as -inf and inf
+        """
+        number = bisect_right(self._switch_times, at)
+        start = self._switch_times[number - 1] if number > 0 else -_NEVER
+        end = self._switch_times[number] if number < len(self._switch_times) else _NEVER
+        return start, end
+
+    def __len__(self) -> int:
+        # Kept as a count: the teller tests the schedule for emptiness on every pricing plan read
+        return self._count
+
+
+def _build_segments(scheduled: List[ScheduledOffer]) -> Tuple[List[float], List[Tuple[Offer, ...]]]:
+    starts = sorted({time for offer in scheduled for time in (offer.start, offer.end)})
+    active = []
+    for start in starts:
+        # One offer per type; of overlapping offers of the same type, the last scheduled wins
+        by_type = {entry.offer.offer_type: entry.offer for entry in scheduled if entry.start <= start < entry.end}
+        active.append(tuple(by_type.values()))
+    return starts, active
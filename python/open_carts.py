@@ -0,0 +1,109 @@
+"""
+Registry of the open carts of a teller, for re-pricing them in place.
+
+Every cart bound to a teller is indexed by the products it holds. When an
+offer or a price changes, only the carts holding that product are touched,
+and only that product's lines and discount are recomputed, so a one-product
+change costs work proportional to how many open carts use it. Each change
+is reported as a ReceiptDelta to the registered listeners.
+"""
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple
+from weakref import WeakSet
+
+from model_objects import Product
+
+if TYPE_CHECKING:
+    from shopping_cart import ShoppingCart
+
+
+class ReceiptDelta(NamedTuple):
+    """
+    How one product's lines and discount changed in one open cart.
+    """
+    cart: "ShoppingCart"
+    product: Product
+    old_line_total: float
+    new_line_total: float
+    old_discount: float
+    new_discount: float
+
+    @property
+    def total_change(self) -> float:
+        return (self.new_line_total - self.old_line_total) + (self.new_discount - self.old_discount)
+
+
+DeltaListener = Callable[[ReceiptDelta], None]
+
+
+class OpenCarts:
+    """
+    Product -> open carts index. Carts are held weakly, so abandoned carts drop out on their own.
+    """
+
+    def __init__(self):
+        self._carts_by_product: Dict[Product, WeakSet] = {}
+        self._listeners: List[DeltaListener] = []
+
+    def add_listener(self, listener: DeltaListener):
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: DeltaListener):
+        self._listeners.remove(listener)
+
+    def add(self, cart: "ShoppingCart"):
+        cart._open = True
+        for product in cart.product_quantities:
+            self.product_added(cart, product)
+
+    def remove(self, cart: "ShoppingCart"):
+        cart._open = False
+        for product in cart.product_quantities:
+            carts = self._carts_by_product.get(product)
+            if carts is not None:
+                carts.discard(cart)
+                if not carts:
+                    del self._carts_by_product[product]
+
+    def product_added(self, cart: "ShoppingCart", product: Product):
+        """
+        Called by an open cart when it scans a product for the first time.
+        """
+        carts = self._carts_by_product.get(product)
+        if carts is None:
+            carts = self._carts_by_product[product] = WeakSet()
+        carts.add(cart)
+
+    def carts_with(self, product: Product) -> List["ShoppingCart"]:
+        return list(self._carts_by_product.get(product, ()))
+
+    def reprice(self, product: Product) -> List[ReceiptDelta]:
+        """
+        Recomputes the product's lines and discount in every open cart holding it.
+        A cart failing to re-price (e.g. the catalog lost the product) does not stop the others;
+        the first failure is raised once all carts have been tried.
+        :return: The deltas of the carts whose receipt changed, also passed to the listeners
+        """
+        deltas = []
+        failure = None
+        for cart in self.carts_with(product):
+            try:
+                delta = cart._reprice_product(product)
+            except Exception as error:
+                failure = failure or error
+                continue
+            if delta.old_line_total != delta.new_line_total or delta.old_discount != delta.new_discount:
+                deltas.append(delta)
+                for listener in self._listeners:
+                    listener(delta)
+        carts = self._carts_by_product.get(product)
+        if carts is not None and not carts:
+            del self._carts_by_product[product]
+        if failure is not None:
+            raise failure
+        return deltas
+
+    def __len__(self) -> int:
+        """
+        Number of products held by at least one open cart.
+        """
+        return len(self._carts_by_product)
@@ -0,0 +1,296 @@
+"""
+Compiled pricing plan for special offers.
+
+A PricingPlan turns the teller's offers into one precompiled rule per product:
+the discount arithmetic, the validated arguments and the receipt description
+are all prepared once, so checkout only does arithmetic. New offer types plug
+in through register_offer_type instead of editing a dispatch chain.
+
+A product with several offers gets an OfferSet: its competing offers share
+the product's units the way that saves the most, and stackable offers are
+added on top.
+"""
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from bundle_matcher import BundleMatcher, MultiProductOffer
+from model_objects import Discount, Offer, Product, SpecialOfferType
+from money import FLOAT_MONEY
+
+# Computes the (positive) amount saved for a quantity at a unit price, or None if the offer doesn't apply
+DiscountFunction = Callable[[float, float], Optional[float]]
+
+
+class CompiledOffer:
+    """
+    An offer bound to its product, ready to be evaluated at checkout.
+    """
+    __slots__ = ("product", "description", "_discount_amount", "offer_type", "bundle_size")
+
+    def __init__(self, product: Product, description: str, discount_amount: DiscountFunction,
+                 offer_type: Optional[SpecialOfferType] = None, bundle_size: Optional[int] = None):
+        """
+        :param product: Product the offer applies to
+        :param description: Pre-rendered receipt description, e.g. "3 for 2"
+        :param discount_amount: Function computing the amount saved
+        :param offer_type: The offer type compiled, filled in by compile_offer
+        :param bundle_size: Units per application if the saving is the same for every whole
+                            application (e.g. 3 for "3 for 2", 1 for percent offers), else None
+        """
+        self.product = product
+        self.description = description
+        self._discount_amount = discount_amount
+        self.offer_type = offer_type
+        self.bundle_size = bundle_size
+
+    def apply(self, quantity: float, unit_price: float) -> Optional[Discount]:
+        """
+        Evaluates the offer for the total quantity of its product in a cart.
+        :return: The discount to add to the receipt, or None if the offer doesn't apply
+        """
+        amount = self._discount_amount(quantity, unit_price)
+        if amount is None:
+            return None
+        return Discount(self.product, self.description, -amount)
+
+
+# Compiles an offer with the money policy its prices and discounts are expressed in
+OfferCompiler = Callable[[Offer, object], CompiledOffer]
+
+_OFFER_COMPILERS: Dict[SpecialOfferType, OfferCompiler] = {}
+
+
+def register_offer_type(offer_type: SpecialOfferType) -> Callable[[OfferCompiler], OfferCompiler]:
+    """
+    Decorator registering the compiler used for an offer type.
+    """
+    def decorator(compiler: OfferCompiler) -> OfferCompiler:
+        _OFFER_COMPILERS[offer_type] = compiler
+        return compiler
+    return decorator
+
+
+def compile_offer(offer: Offer, money=FLOAT_MONEY) -> CompiledOffer:
+    """
+    Compiles a single offer with the compiler registered for its type.
+    :param money: Money policy of the unit prices the offer will be evaluated with
+    """
+    compiler = _OFFER_COMPILERS.get(offer.offer_type)
+    if compiler is None:
+        # Unknown offer type: safety check
+        raise ValueError(f"Unsupported offer type: {offer.offer_type}")
+    rule = compiler(offer, money)
+    rule.offer_type = offer.offer_type
+    return rule
+
+
+def compile_offers(offers: Sequence[Offer], money=FLOAT_MONEY) -> CompiledOffer:
+    """
+    Compiles all offers of one product into a single rule.
+    """
+    if len(offers) == 1:
+        return compile_offer(offers[0], money)
+    return OfferSet(offers[0].product,
+                    [compile_offer(offer, money) for offer in offers if not offer.stackable],
+                    [compile_offer(offer, money) for offer in offers if offer.stackable])
+
+
+class OfferSet(CompiledOffer):
+    """
+    Several offers on one product, evaluated as one rule giving one combined discount.
+    Competing offers are given the split of units saving the most, found with a small
+    dynamic program over whole units; stackable offers each apply to the whole quantity.
+    """
+    __slots__ = ("competing", "stackable")
+
+    def __init__(self, product: Product, competing: Sequence[CompiledOffer], stackable: Sequence[CompiledOffer]):
+        rules = list(competing) + list(stackable)
+        super().__init__(product, " + ".join(rule.description for rule in rules), None)
+        self.competing = list(competing)
+        self.stackable = list(stackable)
+
+    def apply(self, quantity: float, unit_price: float) -> Optional[Discount]:
+        amount, descriptions = self._best_competing(quantity, unit_price)
+        for rule in self.stackable:
+            stacked = rule._discount_amount(quantity, unit_price)
+            if stacked is not None:
+                amount += stacked
+                descriptions.append(rule.description)
+        if not descriptions:
+            return None
+        return Discount(self.product, " + ".join(descriptions), -amount)
+
+    def _best_competing(self, quantity: float, unit_price: float) -> Tuple[float, List[str]]:
+        """
+        The largest saving the competing offers can give together, and the offers used for it.
+        """
+        rules = self.competing
+        if len(rules) == 1:
+            amount = rules[0]._discount_amount(quantity, unit_price)
+            return (0, []) if amount is None else (amount, [rules[0].description])
+
+        if any(rule.bundle_size is None for rule in rules):
+            # Offers that can't be split by units: the single best one takes the whole quantity
+            best_amount, best_rule = 0, None
+            for rule in rules:
+                amount = rule._discount_amount(quantity, unit_price)
+                if amount is not None and amount > best_amount:
+                    best_amount, best_rule = amount, rule
+            return (0, []) if best_rule is None else (best_amount, [best_rule.description])
+
+        candidates = []
+        bundles = []
+        for rule in rules:
+            saving = rule._discount_amount(rule.bundle_size, unit_price)
+            if saving is not None and saving > 0:
+                candidates.append(rule)
+                bundles.append((rule.bundle_size, saving))
+        units = int(quantity)
+        applications = _allocate_units(units, bundles)
+
+        # A weighed remainder can only go to a per-unit offer; give it to the one saving most per unit
+        per_unit = [number for number, (size, _) in enumerate(bundles) if size == 1]
+        fraction_to = max(per_unit, key=lambda number: bundles[number][1]) if per_unit else None
+
+        amount = 0
+        descriptions = []
+        for number, rule in enumerate(candidates):
+            allocated = applications[number] * rule.bundle_size
+            if number == fraction_to:
+                allocated += quantity - units
+            if allocated:
+                amount += rule._discount_amount(allocated, unit_price)
+                descriptions.append(rule.description)
+        return amount, descriptions
+
+
+def _allocate_units(units: int, bundles: Sequence[Tuple[int, float]]) -> List[int]:
+    """
+    Splits whole units between offers to maximize the total saving (an unbounded knapsack).
+    :param bundles: (units per application, saving per application) of each offer, savings positive
+    :return: Number of applications of each offer
+    """
+    applications = [0] * len(bundles)
+    if not bundles or units <= 0:
+        return applications
+
+    # Some best split uses fewer than densest_size applications of the other offers: any densest_size
+    # of them contain a subset covering a multiple of densest_size units, on which the densest offer
+    # saves at least as much. So only a window bounded by the bundle sizes needs the DP and all
+    # units beyond it go to the densest offer, keeping the cost flat in the quantity.
+    densest = max(range(len(bundles)), key=lambda number: bundles[number][1] / bundles[number][0])
+    densest_size = bundles[densest][0]
+    window = densest_size * (max(size for size, _ in bundles) + 1)
+    if units > window:
+        applications[densest] = (units - window) // densest_size
+        units -= applications[densest] * densest_size
+
+    best = [0] * (units + 1)
+    choice = [-1] * (units + 1)
+    for used in range(1, units + 1):
+        best[used] = best[used - 1]
+        for number, (size, saving) in enumerate(bundles):
+            if size <= used and best[used - size] + saving > best[used]:
+                best[used] = best[used - size] + saving
+                choice[used] = number
+
+    used = units
+    while used > 0:
+        number = choice[used]
+        if number < 0:
+            used -= 1
+        else:
+            applications[number] += 1
+            used -= bundles[number][0]
+    return applications
+
+
+class PricingPlan:
+    """
+    Maps each product with an offer to its compiled offer, and holds the matcher
+    for bundle and group offers spanning several products.
+    """
+
+    def __init__(self, offers: Mapping[Product, Union[Offer, Sequence[Offer]]], money=FLOAT_MONEY,
+                 bundle_offers: Sequence[MultiProductOffer] = ()):
+        """
+        :param offers: Product -> its offer, or the list of its offers
+        :param bundle_offers: Bundle and group offers spanning several products
+        """
+        self.money = money
+        self._rules: Dict[Product, CompiledOffer] = {
+            product: compile_offer(offer, money) if isinstance(offer, Offer) else compile_offers(offer, money)
+            for product, offer in offers.items() if offer
+        }
+        self.matcher: Optional[BundleMatcher] = BundleMatcher(bundle_offers, money) if bundle_offers else None
+
+    def with_rules(self, wrap: Callable[[CompiledOffer], CompiledOffer]) -> "PricingPlan":
+        """
+        A copy of this plan with every compiled offer passed through wrap, e.g. to instrument it.
+        """
+        plan = PricingPlan({}, self.money)
+        plan.matcher = self.matcher
+        plan._rules = {product: wrap(rule) for product, rule in self._rules.items()}
+        return plan
+
+    def rule_for(self, product: Product) -> Optional[CompiledOffer]:
+        return self._rules.get(product)
+
+    def __contains__(self, product: Product) -> bool:
+        return product in self._rules
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+
+@register_offer_type(SpecialOfferType.THREE_FOR_TWO)
+def _compile_three_for_two(offer: Offer, money) -> CompiledOffer:
+    def discount_amount(quantity: float, unit_price: float) -> Optional[float]:
+        quantity = int(quantity)
+        if quantity < 3:
+            return None
+
+        number_of_trios = quantity // 3  # Each trio of 3 qualifies for a discount
+        total_without_discount = quantity * unit_price
+
+        # Pay for 2 out of 3 items
+        discounted_total = (number_of_trios * 2 * unit_price) + (quantity % 3 * unit_price)
+        return total_without_discount - discounted_total
+
+    return CompiledOffer(offer.product, "3 for 2", discount_amount, bundle_size=3)
+
+
+def _compile_x_for_amount(offer: Offer, money, bundle_size: int) -> CompiledOffer:
+    offer_price = money.from_price(offer.argument)
+
+    def discount_amount(quantity: float, unit_price: float) -> Optional[float]:
+        quantity = int(quantity)
+        if quantity < bundle_size:
+            return None
+        number_of_bundles = quantity // bundle_size
+        discounted_total = number_of_bundles * offer_price + (quantity % bundle_size) * unit_price
+        return quantity * unit_price - discounted_total
+
+    return CompiledOffer(offer.product, f"{bundle_size} for {offer.argument}", discount_amount,
+                         bundle_size=bundle_size)
+
+
+@register_offer_type(SpecialOfferType.TWO_FOR_AMOUNT)
+def _compile_two_for_amount(offer: Offer, money) -> CompiledOffer:
+    return _compile_x_for_amount(offer, money, 2)
+
+
+@register_offer_type(SpecialOfferType.FIVE_FOR_AMOUNT)
+def _compile_five_for_amount(offer: Offer, money) -> CompiledOffer:
+    return _compile_x_for_amount(offer, money, 5)
+
+
+@register_offer_type(SpecialOfferType.TEN_PERCENT_DISCOUNT)
+def _compile_percent_discount(offer: Offer, money) -> CompiledOffer:
+    percent = offer.argument
+    if percent < 0 or percent > 100:
+        raise ValueError("Invalid percentage value")
+
+    def discount_amount(quantity: float, unit_price: float) -> Optional[float]:
+        return money.percent_of(money.line_total(quantity, unit_price), percent)
+
+    return CompiledOffer(offer.product, f"{percent}% off", discount_amount, bundle_size=1)
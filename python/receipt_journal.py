@@ -0,0 +1,281 @@
+"""
+Append-only, segmented journal of receipts with group commit.
+
+Each receipt is appended as one checksummed record holding its binary
+snapshot. append only returns once the record is on disk, but fsyncs are
+shared: the first checkout waiting for durability becomes the leader, waits
+up to the commit latency budget for concurrent checkouts to append theirs,
+and makes all of them durable with a single fsync. Under load, one fsync
+covers a whole batch of receipts.
+
+Segments are named after the sequence number of their first record and
+rotated once they reach the configured size. After a crash, a torn record at
+the end of the last segment is cut off when the journal is opened again, and
+replay yields every complete record in order. Corruption anywhere else is
+reported rather than cut off. If an fsync fails, the journal stops: what
+reached the disk is unknown, so that commit and every later append fail.
+
+Record layout (little endian): payload length u32, CRC-32 of sequence and
+payload u32, sequence number u64, payload (Receipt.to_bytes()).
+"""
+import os
+import struct
+import threading
+import zlib
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from receipt import Receipt
+
+SEGMENT_SUFFIX = ".journal"
+
+_RECORD_HEADER = struct.Struct("<IIQ")
+_SEQUENCE = struct.Struct("<Q")
+
+
+class ReceiptJournal:
+
+    def __init__(self, directory: Union[str, os.PathLike], segment_bytes: int = 64 * 1024 * 1024,
+                 commit_latency: float = 0.002, fsync: Callable[[int], None] = os.fsync):
+        """
+        :param directory: Directory holding the segment files, created if missing
+        :param segment_bytes: Size after which appends go to a new segment
+        :param commit_latency: Longest a commit waits, in seconds, for more receipts to share its fsync;
+                               a commit with no other append in progress doesn't wait
+        :param fsync: Function flushing a file descriptor to disk
+        """
+        if segment_bytes <= 0:
+            raise ValueError("Segment size must be positive")
+        if commit_latency < 0:
+            raise ValueError("Commit latency must not be negative")
+        self.directory = os.fspath(directory)
+        self.segment_bytes = segment_bytes
+        self.commit_latency = commit_latency
+        self._fsync = fsync
+        # Number of fsync batches, and of records they made durable, for monitoring
+        self.commits = 0
+        self.records = 0
+
+        self._condition = threading.Condition()
+        # Appends in progress, counted before they queue for the condition so a commit leader sees them
+        self._appenders = 0
+        self._appenders_lock = threading.Lock()
+        self._committing = False
+        self._retired: List = []  # Rotated segments not yet fsynced
+        self._failure: Optional[BaseException] = None  # The failed fsync that stopped the journal
+        os.makedirs(self.directory, exist_ok=True)
+
+        segments = _segment_paths(self.directory)
+        if segments:
+            last_sequence, valid_bytes = _recover(segments[-1])
+            os.truncate(segments[-1], valid_bytes)
+            self._file = open(segments[-1], "ab", buffering=0)
+            self._size = valid_bytes
+        else:
+            last_sequence = 0
+            self._file = self._create_segment(1)
+            self._size = 0
+        self._sequence = last_sequence
+        self._durable = last_sequence
+
+    def append(self, receipt: Receipt) -> int:
+        """
+        Appends a receipt and returns once it is durable.
+        :return: The record's sequence number
+        """
+        return self.append_many([receipt])[-1]
+
+    def append_many(self, receipts: Iterable[Receipt]) -> List[int]:
+        """
+        Appends several receipts, made durable together, e.g. for a batch checkout.
+        :return: The records' sequence numbers
+        """
+        payloads = [receipt.to_bytes() for receipt in receipts]
+        with self._appenders_lock:
+            self._appenders += 1
+        try:
+            with self._condition:
+                if self._file is None:
+                    raise ValueError("Journal is closed")
+                self._check_not_failed()
+                sequences = [self._write(payload) for payload in payloads]
+                if sequences:
+                    self._wait_durable(sequences[-1])
+        finally:
+            with self._appenders_lock:
+                self._appenders -= 1
+        return sequences
+
+    def close(self):
+        with self._condition:
+            while self._committing:
+                self._condition.wait()
+            if self._file is None:
+                return
+            segments, self._retired, self._file = self._retired + [self._file], [], None
+            try:
+                if self._failure is None:
+                    for segment in segments:
+                        self._fsync(segment.fileno())
+                    self._durable = self._sequence
+            finally:
+                for segment in segments:
+                    segment.close()
+
+    def __enter__(self) -> "ReceiptJournal":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write(self, payload: bytes) -> int:
+        sequence = self._sequence + 1
+        if self._size >= self.segment_bytes:
+            # Rotate: the old segment is fsynced with the next commit, then closed
+            segment = self._create_segment(sequence)
+            self._retired.append(self._file)
+            self._file = segment
+            self._size = 0
+        sequence_bytes = _SEQUENCE.pack(sequence)
+        crc = zlib.crc32(payload, zlib.crc32(sequence_bytes))
+        record = _RECORD_HEADER.pack(len(payload), crc, sequence) + payload
+        self._file.write(record)
+        self._size += len(record)
+        self._sequence = sequence
+        return sequence
+
+    def _wait_durable(self, sequence: int):
+        """
+        Blocks until the sequence is durable, leading a commit if none is in progress.
+        Called with the condition held.
+        """
+        while self._durable < sequence:
+            self._check_not_failed()
+            if self._committing:
+                self._condition.wait()
+                continue
+
+            self._committing = True
+            try:
+                if self.commit_latency and self._appenders > 1:
+                    # Let concurrent checkouts append before the fsync; only commits notify, so this waits it out.
+                    # A lone appender has no one to wait for.
+                    self._condition.wait(self.commit_latency)
+                target = self._sequence
+                segments, self._retired = self._retired + [self._file], []
+                failure = None
+                self._condition.release()
+                try:
+                    # Appends continue while the disk syncs; they go into the next commit
+                    for segment in segments:
+                        self._fsync(segment.fileno())
+                except BaseException as error:
+                    failure = error
+                finally:
+                    self._condition.acquire()
+                if failure is not None:
+                    # A failed fsync may have dropped the dirty pages, so a retry could falsely succeed
+                    self._failure = failure
+                    self._retired = segments[:-1] + self._retired  # Closed, unsynced, by close()
+                    raise failure
+                for segment in segments[:-1]:
+                    segment.close()
+                self.commits += 1
+                self.records += target - self._durable
+                self._durable = target
+            finally:
+                self._committing = False
+                self._condition.notify_all()
+
+    def _check_not_failed(self):
+        if self._failure is not None:
+            raise OSError("Journal stopped after a failed fsync; recent receipts may not be durable") \
+                from self._failure
+
+    def _create_segment(self, first_sequence: int):
+        segment = open(_segment_path(self.directory, first_sequence), "xb", buffering=0)
+        # Make the new directory entry durable too
+        directory = os.open(self.directory, os.O_RDONLY)
+        try:
+            self._fsync(directory)
+        except BaseException as error:
+            segment.close()
+            self._failure = error
+            raise
+        finally:
+            os.close(directory)
+        return segment
+
+
+def replay(directory: Union[str, os.PathLike], after: int = 0) -> Iterator[Tuple[int, Receipt]]:
+    """
+    Yields (sequence number, receipt) for every complete record of a journal, in order.
+    A torn record at the end of the last segment, left by a crash, is skipped.
+    :param after: Only yield records with a higher sequence number, e.g. the last one already processed
+    """
+    segments = _segment_paths(os.fspath(directory))
+    for number, path in enumerate(segments):
+        data = _read_segment(path)
+        end = 0
+        for sequence, payload, end in _records(data):
+            if sequence > after:
+                yield sequence, Receipt.from_bytes(payload)
+        if end < len(data) and (number < len(segments) - 1 or not _is_torn_tail(data, end)):
+            raise ValueError(f"Corrupt journal segment {path} at offset {end}")
+
+
+def _segment_path(directory: str, first_sequence: int) -> str:
+    return os.path.join(directory, f"{first_sequence:020d}{SEGMENT_SUFFIX}")
+
+
+def _segment_paths(directory: str) -> List[str]:
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(name for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX))
+    return [os.path.join(directory, name) for name in names]
+
+
+def _read_segment(path: str) -> memoryview:
+    with open(path, "rb") as f:
+        return memoryview(f.read())
+
+
+def _records(data: memoryview) -> Iterator[Tuple[int, memoryview, int]]:
+    """
+    Yields (sequence, payload, offset past the record) for each record, stopping at the first torn or corrupt one.
+    """
+    offset = 0
+    while len(data) - offset >= _RECORD_HEADER.size:
+        length, crc, sequence = _RECORD_HEADER.unpack_from(data, offset)
+        start = offset + _RECORD_HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload, zlib.crc32(_SEQUENCE.pack(sequence))) != crc:
+            return
+        offset = start + length
+        yield sequence, payload, offset
+
+
+def _is_torn_tail(data: memoryview, offset: int) -> bool:
+    """
+    Whether the invalid bytes from offset on are a single record cut short by a crash:
+    its header is incomplete, or the record it announces reaches the end of the segment.
+    """
+    if len(data) - offset < _RECORD_HEADER.size:
+        return True
+    length = _RECORD_HEADER.unpack_from(data, offset)[0]
+    return offset + _RECORD_HEADER.size + length >= len(data)
+
+
+def _recover(path: str) -> Tuple[int, int]:
+    """
+    Finds the last complete record of a segment, which may only be followed by a torn record.
+    :return: (last sequence number, size of the valid prefix of the segment)
+    """
+    # An empty segment's name says which sequence it starts at
+    last_sequence = int(os.path.basename(path)[:-len(SEGMENT_SUFFIX)]) - 1
+    data = _read_segment(path)
+    end = 0
+    for last_sequence, _, end in _records(data):
+        pass
+    if end < len(data) and not _is_torn_tail(data, end):
+        raise ValueError(f"Corrupt journal segment {path} at offset {end}")
+    return last_sequence, end
@@ -1,31 +1,57 @@
+import io
+from typing import BinaryIO, Iterator, Optional, TextIO, Union
+
 from model_objects import ProductUnit
 from receipt import Receipt, ReceiptItem
 from model_objects import Discount
+from money import FLOAT_MONEY
+from instrumentation import Metrics
 
 
 class ReceiptPrinter:
-    def __init__(self, columns: int = 40):
+    def __init__(self, columns: int = 40, money=FLOAT_MONEY, metrics: Optional[Metrics] = None):
         """
         Initializes the receipt printer.
         :param columns: Number of characters per line
+        :param money: Money policy the receipt amounts are expressed in
+        :param metrics: Optional metrics registry recording how long rendering takes
         """
         self.columns = columns
+        self.money = money
+        self.metrics = metrics
 
     def print_receipt(self, receipt: Receipt) -> str:
         """
         Generates a printable receipt string from the receipt data.
         """
-        result = ""
+        if self.metrics is not None:
+            with self.metrics.timer("receipt_render_seconds"):
+                return "".join(self.iter_lines(receipt))
+        return "".join(self.iter_lines(receipt))
 
+    def iter_lines(self, receipt: Receipt) -> Iterator[str]:
+        """
+        Yields the receipt text incrementally: item lines, discount lines, then the total.
+        """
         for item in receipt.items:
-            result += self.print_receipt_item(item)
+            yield self.print_receipt_item(item)
 
         for discount in receipt.discounts:
-            result += self.print_discount(discount)
+            yield self.print_discount(discount)
+
+        yield "\n"
+        yield self.present_total(receipt)
 
-        result += "\n"
-        result += self.present_total(receipt)
-        return result
+    def write_receipt(self, receipt: Receipt, stream: Union[TextIO, BinaryIO], encoding: str = "utf-8"):
+        """
+        Writes the receipt to a text or binary stream line by line, without building the whole text.
+        :param stream: File-like sink, e.g. an open file, socket file or sys.stdout
+        :param encoding: Encoding used when the stream is binary
+        """
+        if isinstance(stream, (io.RawIOBase, io.BufferedIOBase)):
+            stream.writelines(line.encode(encoding) for line in self.iter_lines(receipt))
+        else:
+            stream.writelines(self.iter_lines(receipt))
 
     def print_receipt_item(self, item: ReceiptItem) -> str:
         """
@@ -59,7 +85,7 @@ class ReceiptPrinter:
         """
         Formats a price to 2 decimal places.
         """
-        return f"{price:.2f}"
+        return self.money.format(price)
 
     def print_quantity(self, item: ReceiptItem) -> str:
         """
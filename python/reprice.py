@@ -0,0 +1,88 @@
+"""
+Multi-core re-pricing of historical baskets.
+
+Baskets are sent to a process pool in chunks. Each worker builds its teller
+(catalog and offers) once in the pool initializer, and sends back one small
+tuple per basket instead of a pickled Receipt object graph.
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Hashable, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from shopping_cart import cart_from_lines
+from teller import Teller
+
+# A basket is its id and its lines as (product name, quantity)
+Basket = Tuple[Hashable, Sequence[Tuple[str, float]]]
+
+
+class RepricedBasket(NamedTuple):
+    basket_id: Hashable
+    total: float
+    discount_total: float
+    line_count: int
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    """
+    Splits an iterable into lists of at most size elements, consuming it lazily.
+    """
+    if size <= 0:
+        raise ValueError("Chunk size must be positive")
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def reprice_basket(teller: Teller, basket: Basket) -> Tuple[Hashable, float, float, int]:
+    """
+    Checks out one basket; product names are resolved through the teller's catalog.products.
+    """
+    basket_id, lines = basket
+    receipt = teller.checks_out_articles_from(cart_from_lines(teller.catalog.products, lines))
+    discount_total = sum(discount.discount_amount for discount in receipt.discounts)
+    return basket_id, receipt.total_price(), discount_total, len(receipt.items)
+
+
+def reprice_batch(baskets: Iterable[Basket], teller_factory: Callable[[], Teller],
+                  max_workers: Optional[int] = None, chunk_size: int = 1000) -> Iterator[RepricedBasket]:
+    """
+    Re-prices baskets on all cores, yielding results in input order.
+    :param baskets: Baskets to re-price, consumed lazily
+    :param teller_factory: Picklable function building the teller (catalog with products by name, and offers)
+    :param max_workers: Number of worker processes, defaults to the number of CPUs
+    :param chunk_size: Number of baskets sent to a worker at once
+    """
+    workers = max_workers or os.cpu_count() or 1
+    # Only keep a couple of chunks per worker in flight, so input is read as fast as it's priced
+    max_in_flight = 2 * workers
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(teller_factory,)) as executor:
+        pending = deque()
+        for chunk in chunked(baskets, chunk_size):
+            pending.append(executor.submit(_reprice_chunk, chunk))
+            if len(pending) >= max_in_flight:
+                yield from _results(pending.popleft())
+        while pending:
+            yield from _results(pending.popleft())
+
+
+_worker_teller: Optional[Teller] = None
+
+
+def _init_worker(teller_factory: Callable[[], Teller]):
+    global _worker_teller
+    _worker_teller = teller_factory()
+
+
+def _reprice_chunk(baskets: List[Basket]) -> List[Tuple[Hashable, float, float, int]]:
+    return [reprice_basket(_worker_teller, basket) for basket in baskets]
+
+
+def _results(future) -> Iterator[RepricedBasket]:
+    return (RepricedBasket(*result) for result in future.result())
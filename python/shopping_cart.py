@@ -1,13 +1,37 @@
-import math
-from model_objects import Product, ProductQuantity, SpecialOfferType, Discount
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from model_objects import Discount, Product, ProductQuantity
+from open_carts import ReceiptDelta
+from pricing_plan import PricingPlan
 from receipt import Receipt
+from snapshot import Buffer, cart_from_bytes, cart_to_bytes
+
+if TYPE_CHECKING:
+    from teller import Teller
 
 
 class ShoppingCart:
-    def __init__(self):
+    def __init__(self, teller: Optional["Teller"] = None):
+        """
+        :param teller: Optional teller whose catalog and offers keep a running total up to date on every scan;
+                       the cart is registered with the teller's open carts until closed
+        """
         self._items: list[ProductQuantity] = []
         self._product_quantities: dict[Product, float] = {}
 
+        # Incremental pricing state, only maintained when bound to a teller
+        self._teller = teller
+        self._plan: Optional[PricingPlan] = None
+        self._unit_prices: dict[Product, float] = {}
+        self._product_discounts: dict[Product, float] = {}
+        self._product_lines: dict[Product, list[float]] = {}
+        self._subtotal = 0
+        self._discount_total = 0
+        self._open = False
+        if teller is not None:
+            self._plan = teller.pricing_plan
+            teller.open_carts.add(self)
+
     @property
     def items(self):
         return self._items
@@ -16,78 +40,205 @@ class ShoppingCart:
     def product_quantities(self):
         return self._product_quantities
 
+    def lines(self) -> Iterator[Tuple[Product, float]]:
+        """
+        Iterates (product, quantity) per line, in scan order.
+        """
+        return ((pq.product, pq.quantity) for pq in self._items)
+
+    def to_bytes(self) -> bytes:
+        """
+        Compact binary snapshot of the cart lines, e.g. to replicate an open cart to another lane.
+        """
+        return cart_to_bytes(list(self.lines()))
+
+    @classmethod
+    def from_bytes(cls, data: Buffer, teller: Optional["Teller"] = None) -> "ShoppingCart":
+        """
+        Restores a cart from a snapshot made by to_bytes, scanning its lines again in order.
+        :param teller: Optional teller to bind the restored cart to, as in the constructor
+        """
+        cart = cls(teller)
+        for product, quantity in cart_from_bytes(data):
+            cart.add_item_quantity(product, quantity)
+        return cart
+
     def add_item(self, product: Product):
         self.add_item_quantity(product, 1.0)
 
     def add_item_quantity(self, product: Product, quantity: float):
         if quantity <= 0:
             raise ValueError("Quantity must be positive")
+        # Checked first: bringing the plan up to date may re-price the cart's current lines
+        plan_is_current = self._teller is not None and self._plan_is_current()
+        # Resolved before the cart changes, so a product the catalog doesn't know leaves no trace
+        unit_price = self._unit_price(product) if plan_is_current else None
 
         self._items.append(ProductQuantity(product, quantity))
         if product in self._product_quantities:
             self._product_quantities[product] += quantity
         else:
             self._product_quantities[product] = quantity
+            if self._open:
+                self._teller.open_carts.product_added(self, product)
 
-    def handle_offers(self, receipt: Receipt, offers: dict, catalog):
-        for product, quantity in self._product_quantities.items():
-            if product in offers:
-                offer = offers[product]
-                unit_price = catalog.unit_price(product)
-                quantity_as_int = int(quantity)
-                discount = None
-
-                # Delegate offer logic to respective handler
-                if offer.offer_type == SpecialOfferType.THREE_FOR_TWO:
-                    discount = self._apply_three_for_two(product, quantity_as_int, unit_price)
-                elif offer.offer_type == SpecialOfferType.TWO_FOR_AMOUNT:
-                    discount = self._apply_two_for_amount(product, quantity_as_int, unit_price, offer.argument)
-                elif offer.offer_type == SpecialOfferType.FIVE_FOR_AMOUNT:
-                    discount = self._apply_five_for_amount(product, quantity_as_int, unit_price, offer.argument)
-                elif offer.offer_type == SpecialOfferType.TEN_PERCENT_DISCOUNT:
-                    discount = self._apply_ten_percent_discount(product, quantity, unit_price, offer.argument)
-                else:
-                    # Unknown offer type: safety check
-                    raise ValueError(f"Unsupported offer type: {offer.offer_type}")
-
-                if discount:
-                    # Security Note: discount amounts should always be negative
-                    if discount.discount_amount > 0:
-                        raise ValueError("Discount amount should not be positive")
-                    receipt.add_discount(discount)
-
-    def _apply_three_for_two(self, product, quantity: int, unit_price: float):
-        if quantity < 3:
-            return None
-
-        number_of_trios = quantity // 3  # Each trio of 3 qualifies for a discount
-        total_without_discount = quantity * unit_price
-
-        # Pay for 2 out of 3 items
-        discounted_total = (number_of_trios * 2 * unit_price) + (quantity % 3 * unit_price)
-
-        discount_amount = total_without_discount - discounted_total
-        return Discount(product, "3 for 2", -discount_amount)
-
-
-    def _apply_two_for_amount(self, product, quantity: int, unit_price: float, offer_price: float):
-        if quantity < 2:
-            return None
-        number_of_pairs = quantity // 2
-        discounted_total = number_of_pairs * offer_price + (quantity % 2) * unit_price
-        discount_amount = quantity * unit_price - discounted_total
-        return Discount(product, f"2 for {offer_price}", -discount_amount)
-
-    def _apply_five_for_amount(self, product, quantity: int, unit_price: float, offer_price: float):
-        if quantity < 5:
-            return None
-        number_of_fives = quantity // 5
-        discounted_total = number_of_fives * offer_price + (quantity % 5) * unit_price
-        discount_amount = quantity * unit_price - discounted_total
-        return Discount(product, f"5 for {offer_price}", -discount_amount)
-
-    def _apply_ten_percent_discount(self, product, quantity: float, unit_price: float, percent: float):
-        if percent < 0 or percent > 100:
-            raise ValueError("Invalid percentage value")
-        discount_amount = quantity * unit_price * percent / 100.0
-        return Discount(product, f"{percent}% off", -discount_amount)
+        if self._teller is not None:
+            self._product_lines.setdefault(product, []).append(quantity)
+        if plan_is_current:
+            self._subtotal += self._teller.money.line_total(quantity, unit_price)
+            self._update_discount(product, unit_price)
+
+    @property
+    def running_total(self) -> float:
+        """
+        The discounted total of the cart so far, updated on each scan in O(1).
+        Equals the total of the receipt the bound teller would produce now: exactly with
+        integer minor-unit money (CENTS), up to float rounding with float money, since the
+        running sums are kept by adding and removing each product's discount as it changes.
+        With bundle or group offers the discounts are matched afresh on each read,
+        since one scan can change which units go into which bundle.
+        """
+        if self._teller is None:
+            raise ValueError("Running total requires a cart bound to a teller")
+        if not self._plan_is_current():
+            # Offers changed since the last scan: re-price the whole cart once
+            self._reprice()
+        if self._plan.matcher is not None:
+            receipt = Receipt()
+            self.handle_offers(receipt, self._plan, self._teller.catalog, self._unit_prices)
+            return self._subtotal + receipt.total_price()
+        return self._subtotal + self._discount_total
+
+    def close(self):
+        """
+        Removes the cart from its teller's open carts, e.g. once it is checked out.
+        """
+        if self._open:
+            self._teller.open_carts.remove(self)
+
+    def _plan_is_current(self) -> bool:
+        plan = self._teller.pricing_plan
+        if self._plan is plan:
+            return True
+        if self._open:
+            # The open-cart registry re-priced every product whose offers changed
+            self._plan = plan
+            return True
+        return False
+
+    def _reprice_product(self, product: Product) -> ReceiptDelta:
+        """
+        Recomputes one product's lines and discount after its price or offers changed.
+        """
+        money = self._teller.money
+        new_price = money.from_price(self._teller.catalog.unit_price(product))
+        self._plan = self._teller.pricing_plan
+        line_total = money.line_total
+        # Lines without a cached price were never counted in the subtotal
+        old_price = self._unit_prices.get(product)
+        self._unit_prices[product] = new_price
+        lines = self._product_lines[product]
+        old_line_total = 0 if old_price is None else sum(line_total(quantity, old_price) for quantity in lines)
+        new_line_total = sum(line_total(quantity, new_price) for quantity in lines)
+        self._subtotal += new_line_total - old_line_total
+
+        old_discount = self._product_discounts.get(product, 0)
+        self._update_discount(product, new_price)
+        new_discount = self._product_discounts.get(product, 0)
+        return ReceiptDelta(self, product, old_line_total, new_line_total, old_discount, new_discount)
+
+    def _unit_price(self, product: Product) -> float:
+        unit_price = self._unit_prices.get(product)
+        if unit_price is None:
+            unit_price = self._teller.money.from_price(self._teller.catalog.unit_price(product))
+            self._unit_prices[product] = unit_price
+        return unit_price
+
+    def _update_discount(self, product: Product, unit_price: float):
+        rule = self._plan.rule_for(product)
+        if rule is None:
+            # The product's offer may just have ended or been dropped
+            self._discount_total -= self._product_discounts.pop(product, 0)
+            return
+        discount = rule.apply(self._product_quantities[product], unit_price)
+        amount = discount.discount_amount if discount else 0
+        self._discount_total += amount - self._product_discounts.get(product, 0)
+        self._product_discounts[product] = amount
+
+    def _reprice(self):
+        self._plan = self._teller.pricing_plan
+        money = self._teller.money
+        self._unit_prices = money.prices(self._teller.catalog.unit_prices(self._product_quantities))
+        self._product_discounts = {}
+        self._subtotal = 0
+        self._discount_total = 0
+        for pq in self._items:
+            self._subtotal += money.line_total(pq.quantity, self._unit_prices[pq.product])
+        for product in self._product_quantities:
+            self._update_discount(product, self._unit_prices[product])
+
+    def handle_offers(self, receipt: Receipt, offers, catalog, unit_prices: Optional[dict] = None):
+        """
+        Adds a discount to the receipt for every product in the cart that has an offer.
+        Bundle and group offers are matched first; per-product offers apply to the units they leave.
+        The matching is kept only if it saves more than the per-product offers would on their own.
+        :param offers: A compiled PricingPlan, or a dict of Product -> Offer to compile
+        :param unit_prices: Prices already resolved for this checkout; looked up in the catalog if omitted
+        """
+        plan = offers if isinstance(offers, PricingPlan) else PricingPlan(offers)
+        quantities = self.product_quantities
+        if unit_prices is None:
+            unit_prices = plan.money.prices(catalog.unit_prices(quantities))
+
+        if plan.matcher is None:
+            discounts = _product_discounts(plan, quantities, unit_prices)
+        else:
+            discounts = _best_discounts(plan, quantities, unit_prices)
+        for discount in discounts:
+            _add_discount(receipt, discount)
+
+
+def cart_from_lines(products: Mapping[str, Product], lines: Iterable[Tuple[str, float]]) -> ShoppingCart:
+    """
+    Builds a cart from (product name, quantity) lines, e.g. a logged basket or a lane request.
+    :param products: Products by name, usually the teller's catalog.products
+    """
+    cart = ShoppingCart()
+    for name, quantity in lines:
+        cart.add_item_quantity(products[name], quantity)
+    return cart
+
+
+def _product_discounts(plan: PricingPlan, quantities: dict, unit_prices: dict) -> List[Discount]:
+    discounts = []
+    for product, quantity in quantities.items():
+        rule = plan.rule_for(product)
+        if rule is None:
+            continue
+
+        discount = rule.apply(quantity, unit_prices[product])
+        if discount:
+            discounts.append(discount)
+    return discounts
+
+
+def _best_discounts(plan: PricingPlan, quantities: dict, unit_prices: dict) -> List[Discount]:
+    """
+    The discounts saving the most of: bundles matched on their own saving, bundles matched net of
+    the per-product discounts they break, and no bundles at all, so bundles never raise a total.
+    """
+    candidates = []
+    # Without per-product offers both matchings are the same
+    for rule_for in ((None, plan.rule_for) if len(plan) else (None,)):
+        bundle_discounts, leftover = plan.matcher.match(quantities, unit_prices, rule_for)
+        if bundle_discounts:
+            candidates.append(bundle_discounts + _product_discounts(plan, leftover, unit_prices))
+    candidates.append(_product_discounts(plan, quantities, unit_prices))
+    return min(candidates, key=lambda discounts: sum(discount.discount_amount for discount in discounts))
+
+
+def _add_discount(receipt: Receipt, discount: Discount):
+    # Security Note: discount amounts should always be negative
+    if discount.discount_amount > 0:
+        raise ValueError("Discount amount should not be positive")
+    receipt.add_discount(discount)
@@ -0,0 +1,65 @@
+from array import array
+from typing import Dict, Iterable, List
+
+from catalog import SupermarketCatalog
+from model_objects import Product
+
+
+class SkuCatalog(SupermarketCatalog):
+    """
+    In-memory catalog indexed by integer SKU.
+
+    Each SKU is given a dense internal ordinal, and prices live in an array indexed
+    by that ordinal, so a price lookup is one integer hash plus an array access.
+    Products stay reachable by name through the secondary `products` index.
+    """
+
+    def __init__(self):
+        self._ordinals: Dict[int, int] = {}  # SKU -> ordinal
+        self._catalog_products: List[Product] = []  # ordinal -> product
+        self._prices = array("d")  # ordinal -> unit price
+        self.products: Dict[str, Product] = {}  # name -> product, secondary index
+        self._max_sku = 0
+
+    def add_product(self, product: Product, price: float):
+        if product.sku is None:
+            raise ValueError(f"Product '{product.name}' has no SKU")
+        ordinal = self._ordinals.get(product.sku)
+        if ordinal is None:
+            self._ordinals[product.sku] = len(self._prices)
+            self._catalog_products.append(product)
+            self._prices.append(price)
+            self._max_sku = max(self._max_sku, product.sku)
+        else:
+            previous = self._catalog_products[ordinal]
+            if self.products.get(previous.name) is previous:
+                del self.products[previous.name]
+            self._catalog_products[ordinal] = product
+            self._prices[ordinal] = price
+        self.products[product.name] = product
+
+    def unit_price(self, product: Product) -> float:
+        return self._prices[self._ordinals[product.sku]]
+
+    def unit_prices(self, products: Iterable[Product]) -> Dict[Product, float]:
+        prices = self._prices
+        ordinals = self._ordinals
+        return {product: prices[ordinals[product.sku]] for product in products}
+
+    def ordinal(self, product: Product) -> int:
+        """
+        The dense internal index of a product, usable to index price-sized arrays.
+        """
+        return self._ordinals[product.sku]
+
+    def product_with_sku(self, sku: int) -> Product:
+        return self._catalog_products[self._ordinals[sku]]
+
+    def next_sku(self) -> int:
+        """
+        A SKU not used in this catalog yet, for products entered without a barcode.
+        """
+        return self._max_sku + 1
+
+    def __len__(self) -> int:
+        return len(self._prices)
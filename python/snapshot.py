@@ -0,0 +1,225 @@
+"""
+Compact binary snapshots of shopping carts and receipts.
+
+A snapshot stores every distinct product once in a product dictionary and
+the lines as struct-packed columns referring to it, instead of pickling an
+object graph. Each column uses the narrowest array type holding its values
+exactly, e.g. one byte per product index in a small cart. Decoding casts the
+columns straight out of the buffer with memoryview, without copying them.
+
+How much smaller than a pickle depends on the values: float prices and
+quantities take 8 bytes each, so a 1000-line receipt with float money is
+about three quarters of its pickle size; with integer minor-unit money the
+prices pack into narrower integer columns and it is about two thirds.
+
+Layout (little endian):
+    header     magic 8s, version u16, pad u16, product count u32, line count u32,
+               discount count u32, strings size u32
+    products   count x (name offset u32, name length u16, unit u8, has sku u8, sku i64)
+    columns    each an array typecode byte followed by the packed values:
+               cart      line product, line quantity
+               receipt   line product, quantity, price, total price,
+                         discount product, description offset, description length, amount
+    strings    UTF-8 product names and discount descriptions, concatenated
+"""
+import struct
+import sys
+from array import array
+from typing import Dict, List, Sequence, Tuple, Union
+
+from model_objects import PRODUCTS, Discount, Product, ProductTable, ProductUnit
+
+CART_MAGIC = b"SRCART\0\0"
+RECEIPT_MAGIC = b"SRRCPT\0\0"
+VERSION = 1
+
+_HEADER = struct.Struct("<8sHxxIIII")
+_PRODUCT = struct.Struct("<IHBBq")
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+# Candidate column types, narrowest first
+_UNSIGNED_TYPECODES = ("B", "H", "I", "Q")
+_SIGNED_TYPECODES = ("b", "h", "i", "q")
+_FLOAT_TYPECODES = ("f", "d")
+_TYPECODES = frozenset(_UNSIGNED_TYPECODES + _SIGNED_TYPECODES + _FLOAT_TYPECODES)
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+class _Writer:
+    """
+    Collects the product dictionary and strings while the columns are laid out.
+    """
+
+    def __init__(self):
+        self.product_index: Dict[Product, int] = {}
+        self.strings = bytearray()
+
+    def product(self, product: Product) -> int:
+        index = self.product_index.get(product)
+        if index is None:
+            index = self.product_index[product] = len(self.product_index)
+        return index
+
+    def string(self, text: str) -> Tuple[int, int]:
+        encoded = text.encode("utf-8")
+        offset = len(self.strings)
+        self.strings += encoded
+        return offset, len(encoded)
+
+    def products(self) -> bytes:
+        records = bytearray()
+        for product in self.product_index:
+            offset, length = self.string(product.name)
+            has_sku = product.sku is not None
+            records += _PRODUCT.pack(offset, length, product.unit.value, has_sku, product.sku if has_sku else 0)
+        return bytes(records)
+
+
+def cart_to_bytes(lines: Sequence[Tuple[Product, float]]) -> bytes:
+    """
+    Encodes cart lines, in scan order.
+    """
+    writer = _Writer()
+    product_ids = [writer.product(product) for product, _ in lines]
+    products = writer.products()
+    header = _HEADER.pack(CART_MAGIC, VERSION, len(writer.product_index), len(lines), 0, len(writer.strings))
+    return b"".join((header, products, _column_bytes(product_ids),
+                     _column_bytes([quantity for _, quantity in lines]), bytes(writer.strings)))
+
+
+def cart_from_bytes(data: Buffer, table: ProductTable = PRODUCTS) -> List[Tuple[Product, float]]:
+    """
+    Decodes the (product, quantity) lines of a cart snapshot.
+    :param table: Table the products are interned in, the process-wide one by default
+    """
+    reader = _Reader(data, CART_MAGIC)
+    product_ids = reader.column(reader.line_count)
+    quantities = reader.column(reader.line_count)
+    products = reader.products(table)
+    return [(products[index], quantity) for index, quantity in zip(product_ids, quantities)]
+
+
+def receipt_to_bytes(receipt) -> bytes:
+    """
+    Encodes a receipt's items and discounts.
+    """
+    writer = _Writer()
+    items = receipt.items
+    discounts = receipt.discounts
+    product_ids = [writer.product(item.product) for item in items]
+    discount_product_ids = [writer.product(discount.product) for discount in discounts]
+    products = writer.products()
+    descriptions = [writer.string(discount.description) for discount in discounts]
+    header = _HEADER.pack(RECEIPT_MAGIC, VERSION, len(writer.product_index), len(items), len(discounts),
+                          len(writer.strings))
+    return b"".join((
+        header, products,
+        _column_bytes(product_ids),
+        _column_bytes([item.quantity for item in items]),
+        _column_bytes([item.price for item in items]),
+        _column_bytes([item.total_price for item in items]),
+        _column_bytes(discount_product_ids),
+        _column_bytes([offset for offset, _ in descriptions]),
+        _column_bytes([length for _, length in descriptions]),
+        _column_bytes([discount.discount_amount for discount in discounts]),
+        bytes(writer.strings),
+    ))
+
+
+def receipt_from_bytes(data: Buffer, receipt, table: ProductTable = PRODUCTS):
+    """
+    Decodes a receipt snapshot into an empty receipt, adding items and discounts in their original order.
+    :param table: Table the products are interned in, the process-wide one by default
+    """
+    reader = _Reader(data, RECEIPT_MAGIC)
+    line_count, discount_count = reader.line_count, reader.discount_count
+    product_ids = reader.column(line_count)
+    quantities = reader.column(line_count)
+    prices = reader.column(line_count)
+    totals = reader.column(line_count)
+    discount_product_ids = reader.column(discount_count)
+    offsets = reader.column(discount_count)
+    lengths = reader.column(discount_count)
+    amounts = reader.column(discount_count)
+    products = reader.products(table)
+
+    for index, quantity, price, total in zip(product_ids, quantities, prices, totals):
+        receipt.add_product(products[index], quantity, price, total)
+    for index, offset, length, amount in zip(discount_product_ids, offsets, lengths, amounts):
+        receipt.add_discount(Discount(products[index], reader.string(offset, length), amount))
+    return receipt
+
+
+class _Reader:
+
+    def __init__(self, data: Buffer, magic: bytes):
+        self._view = memoryview(data).cast("B")
+        if len(self._view) < _HEADER.size:
+            raise ValueError("Not a snapshot: too short")
+        (found, version, self._product_count, self.line_count, self.discount_count,
+         strings_size) = _HEADER.unpack_from(self._view)
+        if found != magic:
+            raise ValueError(f"Not a {magic.rstrip(bytes(1)).decode('ascii')} snapshot")
+        if version != VERSION:
+            raise ValueError(f"Unsupported snapshot version {version}, expected {VERSION}")
+        self._products_offset = _HEADER.size
+        self._offset = self._products_offset + self._product_count * _PRODUCT.size
+        self._strings_offset = len(self._view) - strings_size
+
+    def column(self, count: int):
+        if self._offset >= self._strings_offset:
+            raise ValueError("Truncated snapshot")
+        typecode = chr(self._view[self._offset])
+        if typecode not in _TYPECODES:
+            raise ValueError(f"Corrupt snapshot: unknown column type {typecode!r}")
+        start = self._offset + 1
+        end = start + count * array(typecode).itemsize
+        if end > self._strings_offset:
+            raise ValueError("Truncated snapshot")
+        self._offset = end
+        column = self._view[start:end]
+        if _LITTLE_ENDIAN:
+            return column.cast(typecode)
+        values = array(typecode)
+        values.frombytes(column)
+        values.byteswap()
+        return values
+
+    def string(self, offset: int, length: int) -> str:
+        start = self._strings_offset + offset
+        return str(self._view[start:start + length], "utf-8")
+
+    def products(self, table: ProductTable) -> List[Product]:
+        products = []
+        for number in range(self._product_count):
+            offset, length, unit, has_sku, sku = _PRODUCT.unpack_from(
+                self._view, self._products_offset + number * _PRODUCT.size)
+            products.append(table.intern(self.string(offset, length), ProductUnit(unit), sku if has_sku else None))
+        return products
+
+
+def _column_bytes(values: list) -> bytes:
+    """
+    A column as its typecode byte followed by the values packed in the narrowest exact array type.
+    """
+    column = _narrowest(values)
+    if not _LITTLE_ENDIAN:
+        column.byteswap()
+    return column.typecode.encode("ascii") + column.tobytes()
+
+
+def _narrowest(values: list) -> array:
+    if all(type(value) is int for value in values):
+        typecodes: Tuple[str, ...] = _SIGNED_TYPECODES if values and min(values) < 0 else _UNSIGNED_TYPECODES
+    else:
+        typecodes = _FLOAT_TYPECODES
+    for typecode in typecodes:
+        try:
+            column = array(typecode, values)
+        except OverflowError:
+            continue
+        # Float columns are only narrowed when every value survives the round trip
+        if typecode != "f" or column.tolist() == values:
+            return column
+    raise ValueError("Value out of range for a snapshot column")
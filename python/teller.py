@@ -1,23 +1,143 @@
-from model_objects import Offer, Product, SpecialOfferType
+import time
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from bundle_matcher import MultiProductOffer
+from model_objects import BundleOffer, GroupOffer, Offer, Product, ScheduledOffer, SpecialOfferType
+from money import FLOAT_MONEY
+from offer_schedule import OfferSchedule
+from open_carts import OpenCarts, ReceiptDelta
+from pricing_plan import PricingPlan
 from receipt import Receipt
+from receipt_journal import ReceiptJournal
 from shopping_cart import ShoppingCart
 from catalog import SupermarketCatalog
+from instrumentation import InstrumentedCatalog, Metrics, TimedOffer
 
 
 class Teller:
-    def __init__(self, catalog: SupermarketCatalog):
+    def __init__(self, catalog: SupermarketCatalog, money=FLOAT_MONEY, metrics: Optional[Metrics] = None,
+                 clock: Callable[[], float] = time.time, journal: Optional[ReceiptJournal] = None):
+        """
+        :param catalog: Catalog to resolve unit prices from
+        :param money: Money policy for prices, totals and discounts, e.g. CENTS for exact integer minor units
+        :param metrics: Optional metrics registry; when given, checkout phases, catalog calls,
+                        offer evaluations and receipt sizes are recorded
+        :param clock: Current time in seconds since the epoch, deciding which scheduled offers are active
+        :param journal: Optional journal every receipt is durably recorded in before checkout returns
+        """
+        self.metrics = metrics
+        if metrics is not None:
+            catalog = InstrumentedCatalog(catalog, metrics)
         self.catalog = catalog
+        self.money = money
         self.offers: dict[Product, Offer] = {}
+        self.combinable_offers: dict[Product, list[Offer]] = {}
+        self.bundle_offers: list[MultiProductOffer] = []
+        self.schedule = OfferSchedule()
+        self.clock = clock
+        self.journal = journal
+        self.open_carts = OpenCarts()
+        self._pricing_plan: Optional[PricingPlan] = None
+        self._active_offers: Mapping[Product, Sequence[Offer]] = {}
+        self._active_scheduled: Dict[Product, Tuple[Offer, ...]] = {}
+        # The plan stays valid until a scheduled offer starts or ends
+        self._plan_valid_from = float("-inf")
+        self._plan_valid_until = float("inf")
+
+    @property
+    def pricing_plan(self) -> PricingPlan:
+        """
+        The compiled offers, built on first use and rebuilt after offers change
+        or when a scheduled offer starts or ends.
+        """
+        plan = self._pricing_plan
+        if plan is None or (self.schedule and not self._plan_valid_from <= self.clock() < self._plan_valid_until):
+            plan = self._build_pricing_plan()
+        return plan
+
+    @property
+    def active_offers(self) -> Mapping[Product, Sequence[Offer]]:
+        """
+        The offers of each product in the last built pricing plan, scheduled ones included.
+        """
+        return self._active_offers
+
+    def _build_pricing_plan(self) -> PricingPlan:
+        changed = []
+        offers = {product: [offer] for product, offer in self.offers.items()}
+        for product, combinable in self.combinable_offers.items():
+            offers[product] = offers.get(product, []) + combinable
+        if self.schedule:
+            now = self.clock()
+            self._plan_valid_from, self._plan_valid_until = self.schedule.window_at(now)
+            active = self.schedule.active_at(now)
+            changed = [product for product in active.keys() | self._active_scheduled.keys()
+                       if active.get(product) != self._active_scheduled.get(product)]
+            self._active_scheduled = active
+            for product, scheduled in active.items():
+                # A scheduled offer replaces the product's standing offer of the same type
+                types = {offer.offer_type for offer in scheduled}
+                offers[product] = [offer for offer in offers.get(product, ()) if offer.offer_type not in types]
+                offers[product].extend(scheduled)
+
+        plan = PricingPlan(offers, self.money, self.bundle_offers)
+        if self.metrics is not None:
+            plan = plan.with_rules(lambda rule: TimedOffer(rule, self.metrics))
+        self._pricing_plan = plan
+        self._active_offers = offers
+        for product in changed:
+            self.open_carts.reprice(product)
+        return plan
 
     def add_special_offer(self, offer_type: SpecialOfferType, product: Product, argument: float):
         """
         Register a special offer (e.g., 3-for-2, 10% off) for a specific product.
+        A product has one special offer; registering another replaces it.
+        Open carts holding the product are re-priced.
         :param offer_type: Type of offer from the enum
         :param product: Product object to apply the offer to
         :param argument: Numeric argument depending on the offer type:
                          - discount percentage for TEN_PERCENT_DISCOUNT
                          - price for x-for-amount offers
         """
+        self._validate_offer(offer_type, argument)
+        self.offers[product] = Offer(offer_type, product, argument)
+        self._pricing_plan = None
+        self.open_carts.reprice(product)
+
+    def add_combinable_offer(self, offer_type: SpecialOfferType, product: Product, argument: float,
+                             stackable: bool = False):
+        """
+        Register an offer that combines with the product's special offer and its other combinable offers.
+        A product can have one combinable offer of each type; registering the same type again replaces it.
+        Competing offers share the product's units, each cart getting the split that saves the most;
+        stackable offers apply to the whole quantity on top. Open carts holding the product are re-priced.
+        :param stackable: Apply this offer to the whole quantity on top of the other offers
+        """
+        self._validate_offer(offer_type, argument)
+        offers = [offer for offer in self.combinable_offers.get(product, ()) if offer.offer_type != offer_type]
+        offers.append(Offer(offer_type, product, argument, stackable))
+        self.combinable_offers[product] = offers
+        self._pricing_plan = None
+        self.open_carts.reprice(product)
+
+    def add_scheduled_offer(self, offer_type: SpecialOfferType, product: Product, argument: float,
+                            start: float, end: float, stackable: bool = False) -> ScheduledOffer:
+        """
+        Register an offer valid only from start to end, e.g. a happy hour or a weekly flyer.
+        While active it replaces the product's standing offer of the same type.
+        :param start: When the offer starts, in seconds since the epoch (inclusive)
+        :param end: When the offer ends, in seconds since the epoch (exclusive)
+        """
+        self._validate_offer(offer_type, argument)
+        scheduled = ScheduledOffer(Offer(offer_type, product, argument, stackable), start, end)
+        self.schedule.add(scheduled)
+        # The rebuilt plan re-prices open carts for the products whose active offers changed
+        self._pricing_plan = None
+        return scheduled
+
+    @staticmethod
+    def _validate_offer(offer_type: SpecialOfferType, argument: float):
         if offer_type == SpecialOfferType.TEN_PERCENT_DISCOUNT:
             if argument < 0 or argument > 100:
                 raise ValueError("Discount percentage must be between 0 and 100")
@@ -29,22 +149,136 @@ class Teller:
             if argument != 0:  # no argument needed
                 raise ValueError("3-for-2 offer should have argument = 0")
 
-        self.offers[product] = Offer(offer_type, product, argument)
+    def update_price(self, product: Product, price: float) -> List[ReceiptDelta]:
+        """
+        Changes a product's price in the catalog and re-prices the open carts holding it.
+        :return: One delta per open cart whose receipt changed
+        """
+        self.catalog.add_product(product, price)
+        return self.open_carts.reprice(product)
+
+    def add_bundle_offer(self, components: Mapping[Product, int], price: float) -> BundleOffer:
+        """
+        Register a bundle: the given units of several products sold together for one price.
+        Bundles are matched before per-product offers, which then apply to the units left over.
+        :param components: Product -> units per bundle, e.g. {toothbrush: 1, toothpaste: 1}
+        :param price: Price of the whole bundle
+        """
+        if not components:
+            raise ValueError("A bundle needs at least one product")
+        if any(units <= 0 or units != int(units) for units in components.values()):
+            raise ValueError("Bundle units must be positive whole numbers")
+        if price <= 0:
+            raise ValueError("Offer price must be positive")
+
+        offer = BundleOffer(tuple((product, int(units)) for product, units in components.items()), price)
+        self.bundle_offers.append(offer)
+        self._pricing_plan = None
+        return offer
+
+    def add_group_offer(self, name: str, products: Iterable[Product], size: int, price: float) -> GroupOffer:
+        """
+        Register a mix-and-match offer: any `size` units from the group of products for one price.
+        The most expensive units in the cart are put into the group first.
+        :param name: Name of the group shown on the receipt, e.g. "yoghurts"
+        """
+        products = tuple(dict.fromkeys(products))
+        if not products:
+            raise ValueError("A group offer needs at least one product")
+        if size <= 0 or size != int(size):
+            raise ValueError("Group size must be a positive whole number")
+        if price <= 0:
+            raise ValueError("Offer price must be positive")
+
+        offer = GroupOffer(name, products, int(size), price)
+        self.bundle_offers.append(offer)
+        self._pricing_plan = None
+        return offer
+
+    def new_cart(self) -> ShoppingCart:
+        """
+        Creates a cart that keeps a running total with this teller's prices and offers.
+        The cart stays in open_carts, re-priced on offer and price changes, until it is closed.
+        """
+        return ShoppingCart(self)
 
     def checks_out_articles_from(self, the_cart: ShoppingCart) -> Receipt:
         """
         Creates a receipt by calculating prices for each product and applying discounts.
+        With a journal, the receipt is durable when this returns.
+        :param the_cart: A ShoppingCart, or a ColumnarCart for very large orders
+        """
+        receipt = self._checks_out(the_cart)
+        if self.journal is not None:
+            self._journal_receipts([receipt])
+        return receipt
+
+    def _checks_out(self, the_cart: ShoppingCart) -> Receipt:
+        if self.metrics is not None:
+            return self._checks_out_instrumented(the_cart)
+
+        # Each distinct product is priced exactly once per checkout
+        unit_prices = self.money.prices(self.catalog.unit_prices(the_cart.product_quantities))
+        return self._build_receipt(the_cart, unit_prices)
+
+    def _build_receipt(self, the_cart: ShoppingCart, unit_prices: dict) -> Receipt:
+        """
+        Prices the cart lines and applies offers with already resolved unit prices.
+        :param unit_prices: Product -> unit price, in this teller's money representation
         """
         receipt = Receipt()
-        for pq in the_cart.items:
-            product = pq.product
-            quantity = pq.quantity
+        self._add_lines(receipt, the_cart, unit_prices)
+        the_cart.handle_offers(receipt, self.pricing_plan, self.catalog, unit_prices)
+        return receipt
 
-            unit_price = self.catalog.unit_price(product)
-            total_price = quantity * unit_price
+    def _add_lines(self, receipt: Receipt, the_cart: ShoppingCart, unit_prices: dict):
+        line_total = self.money.line_total
+        for product, quantity in the_cart.lines():
+            unit_price = unit_prices[product]
+            total_price = line_total(quantity, unit_price)
 
             receipt.add_product(product, quantity, unit_price, total_price)
 
-        the_cart.handle_offers(receipt, self.offers, self.catalog)
-
+    def _checks_out_instrumented(self, the_cart: ShoppingCart) -> Receipt:
+        """
+        Same as checks_out_articles_from, recording the duration of each checkout phase.
+        """
+        metrics = self.metrics
+        with metrics.timer("checkout_seconds"):
+            with metrics.timer("checkout_phase_seconds", phase="price_resolution"):
+                unit_prices = self.money.prices(self.catalog.unit_prices(the_cart.product_quantities))
+            receipt = Receipt()
+            with metrics.timer("checkout_phase_seconds", phase="line_pricing"):
+                self._add_lines(receipt, the_cart, unit_prices)
+            plan = self.pricing_plan
+            with metrics.timer("checkout_phase_seconds", phase="handle_offers"):
+                the_cart.handle_offers(receipt, plan, self.catalog, unit_prices)
+        metrics.observe("receipt_lines", len(receipt.items), metrics.size_buckets)
+        metrics.observe("receipt_discounts", len(receipt.discounts), metrics.size_buckets)
         return receipt
+
+    def _journal_receipts(self, receipts: List[Receipt]):
+        if self.metrics is None:
+            self.journal.append_many(receipts)
+            return
+        with self.metrics.timer("checkout_phase_seconds", phase="journal"):
+            self.journal.append_many(receipts)
+
+    def checks_out_many(self, carts: Iterable[ShoppingCart]) -> List[Receipt]:
+        """
+        Checks out a whole batch of carts with vectorized NumPy pricing.
+        Produces the same receipts as calling checks_out_articles_from on each cart;
+        tellers using integer minor-unit money or bundle offers are checked out cart by cart.
+        :param carts: Shopping carts to check out
+        :return: One receipt per cart, in order, all durable on return with a journal
+        """
+        if self.money is not FLOAT_MONEY or self.bundle_offers:
+            receipts = [self._checks_out(cart) for cart in carts]
+        else:
+            # Imported lazily so NumPy is only needed by callers of the batch engine
+            from batch_checkout import checks_out_many
+            receipts = checks_out_many(self, carts)
+        if self.journal is not None:
+            # The whole batch shares one commit
+            self._journal_receipts(receipts)
+        return receipts
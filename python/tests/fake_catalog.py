@@ -13,3 +13,7 @@ class FakeCatalog(SupermarketCatalog):
     def unit_price(self, product):
         return self.prices[product.name]
 
+    def unit_prices(self, products):
+        prices = self.prices
+        return {product: prices[product.name] for product in products}
+
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from async_teller import AsyncSupermarketCatalog, AsyncTeller
+from model_objects import Product, ProductUnit, SpecialOfferType
+from shopping_cart import ShoppingCart
+from teller import Teller
+from tests.fake_catalog import FakeCatalog
+
+
+class FakeAsyncCatalog(AsyncSupermarketCatalog):
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lookups = 0
+
+    async def unit_price(self, product):
+        self.lookups += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        return self.catalog.unit_price(product)
+
+
+def create_cart():
+    catalog = FakeCatalog()
+    products = [Product(f"product {n}", ProductUnit.EACH) for n in range(10)]
+    for n, product in enumerate(products):
+        catalog.add_product(product, 1.0 + n / 10)
+
+    cart = ShoppingCart()
+    for product in products:
+        cart.add_item_quantity(product, 3)
+        cart.add_item(products[0])
+    return catalog, products, cart
+
+
+def test_async_checkout_matches_sync_checkout():
+    catalog, products, cart = create_cart()
+    async_catalog = FakeAsyncCatalog(catalog)
+    async_teller = AsyncTeller(async_catalog, max_concurrency=4)
+    sync_teller = Teller(catalog)
+    for teller in (async_teller.teller, sync_teller):
+        teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, products[1], 0)
+
+    receipt = asyncio.run(async_teller.checks_out_articles_from(cart))
+    expected = sync_teller.checks_out_articles_from(cart)
+
+    assert receipt.items == expected.items
+    assert receipt.discounts == expected.discounts
+    assert receipt.total_price() == pytest.approx(expected.total_price())
+    assert async_catalog.lookups == 10
+    assert 1 < async_catalog.max_in_flight <= 4
+
+
+def test_async_batch_prices_each_product_once():
+    catalog, _, cart = create_cart()
+    async_catalog = FakeAsyncCatalog(catalog)
+    teller = AsyncTeller(async_catalog, max_concurrency=None)
+
+    receipts = asyncio.run(teller.checks_out_many([cart, cart, cart]))
+
+    assert len(receipts) == 3
+    assert async_catalog.lookups == 10
+
+
+def test_async_teller_only_prices_through_the_async_catalog():
+    catalog, products, cart = create_cart()
+    teller = AsyncTeller(FakeAsyncCatalog(catalog))
+
+    assert not isinstance(teller, Teller)
+    with pytest.raises(TypeError):
+        teller.teller.checks_out_articles_from(cart)
+    with pytest.raises(TypeError):
+        teller.teller.update_price(products[0], 2.0)
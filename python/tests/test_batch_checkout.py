@@ -0,0 +1,66 @@
+import pytest
+
+from model_objects import Product, ProductUnit, SpecialOfferType
+from shopping_cart import ShoppingCart
+from teller import Teller
+from tests.fake_catalog import FakeCatalog
+
+pytest.importorskip("numpy")
+
+
+def create_teller_with_offers():
+    catalog = FakeCatalog()
+    toothbrush = Product("toothbrush", ProductUnit.EACH)
+    apples = Product("apples", ProductUnit.KILO)
+    cereal = Product("cereal", ProductUnit.EACH)
+    gum = Product("gum", ProductUnit.EACH)
+    rice = Product("rice", ProductUnit.EACH)
+
+    catalog.add_product(toothbrush, 0.99)
+    catalog.add_product(apples, 1.99)
+    catalog.add_product(cereal, 4.50)
+    catalog.add_product(gum, 0.75)
+    catalog.add_product(rice, 2.49)
+
+    teller = Teller(catalog)
+    teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, gum, 0)
+    teller.add_special_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, apples, 20.0)
+    teller.add_special_offer(SpecialOfferType.TWO_FOR_AMOUNT, toothbrush, 1.5)
+    teller.add_special_offer(SpecialOfferType.FIVE_FOR_AMOUNT, cereal, 18.0)
+
+    return teller, toothbrush, apples, cereal, gum, rice
+
+
+def receipt_snapshot(receipt):
+    items = [(i.product.name, i.quantity, i.price, i.total_price) for i in receipt.items]
+    discounts = [(d.product.name, d.description, d.discount_amount) for d in receipt.discounts]
+    return items, discounts, receipt.total_price()
+
+
+def test_batch_matches_scalar_checkout():
+    teller, toothbrush, apples, cereal, gum, rice = create_teller_with_offers()
+
+    carts = []
+    for n in range(12):
+        cart = ShoppingCart()
+        cart.add_item_quantity(gum, n % 5 + 1)
+        cart.add_item_quantity(toothbrush, n % 3 + 1)
+        cart.add_item_quantity(apples, 0.5 + n / 4)
+        if n:
+            cart.add_item_quantity(cereal, n)
+        else:
+            cart.add_item(rice)
+        cart.add_item_quantity(gum, 2)
+        carts.append(cart)
+    carts.append(ShoppingCart())
+
+    batch = teller.checks_out_many(carts)
+    scalar = [teller.checks_out_articles_from(cart) for cart in carts]
+
+    assert [receipt_snapshot(r) for r in batch] == [receipt_snapshot(r) for r in scalar]
+
+
+def test_batch_of_no_carts():
+    teller, *_ = create_teller_with_offers()
+
+    assert teller.checks_out_many([]) == []
@@ -0,0 +1,43 @@
+import json
+
+import benchmarks
+from benchmarks import MAX_PRODUCT_LOOKUP_OVERHEAD, compare_results, main, run_benchmarks
+
+
+def test_every_stage_is_timed_per_size_and_mix():
+    results = run_benchmarks([10, 50], ["none", "mixed"], repeat=1)
+
+    assert len(results) == 2 * 2 * 4
+    assert {r["benchmark"] for r in results} == {"checks_out_articles_from", "handle_offers",
+                                                 "total_price", "print_receipt"}
+    assert all(r["seconds"] >= 0 for r in results)
+
+
+def test_regressions_beyond_tolerance_are_flagged():
+    baseline = [{"benchmark": "print_receipt", "offer_mix": "none", "lines": 10, "seconds": 1.0},
+                {"benchmark": "total_price", "offer_mix": "none", "lines": 10, "seconds": 1.0}]
+    results = [{"benchmark": "print_receipt", "offer_mix": "none", "lines": 10, "seconds": 1.5},
+               {"benchmark": "total_price", "offer_mix": "none", "lines": 10, "seconds": 1.1}]
+
+    regressions = compare_results(results, baseline, tolerance=0.15)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("print_receipt")
+
+
+def test_results_are_written_and_compared(tmp_path, monkeypatch):
+    monkeypatch.setattr(benchmarks, "product_lookup_overhead", lambda: 1.0)
+    output = tmp_path / "bench.json"
+
+    assert main(["--sizes", "10", "--mixes", "percent", "--repeat", "1", "--output", str(output)]) == 0
+    assert json.loads(output.read_text())["results"][0]["lines"] == 10
+    assert main(["--sizes", "10", "--mixes", "percent", "--repeat", "1",
+                 "--compare", str(output), "--tolerance", "1000"]) == 0
+
+
+def test_results_are_written_before_a_lookup_regression_fails_the_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(benchmarks, "product_lookup_overhead", lambda: MAX_PRODUCT_LOOKUP_OVERHEAD + 1)
+    output = tmp_path / "bench.json"
+
+    assert main(["--sizes", "10", "--mixes", "none", "--repeat", "1", "--output", str(output)]) == 1
+    assert json.loads(output.read_text())["results"]
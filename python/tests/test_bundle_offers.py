@@ -0,0 +1,168 @@
+import pytest
+
+from model_objects import Product, ProductUnit, SpecialOfferType
+from shopping_cart import ShoppingCart
+from teller import Teller
+from tests.fake_catalog import FakeCatalog
+
+
+def create_teller():
+    catalog = FakeCatalog()
+    toothbrush = Product("toothbrush", ProductUnit.EACH)
+    toothpaste = Product("toothpaste", ProductUnit.EACH)
+    plain = Product("plain yoghurt", ProductUnit.EACH)
+    fruit = Product("fruit yoghurt", ProductUnit.EACH)
+    greek = Product("greek yoghurt", ProductUnit.EACH)
+    catalog.add_product(toothbrush, 0.99)
+    catalog.add_product(toothpaste, 1.79)
+    catalog.add_product(plain, 0.50)
+    catalog.add_product(fruit, 0.80)
+    catalog.add_product(greek, 1.20)
+    return Teller(catalog), toothbrush, toothpaste, plain, fruit, greek
+
+
+def test_bundle_discount_is_price_of_parts_minus_bundle_price():
+    teller, toothbrush, toothpaste, *_ = create_teller()
+    teller.add_bundle_offer({toothbrush: 1, toothpaste: 1}, 2.00)
+    cart = ShoppingCart()
+    cart.add_item_quantity(toothbrush, 2)
+    cart.add_item(toothpaste)
+
+    receipt = teller.checks_out_articles_from(cart)
+
+    assert len(receipt.discounts) == 1
+    discount = receipt.discounts[0]
+    assert discount.description == "toothbrush + toothpaste for 2.0"
+    assert discount.discount_amount == pytest.approx(-(0.99 + 1.79 - 2.00))
+    assert receipt.total_price() == pytest.approx(0.99 + 2.00)
+
+
+def test_group_offer_uses_most_expensive_units():
+    teller, _, _, plain, fruit, greek = create_teller()
+    teller.add_group_offer("yoghurts", [plain, fruit, greek], 3, 2.00)
+    cart = ShoppingCart()
+    cart.add_item_quantity(plain, 2)
+    cart.add_item_quantity(fruit, 1)
+    cart.add_item_quantity(greek, 2)
+
+    receipt = teller.checks_out_articles_from(cart)
+
+    # greek, greek, fruit go in the group; both plain yoghurts are paid in full
+    assert receipt.discounts[0].description == "any 3 yoghurts for 2.0"
+    assert receipt.discounts[0].discount_amount == pytest.approx(-(1.20 * 2 + 0.80 - 2.00))
+    assert receipt.total_price() == pytest.approx(2.00 + 0.50 * 2)
+
+
+def test_units_left_over_from_bundles_get_per_product_offers():
+    teller, toothbrush, toothpaste, *_ = create_teller()
+    teller.add_bundle_offer({toothbrush: 1, toothpaste: 1}, 2.00)
+    teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0)
+    cart = ShoppingCart()
+    cart.add_item_quantity(toothbrush, 4)
+    cart.add_item(toothpaste)
+
+    receipt = teller.checks_out_articles_from(cart)
+
+    # One toothbrush goes into the bundle, the other three are 3-for-2
+    assert [d.description for d in receipt.discounts] == ["toothbrush + toothpaste for 2.0", "3 for 2"]
+    assert receipt.total_price() == pytest.approx(2.00 + 2 * 0.99)
+
+
+def test_bundles_not_touching_the_cart_are_ignored():
+    teller, toothbrush, toothpaste, plain, *_ = create_teller()
+    others = [Product(f"product {i}", ProductUnit.EACH) for i in range(500)]
+    for i, product in enumerate(others):
+        teller.catalog.add_product(product, 1.0)
+        teller.add_bundle_offer({product: 1, others[i - 1]: 1}, 1.5)
+    teller.add_bundle_offer({toothbrush: 1, toothpaste: 1}, 2.00)
+    cart = ShoppingCart()
+    cart.add_item(toothbrush)
+    cart.add_item(toothpaste)
+    cart.add_item(plain)
+
+    receipt = teller.checks_out_articles_from(cart)
+
+    assert [d.description for d in receipt.discounts] == ["toothbrush + toothpaste for 2.0"]
+
+
+def test_running_total_with_bundles_matches_receipt():
+    teller, toothbrush, toothpaste, plain, fruit, greek = create_teller()
+    teller.add_bundle_offer({toothbrush: 1, toothpaste: 1}, 2.00)
+    teller.add_group_offer("yoghurts", [plain, fruit, greek], 3, 2.00)
+    cart = teller.new_cart()
+
+    for product in [toothbrush, greek, plain, toothpaste, fruit, greek, toothbrush]:
+        cart.add_item(product)
+        assert cart.running_total == pytest.approx(teller.checks_out_articles_from(cart).total_price())
+
+
+def test_bundle_offers_are_validated():
+    teller, toothbrush, toothpaste, plain, *_ = create_teller()
+    with pytest.raises(ValueError):
+        teller.add_bundle_offer({toothbrush: 0, toothpaste: 1}, 2.00)
+    with pytest.raises(ValueError):
+        teller.add_bundle_offer({toothbrush: 1}, 0)
+    with pytest.raises(ValueError):
+        teller.add_group_offer("yoghurts", [plain], 0, 1.0)
+
+
+def create_three_for_two_teller():
+    catalog = FakeCatalog()
+    toothbrush = Product("toothbrush", ProductUnit.EACH)
+    toothpaste = Product("toothpaste", ProductUnit.EACH)
+    catalog.add_product(toothbrush, 1.00)
+    catalog.add_product(toothpaste, 1.00)
+    teller = Teller(catalog)
+    teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0)
+    cart = ShoppingCart()
+    cart.add_item_quantity(toothbrush, 3)
+    cart.add_item_quantity(toothpaste, 3)
+    return teller, toothbrush, toothpaste, cart
+
+
+def test_bundle_never_breaks_a_per_product_offer_saving_more():
+    teller, toothbrush, toothpaste, cart = create_three_for_two_teller()
+    assert teller.checks_out_articles_from(cart).total_price() == pytest.approx(5.00)
+
+    teller.add_bundle_offer({toothbrush: 1, toothpaste: 1}, 1.95)
+    receipt = teller.checks_out_articles_from(cart)
+
+    assert receipt.total_price() == pytest.approx(5.00)
+    assert [discount.description for discount in receipt.discounts] == ["3 for 2"]
+
+
+def test_bundle_replaces_a_per_product_offer_saving_less():
+    teller, toothbrush, toothpaste, cart = create_three_for_two_teller()
+    teller.add_bundle_offer({toothbrush: 1, toothpaste: 1}, 1.00)
+
+    receipt = teller.checks_out_articles_from(cart)
+
+    assert receipt.total_price() == pytest.approx(3.00)
+    assert len(receipt.discounts) == 1 and receipt.discounts[0].product == toothbrush
+
+
+def test_bundles_only_take_units_the_per_product_offer_can_spare():
+    teller, toothbrush, toothpaste, _ = create_three_for_two_teller()
+    teller.add_bundle_offer({toothbrush: 1, toothpaste: 1}, 1.95)
+    cart = teller.new_cart()
+    cart.add_item_quantity(toothbrush, 4)
+    cart.add_item_quantity(toothpaste, 2)
+
+    receipt = teller.checks_out_articles_from(cart)
+
+    # One bundle uses the fourth toothbrush; a second would break the 3 for 2
+    assert receipt.total_price() == pytest.approx(6.00 - 0.05 - 1.00)
+    assert cart.running_total == pytest.approx(receipt.total_price())
+
+
+def test_matched_bundle_discount_is_its_own_saving_not_the_net_one():
+    teller, toothbrush, toothpaste, cart = create_three_for_two_teller()
+    teller.add_bundle_offer({toothbrush: 1, toothpaste: 1}, 0.10)
+    plan = teller.pricing_plan
+
+    discounts, leftover = plan.matcher.match(cart.product_quantities, {toothbrush: 1.00, toothpaste: 1.00},
+                                             plan.rule_for)
+
+    # The first bundle breaks the 3 for 2, but still saves 1.90 like the other two
+    assert [discount.discount_amount for discount in discounts] == [pytest.approx(-3 * 1.90)]
+    assert leftover == {}
@@ -0,0 +1,102 @@
+from caching_catalog import CachingCatalog
+from model_objects import Product, ProductUnit
+from tests.fake_catalog import FakeCatalog
+
+
+class CountingCatalog(FakeCatalog):
+    def __init__(self):
+        super().__init__()
+        self.lookups = 0
+
+    def unit_price(self, product):
+        self.lookups += 1
+        return super().unit_price(product)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def create_catalog():
+    backing = CountingCatalog()
+    apples = Product("apples", ProductUnit.KILO)
+    rice = Product("rice", ProductUnit.EACH)
+    gum = Product("gum", ProductUnit.EACH)
+    backing.add_product(apples, 1.99)
+    backing.add_product(rice, 2.49)
+    backing.add_product(gum, 0.75)
+    return backing, apples, rice, gum
+
+
+def test_repeated_lookups_hit_the_cache():
+    backing, apples, *_ = create_catalog()
+    catalog = CachingCatalog(backing)
+
+    assert catalog.unit_price(apples) == 1.99
+    assert catalog.unit_price(apples) == 1.99
+
+    assert backing.lookups == 1
+    assert (catalog.hits, catalog.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    backing, apples, rice, gum = create_catalog()
+    catalog = CachingCatalog(backing, max_entries=2)
+
+    catalog.unit_price(apples)
+    catalog.unit_price(rice)
+    catalog.unit_price(apples)
+    catalog.unit_price(gum)  # evicts rice
+
+    assert catalog.evictions == 1
+    catalog.unit_price(apples)
+    catalog.unit_price(rice)
+    assert backing.lookups == 4
+
+
+def test_entries_expire_after_ttl():
+    backing, apples, *_ = create_catalog()
+    clock = FakeClock()
+    catalog = CachingCatalog(backing, ttl_seconds=10, clock=clock)
+
+    catalog.unit_price(apples)
+    clock.now = 11
+    catalog.unit_price(apples)
+
+    assert catalog.expirations == 1
+    assert backing.lookups == 2
+
+
+def test_price_change_invalidates_product():
+    backing, apples, *_ = create_catalog()
+    catalog = CachingCatalog(backing)
+
+    catalog.unit_price(apples)
+    catalog.add_product(apples, 2.29)
+
+    assert catalog.unit_price(apples) == 2.29
+
+
+def test_bulk_lookup_fetches_only_misses():
+    backing, apples, rice, gum = create_catalog()
+    catalog = CachingCatalog(backing)
+    catalog.unit_price(apples)
+
+    prices = catalog.unit_prices([apples, rice, gum, rice])
+
+    assert prices == {apples: 1.99, rice: 2.49, gum: 0.75}
+    assert (catalog.hits, catalog.misses) == (1, 3)
+    assert len(catalog) == 3
+
+
+def test_products_by_name_come_from_the_wrapped_catalog():
+    backing, apples, *_ = create_catalog()
+    catalog = CachingCatalog(backing)
+
+    assert catalog.products["apples"] is apples
+    backing.add_product(Product("pears", ProductUnit.KILO), 2.49)
+    assert "pears" in catalog.products
@@ -0,0 +1,204 @@
+import asyncio
+import json
+
+import pytest
+
+from checkout_server import CheckoutClient, CheckoutServer
+from model_objects import Product, ProductUnit, SpecialOfferType
+from receipt_journal import ReceiptJournal, replay
+from teller import Teller
+from tests.fake_catalog import FakeCatalog
+
+
+def create_teller(journal=None):
+    catalog = FakeCatalog()
+    toothbrush = Product("toothbrush", ProductUnit.EACH)
+    apples = Product("apples", ProductUnit.KILO)
+    catalog.add_product(toothbrush, 0.99)
+    catalog.add_product(apples, 1.99)
+    teller = Teller(catalog, journal=journal)
+    teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0)
+    return teller
+
+
+def test_checkout_over_tcp():
+    async def scenario():
+        server = CheckoutServer(create_teller())
+        host, port = await server.start_tcp()
+        client = await CheckoutClient.connect_tcp(host, port)
+        try:
+            return await client.checkout([("toothbrush", 3), ("apples", 0.5)])
+        finally:
+            await client.close()
+            await server.close()
+
+    receipt = asyncio.run(scenario())
+
+    assert receipt["total"] == pytest.approx(2 * 0.99 + 0.5 * 1.99)
+    assert receipt["items"][0] == ["toothbrush", 3, 0.99, pytest.approx(2.97)]
+    assert receipt["discounts"] == [["toothbrush", "3 for 2", pytest.approx(-0.99)]]
+
+
+def test_concurrent_checkouts_are_coalesced_into_batches(tmp_path):
+    async def scenario():
+        server = CheckoutServer(create_teller(), max_batch=16, batch_window=0.05)
+        path = str(tmp_path / "checkout.sock")
+        await server.start_unix(path)
+        clients = [await CheckoutClient.connect_unix(path) for _ in range(4)]
+        try:
+            receipts = await asyncio.gather(*(clients[n % 4].checkout([("toothbrush", n % 5 + 1)])
+                                              for n in range(40)))
+            return receipts, server.stats()
+        finally:
+            for client in clients:
+                await client.close()
+            await server.close()
+
+    receipts, stats = asyncio.run(scenario())
+
+    # Each answer belongs to its own request, even when pipelined on one connection
+    assert [receipt["items"][0][1] for receipt in receipts] == [n % 5 + 1 for n in range(40)]
+    assert stats["requests"] == 40
+    assert stats["batches"] < 40
+    assert 0 < stats["p50_ms"] <= stats["p99_ms"]
+
+
+def test_in_flight_limit_caps_batches():
+    batch_sizes = []
+
+    class CountingTeller(Teller):
+        def checks_out_many(self, carts):
+            batch_sizes.append(len(carts))
+            return super().checks_out_many(carts)
+
+    teller = create_teller()
+    teller.__class__ = CountingTeller
+
+    async def scenario():
+        server = CheckoutServer(teller, max_batch=64, batch_window=0.01, max_in_flight=5)
+        host, port = await server.start_tcp()
+        client = await CheckoutClient.connect_tcp(host, port)
+        try:
+            await asyncio.gather(*(client.checkout([("apples", 1)]) for _ in range(30)))
+            return server.stats()
+        finally:
+            await client.close()
+            await server.close()
+
+    stats = asyncio.run(scenario())
+
+    # Requests beyond the limit are not even read, so no batch can grow past it
+    assert stats["requests"] == 30
+    assert sum(batch_sizes) == 30
+    assert max(batch_sizes) <= 5
+
+
+def test_bad_request_gets_an_error_and_connection_stays_usable():
+    async def scenario():
+        server = CheckoutServer(create_teller())
+        host, port = await server.start_tcp()
+        client = await CheckoutClient.connect_tcp(host, port)
+        try:
+            with pytest.raises(ValueError, match="missing"):
+                await client.checkout([("missing", 1)])
+            with pytest.raises(ValueError, match="Unknown op"):
+                await client.request({"op": "refund"})
+            return await client.checkout([("apples", 2)])
+        finally:
+            await client.close()
+            await server.close()
+
+    receipt = asyncio.run(scenario())
+
+    assert receipt["total"] == pytest.approx(3.98)
+
+
+def test_failing_cart_only_fails_its_own_request():
+    class PriceServiceCatalog(FakeCatalog):
+        def unit_prices(self, products):
+            if any(product.name == "broken" for product in products):
+                # The catalog convention: a plain Exception for a price it cannot give
+                raise Exception("price service failed for broken")
+            return super().unit_prices(products)
+
+    teller = create_teller()
+    catalog = PriceServiceCatalog()
+    catalog.products, catalog.prices = teller.catalog.products, teller.catalog.prices
+    catalog.add_product(Product("broken", ProductUnit.EACH), 1.00)
+    teller.catalog = catalog
+
+    async def scenario():
+        server = CheckoutServer(teller, batch_window=0.05)
+        host, port = await server.start_tcp()
+        client = await CheckoutClient.connect_tcp(host, port)
+        try:
+            return await asyncio.gather(client.checkout([("apples", 1)]), client.checkout([("broken", 1)]),
+                                        client.checkout([("toothbrush", 3)]), return_exceptions=True)
+        finally:
+            await client.close()
+            await server.close()
+
+    apples, failed, toothbrush = asyncio.run(asyncio.wait_for(scenario(), 5))
+
+    assert apples["total"] == pytest.approx(1.99)
+    assert isinstance(failed, ValueError) and "broken" in str(failed)
+    assert toothbrush["total"] == pytest.approx(2 * 0.99)
+
+
+def test_idle_connections_do_not_hold_in_flight_slots():
+    async def scenario():
+        server = CheckoutServer(create_teller(), max_in_flight=2)
+        host, port = await server.start_tcp()
+        idle = [await CheckoutClient.connect_tcp(host, port) for _ in range(2)]
+        client = await CheckoutClient.connect_tcp(host, port)
+        try:
+            return await asyncio.wait_for(client.checkout([("apples", 1)]), 2)
+        finally:
+            for lane in idle + [client]:
+                await lane.close()
+            await server.close()
+
+    assert asyncio.run(scenario())["total"] == pytest.approx(1.99)
+
+
+def test_malformed_line_gets_an_error():
+    async def scenario():
+        server = CheckoutServer(create_teller())
+        host, port = await server.start_tcp()
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            writer.write(b"not json\n[1, 2]\n")
+            return [json.loads(await reader.readline()) for _ in range(2)]
+        finally:
+            writer.close()
+            await server.close()
+
+    responses = asyncio.run(scenario())
+
+    assert [response["id"] for response in responses] == [None, None]
+    assert all("error" in response for response in responses)
+
+
+def test_journaled_batches_are_durable(tmp_path):
+    async def scenario(teller):
+        server = CheckoutServer(teller, batch_window=0.02)
+        host, port = await server.start_tcp()
+        client = await CheckoutClient.connect_tcp(host, port)
+        try:
+            await asyncio.gather(*(client.checkout([("apples", n + 1)]) for n in range(10)))
+        finally:
+            await client.close()
+            await server.close()
+
+    with ReceiptJournal(tmp_path / "journal", commit_latency=0) as journal:
+        asyncio.run(scenario(create_teller(journal)))
+        commits = journal.commits
+
+    quantities = sorted(receipt.items[0].quantity for _, receipt in replay(tmp_path / "journal"))
+    assert quantities == [n + 1 for n in range(10)]
+    assert commits < 10
+
+
+def test_rejects_non_positive_limits():
+    with pytest.raises(ValueError):
+        CheckoutServer(create_teller(), max_in_flight=0)
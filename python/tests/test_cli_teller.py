@@ -0,0 +1,70 @@
+import io
+
+import pytest
+
+from cli_teller import main, run_batch, summarize
+
+SESSION = """\
+# catalog
+product,toothbrush,each,0.99
+product,apples,kilo,1.99
+offer,toothbrush,THREE_FOR_TWO,0
+
+scan,toothbrush,3
+scan,apples,0.5
+checkout
+scan,apples
+checkout
+"""
+
+
+def test_batch_writes_one_receipt_per_checkout():
+    output = io.StringIO()
+    timings = io.StringIO()
+
+    durations = run_batch(io.StringIO(SESSION), output, timings)
+
+    first, second, _ = output.getvalue().split("Total:")
+    assert len(durations) == 2
+    assert "3 for 2 (toothbrush)" in first
+    assert "2.98" in second and "3 for 2" not in second
+    rows = timings.getvalue().splitlines()
+    assert rows[0] == "checkout,lines,seconds"
+    assert [row.split(",")[:2] for row in rows[1:]] == [["1", "2"], ["2", "1"]]
+
+
+def test_batch_reports_line_of_bad_command():
+    with pytest.raises(ValueError, match="Line 3"):
+        run_batch(io.StringIO("product,gum,each,0.5\nscan,gum\nscan,missing\n"), io.StringIO())
+
+
+def test_batch_ignores_whitespace_around_fields():
+    output = io.StringIO()
+
+    run_batch(io.StringIO("product, gum , each, 0.50\noffer,gum ,THREE_FOR_TWO,0\nscan, gum\t,3\ncheckout\n"),
+              output)
+
+    assert "3 for 2 (gum)" in output.getvalue()
+
+
+def test_main_runs_batch_file(tmp_path, capsys):
+    session = tmp_path / "session.csv"
+    session.write_text(SESSION)
+    receipts = tmp_path / "receipts.txt"
+
+    assert main(["--batch", str(session), "--output", str(receipts)]) == 0
+
+    assert receipts.read_text().count("Total:") == 2
+    assert "2 checkouts" in capsys.readouterr().err
+
+
+def test_main_fails_on_unknown_command(tmp_path, capsys):
+    session = tmp_path / "session.csv"
+    session.write_text("refund,all\n")
+
+    assert main(["--batch", str(session), "--output", str(tmp_path / "out.txt")]) == 1
+    assert "Unknown command" in capsys.readouterr().err
+
+
+def test_summary_of_no_checkouts():
+    assert summarize([]) == "0 checkouts"
@@ -0,0 +1,58 @@
+import pytest
+
+from columnar_cart import ColumnarCart
+from model_objects import Product, ProductUnit, SpecialOfferType
+from shopping_cart import ShoppingCart
+from teller import Teller
+from tests.fake_catalog import FakeCatalog
+
+
+def create_teller():
+    catalog = FakeCatalog()
+    gum = Product("gum", ProductUnit.EACH)
+    apples = Product("apples", ProductUnit.KILO)
+    cereal = Product("cereal", ProductUnit.EACH)
+    catalog.add_product(gum, 0.75)
+    catalog.add_product(apples, 1.99)
+    catalog.add_product(cereal, 4.50)
+
+    teller = Teller(catalog)
+    teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, gum, 0)
+    teller.add_special_offer(SpecialOfferType.FIVE_FOR_AMOUNT, cereal, 18.0)
+    return teller, gum, apples, cereal
+
+
+def test_columnar_cart_aggregates_per_product():
+    _, gum, apples, _ = create_teller()
+    cart = ColumnarCart()
+    cart.add_item(gum)
+    cart.add_item_quantity(apples, 1.5)
+    cart.add_item_quantity(gum, 2)
+
+    assert len(cart) == 3
+    assert cart.product_quantities == {gum: 3, apples: 1.5}
+    assert [(pq.product, pq.quantity) for pq in cart.items] == [(gum, 1), (apples, 1.5), (gum, 2)]
+
+
+def test_columnar_cart_checks_out_like_shopping_cart():
+    teller, gum, apples, cereal = create_teller()
+    columnar = ColumnarCart()
+    regular = ShoppingCart()
+    for n in range(1000):
+        product, quantity = [(gum, 1), (apples, 0.25), (cereal, 2)][n % 3]
+        columnar.add_item_quantity(product, quantity)
+        regular.add_item_quantity(product, quantity)
+
+    columnar_receipt = teller.checks_out_articles_from(columnar)
+    regular_receipt = teller.checks_out_articles_from(regular)
+
+    assert len(columnar_receipt.items) == 1000
+    assert columnar_receipt.discounts == regular_receipt.discounts
+    assert columnar_receipt.total_price() == pytest.approx(regular_receipt.total_price())
+
+
+def test_columnar_cart_rejects_non_positive_quantity():
+    _, gum, *_ = create_teller()
+
+    with pytest.raises(ValueError):
+        ColumnarCart().add_item_quantity(gum, 0)
@@ -164,3 +164,60 @@ def test_discount_never_positive():
 
     for d in receipt.discounts:
         assert d.discount_amount <= 0
+
+
+def test_each_product_priced_once_per_checkout():
+    catalog, banana, _, gum, _ = setup_test_environment()
+    teller = Teller(catalog)
+    teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, gum, 0)
+    requested = []
+    bulk_lookup = catalog.unit_prices
+
+    def recording_unit_prices(products):
+        products = list(products)
+        requested.append(products)
+        return bulk_lookup(products)
+
+    catalog.unit_prices = recording_unit_prices
+    catalog.unit_price = None  # per-item lookups must not happen
+
+    cart = ShoppingCart()
+    for _ in range(40):
+        cart.add_item(gum)
+    cart.add_item_quantity(banana, 0.5)
+    receipt = teller.checks_out_articles_from(cart)
+
+    assert requested == [[gum, banana]]
+    assert receipt.total_price() == pytest.approx(27 * 0.30 + 0.55, 0.01)
+
+
+def test_receipt_views_are_read_only_and_not_copied():
+    catalog, banana, apple, _, _ = setup_test_environment()
+    teller = Teller(catalog)
+    teller.add_special_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, apple, 10)
+
+    cart = ShoppingCart()
+    cart.add_item_quantity(banana, 1)
+    cart.add_item_quantity(apple, 2)
+    receipt = teller.checks_out_articles_from(cart)
+
+    assert receipt.items is receipt.items
+    assert len(receipt.items) == 2
+    assert receipt.discounts[0].product == apple
+    with pytest.raises(TypeError):
+        receipt.items[0] = None
+    assert not hasattr(receipt.items, "append")
+
+
+def test_receipt_total_tracks_additions():
+    catalog, banana, *_ = setup_test_environment()
+    teller = Teller(catalog)
+    cart = ShoppingCart()
+    cart.add_item_quantity(banana, 2)
+    receipt = teller.checks_out_articles_from(cart)
+    items = receipt.items
+
+    receipt.add_product(banana, 1, 1.10, 1.10)
+
+    assert len(items) == 2
+    assert receipt.total_price() == pytest.approx(3.30, 0.01)
@@ -0,0 +1,97 @@
+import pytest
+
+from instrumentation import Metrics
+from model_objects import Product, ProductUnit, SpecialOfferType
+from receipt_printer import ReceiptPrinter
+from shopping_cart import ShoppingCart
+from teller import Teller
+from tests.fake_catalog import FakeCatalog
+
+
+def checkout_with_metrics(metrics):
+    catalog = FakeCatalog()
+    gum = Product("gum", ProductUnit.EACH)
+    apples = Product("apples", ProductUnit.KILO)
+    catalog.add_product(gum, 0.75)
+    catalog.add_product(apples, 1.99)
+
+    teller = Teller(catalog, metrics=metrics)
+    teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, gum, 0)
+    teller.add_special_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, apples, 10.0)
+
+    cart = ShoppingCart()
+    cart.add_item_quantity(gum, 3)
+    cart.add_item_quantity(apples, 1.5)
+    cart.add_item(gum)
+    receipt = teller.checks_out_articles_from(cart)
+    ReceiptPrinter(metrics=metrics).print_receipt(receipt)
+    return teller, receipt
+
+
+def test_checkout_phases_and_catalog_calls_are_recorded():
+    metrics = Metrics()
+
+    teller, receipt = checkout_with_metrics(metrics)
+
+    assert receipt.total_price() == pytest.approx(2.25 + 2.985 - 0.2985)
+    assert metrics.counter_value("catalog_calls_total", method="unit_prices") == 1
+    assert metrics.counter_value("catalog_products_resolved_total") == 2
+    for phase in ("price_resolution", "line_pricing", "handle_offers"):
+        assert metrics.histogram("checkout_phase_seconds", phase=phase).count == 1
+    assert metrics.histogram("checkout_offer_evaluation_seconds", offer_type="THREE_FOR_TWO").count == 1
+    assert metrics.histogram("receipt_lines").sum == 3
+    assert metrics.histogram("receipt_render_seconds").count == 1
+    assert teller.catalog.products["gum"].name == "gum"
+
+
+def test_combined_offers_are_labelled_with_their_offer_types():
+    metrics = Metrics()
+    catalog = FakeCatalog()
+    gum = Product("gum", ProductUnit.EACH)
+    catalog.add_product(gum, 0.75)
+    teller = Teller(catalog, metrics=metrics)
+    teller.add_combinable_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, gum, 10.0)
+    teller.add_combinable_offer(SpecialOfferType.THREE_FOR_TWO, gum, 0)
+
+    cart = ShoppingCart()
+    cart.add_item_quantity(gum, 3)
+    teller.checks_out_articles_from(cart)
+
+    histogram = metrics.histogram("checkout_offer_evaluation_seconds", offer_type="TEN_PERCENT_DISCOUNT+THREE_FOR_TWO")
+    assert histogram.count == 1
+    assert metrics.histogram("checkout_offer_evaluation_seconds", offer_type="unknown") is None
+
+
+def test_hooks_receive_every_observation():
+    metrics = Metrics()
+    observed = []
+    metrics.add_hook(lambda name, value, labels: observed.append((name, labels)))
+
+    checkout_with_metrics(metrics)
+
+    assert ("checkout_phase_seconds", {"phase": "handle_offers"}) in observed
+    assert ("checkout_offer_evaluation_seconds", {"offer_type": "TEN_PERCENT_DISCOUNT"}) in observed
+
+
+def test_prometheus_text_format():
+    metrics = Metrics(latency_buckets=[0.1, 1.0])
+    metrics.inc("catalog_calls_total", method="unit_prices")
+    metrics.observe("checkout_seconds", 0.5)
+    metrics.observe("checkout_seconds", 2.0)
+
+    text = metrics.render_prometheus()
+
+    assert "# TYPE catalog_calls_total counter\n" in text
+    assert 'catalog_calls_total{method="unit_prices"} 1.0\n' in text
+    assert "# HELP checkout_seconds Duration of checks_out_articles_from.\n" in text
+    assert 'checkout_seconds_bucket{le="0.1"} 0\n' in text
+    assert 'checkout_seconds_bucket{le="1.0"} 1\n' in text
+    assert 'checkout_seconds_bucket{le="+Inf"} 2\n' in text
+    assert "checkout_seconds_sum 2.5\n" in text
+    assert "checkout_seconds_count 2\n" in text
+
+
+def test_teller_without_metrics_keeps_plain_catalog():
+    catalog = FakeCatalog()
+
+    assert Teller(catalog).catalog is catalog
@@ -0,0 +1,100 @@
+import io
+
+import pytest
+
+from mapped_catalog import MappedCatalog, compile_catalog, write_catalog
+from model_objects import Product, ProductUnit, SpecialOfferType
+from shopping_cart import ShoppingCart
+from sku_catalog import SkuCatalog
+from teller import Teller
+
+CATALOG_CSV = """name,unit,price
+toothbrush,EACH,0.99
+apples,KILO,1.99
+gum,EACH,0.75
+crème brûlée,EACH,3.25
+"""
+
+
+@pytest.fixture
+def mapped_catalog(tmp_path):
+    path = tmp_path / "catalog.bin"
+    assert compile_catalog(io.StringIO(CATALOG_CSV), path) == 4
+    with MappedCatalog(path) as catalog:
+        yield catalog
+
+
+def test_mapped_catalog_answers_prices(mapped_catalog):
+    assert mapped_catalog.unit_price(Product("apples", ProductUnit.KILO)) == 1.99
+    assert mapped_catalog.unit_price(Product("crème brûlée", ProductUnit.EACH)) == 3.25
+    with pytest.raises(KeyError):
+        mapped_catalog.unit_price(Product("caviar", ProductUnit.EACH))
+
+
+def test_price_lookup_checks_the_unit(mapped_catalog):
+    with pytest.raises(KeyError):
+        mapped_catalog.unit_price(Product("apples", ProductUnit.EACH))
+
+
+def test_mapped_catalog_resolves_products_by_name(mapped_catalog):
+    assert mapped_catalog.products["gum"] == Product("gum", ProductUnit.EACH)
+    assert "caviar" not in mapped_catalog.products
+    assert list(mapped_catalog.products) == ["apples", "crème brûlée", "gum", "toothbrush"]
+
+
+def test_repeated_lookups_share_one_product(mapped_catalog):
+    assert mapped_catalog.products["gum"] is mapped_catalog.products["gum"]
+    assert mapped_catalog.product_with_name("gum") is mapped_catalog.products["gum"]
+
+
+def test_teller_checks_out_with_mapped_catalog(mapped_catalog):
+    gum = mapped_catalog.products["gum"]
+    teller = Teller(mapped_catalog)
+    teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, gum, 0)
+
+    cart = ShoppingCart()
+    cart.add_item_quantity(gum, 3)
+
+    assert teller.checks_out_articles_from(cart).total_price() == pytest.approx(1.50)
+
+
+def test_sku_catalog_round_trips_through_mapped_catalog(tmp_path):
+    sku_catalog = SkuCatalog()
+    toothbrush = Product("toothbrush", ProductUnit.EACH, 4006381333931)
+    apples = Product("apples", ProductUnit.KILO, 2)
+    sku_catalog.add_product(toothbrush, 0.99)
+    sku_catalog.add_product(apples, 1.99)
+    path = tmp_path / "catalog.bin"
+
+    write_catalog(((product, sku_catalog.unit_price(product)) for product in sku_catalog.products.values()), path)
+
+    with MappedCatalog(path) as catalog:
+        assert catalog.products["toothbrush"] == toothbrush
+        assert catalog.product_with_sku(2) == apples
+        assert catalog.product_with_sku(3) is None
+        assert catalog.unit_prices([toothbrush, apples]) == {toothbrush: 0.99, apples: 1.99}
+        with pytest.raises(KeyError):
+            catalog.unit_price(Product("toothbrush", ProductUnit.EACH, 2))
+
+
+def test_csv_sku_column_is_optional(tmp_path):
+    path = tmp_path / "catalog.bin"
+    compile_catalog(io.StringIO("name,unit,price,sku\ngum,EACH,0.75,17\nrice,EACH,2.49,\n"), path)
+
+    with MappedCatalog(path) as catalog:
+        assert catalog.products["gum"] == Product("gum", ProductUnit.EACH, 17)
+        assert catalog.products["rice"].sku is None
+
+
+def test_duplicate_skus_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Duplicate SKU"):
+        compile_catalog(io.StringIO("name,unit,price,sku\ngum,EACH,0.75,17\nrice,EACH,2.49,17\n"),
+                        tmp_path / "catalog.bin")
+
+
+def test_invalid_file_is_rejected(tmp_path):
+    path = tmp_path / "catalog.csv"
+    path.write_text(CATALOG_CSV)
+
+    with pytest.raises(ValueError):
+        MappedCatalog(path)
@@ -0,0 +1,72 @@
+import dataclasses
+import pickle
+
+import pytest
+
+from model_objects import Product, ProductQuantity, ProductTable, ProductUnit
+from receipt import ReceiptItem
+
+
+def test_equal_products_are_the_same_dict_key():
+    quantities = {Product("apples", ProductUnit.KILO): 1.5}
+
+    assert quantities[Product("apples", ProductUnit.KILO)] == 1.5
+    assert Product("apples", ProductUnit.EACH) not in quantities
+
+
+def test_model_objects_are_slotted_and_immutable():
+    item = ReceiptItem(Product("gum", ProductUnit.EACH), 2, 0.75, 1.5)
+
+    assert not hasattr(item, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        item.total_price = 0
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        ProductQuantity(item.product, 1).quantity = 2
+
+
+def test_product_table_interns_by_name():
+    table = ProductTable()
+
+    apples = table.intern("apples", ProductUnit.KILO)
+
+    assert table.intern("apples", ProductUnit.KILO) is apples
+    assert table.get("apples") is apples
+    assert len(table) == 1
+    with pytest.raises(ValueError):
+        table.intern("apples", ProductUnit.EACH)
+
+
+@pytest.mark.parametrize("sku_first", [True, False])
+def test_product_table_keeps_products_with_and_without_sku_apart(sku_first):
+    table = ProductTable()
+
+    if sku_first:
+        with_sku = table.intern("gum", ProductUnit.EACH, 5)
+        without_sku = table.intern("gum", ProductUnit.EACH)
+    else:
+        without_sku = table.intern("gum", ProductUnit.EACH)
+        with_sku = table.intern("gum", ProductUnit.EACH, 5)
+
+    assert without_sku.sku is None and with_sku.sku == 5
+    assert table.intern("gum", ProductUnit.EACH) is without_sku
+    assert table.intern("gum", ProductUnit.EACH, 5) is with_sku
+    assert table.get("gum") is without_sku
+    assert table.get_by_sku(5) is with_sku
+    assert len(table) == 2
+
+
+def test_product_table_finds_a_sku_product_by_name():
+    table = ProductTable()
+    gum = table.intern("gum", ProductUnit.EACH, 5)
+
+    assert table.get("gum") is gum and "gum" in table
+    assert table.get_by_sku(6) is None and "mints" not in table
+
+
+def test_product_keeps_its_hash_through_pickling():
+    apples = Product("apples", ProductUnit.KILO, 42)
+
+    copy = pickle.loads(pickle.dumps(apples))
+
+    assert copy == apples and hash(copy) == hash(apples)
+    assert repr(copy) == "Product(name='apples', unit=<ProductUnit.KILO: 2>, sku=42)"
@@ -0,0 +1,69 @@
+from model_objects import Product, ProductUnit, SpecialOfferType
+from money import CENTS, MinorUnitMoney, div_round_half_up
+from receipt_printer import ReceiptPrinter
+from teller import Teller
+from tests.fake_catalog import FakeCatalog
+
+
+def test_prices_convert_to_cents_without_float_drift():
+    assert CENTS.from_price(1.99) == 199
+    assert CENTS.from_price(0.1 + 0.2) == 30
+    assert CENTS.from_price(2.675) == 268
+
+
+def test_each_price_is_converted_once():
+    money = MinorUnitMoney(2)
+    toothbrush = Product("toothbrush", ProductUnit.EACH)
+    apples = Product("apples", ProductUnit.KILO)
+
+    assert money.prices({toothbrush: 0.99, apples: 0.99}) == {toothbrush: 99, apples: 99}
+    assert money._minor_units == {0.99: 99}
+    assert money.from_price(0.99) == 99 and money.prices({apples: 2.675}) == {apples: 268}
+    assert len(money._minor_units) == 2
+
+
+def test_rounding_is_half_up():
+    assert div_round_half_up(25, 10) == 3
+    assert div_round_half_up(24, 10) == 2
+    assert div_round_half_up(-25, 10) == -3
+
+
+def test_kilo_line_total_and_percent_rounding():
+    assert CENTS.line_total(2.5, 199) == 498  # 497.5 cents
+    assert CENTS.line_total(3, 30) == 90
+    assert CENTS.percent_of(99, 10.0) == 10  # 9.9 cents
+
+
+def test_format_minor_units():
+    assert CENTS.format(497) == "4.97"
+    assert CENTS.format(-5) == "-0.05"
+    assert CENTS.format(0) == "0.00"
+
+
+def test_checkout_in_cents_is_exact():
+    catalog = FakeCatalog()
+    toothbrush = Product("toothbrush", ProductUnit.EACH)
+    apples = Product("apples", ProductUnit.KILO)
+    gum = Product("gum", ProductUnit.EACH)
+    catalog.add_product(toothbrush, 0.99)
+    catalog.add_product(apples, 1.99)
+    catalog.add_product(gum, 0.10)
+
+    teller = Teller(catalog, money=CENTS)
+    teller.add_special_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, toothbrush, 10.0)
+    teller.add_special_offer(SpecialOfferType.TWO_FOR_AMOUNT, gum, 0.15)
+
+    cart = teller.new_cart()
+    cart.add_item_quantity(toothbrush, 1)
+    cart.add_item_quantity(apples, 2.5)
+    for _ in range(3):
+        cart.add_item(gum)
+
+    receipt = teller.checks_out_articles_from(cart)
+
+    # 99 + 498 + 30 - 10 (10% of 99) - 5 (2 for 0.15)
+    assert receipt.total_price() == 612
+    assert cart.running_total == 612
+    output = ReceiptPrinter(money=CENTS).print_receipt(receipt)
+    assert output.endswith("6.12\n")
+    assert "10.0% off (toothbrush)" in output
@@ -0,0 +1,157 @@
+from itertools import product as cartesian
+
+import pytest
+
+from model_objects import Product, ProductUnit, SpecialOfferType
+from money import CENTS
+from pricing_plan import _allocate_units
+from shopping_cart import ShoppingCart
+from teller import Teller
+from tests.fake_catalog import FakeCatalog
+
+
+def create_teller(money=None):
+    catalog = FakeCatalog()
+    toothbrush = Product("toothbrush", ProductUnit.EACH)
+    apples = Product("apples", ProductUnit.KILO)
+    catalog.add_product(toothbrush, 0.99)
+    catalog.add_product(apples, 1.99)
+    teller = Teller(catalog) if money is None else Teller(catalog, money)
+    return teller, toothbrush, apples
+
+
+def check_out(teller, product, quantity):
+    cart = ShoppingCart()
+    cart.add_item_quantity(product, quantity)
+    return teller.checks_out_articles_from(cart)
+
+
+def test_same_offer_type_replaces_earlier_offer():
+    teller, toothbrush, _ = create_teller()
+    teller.add_combinable_offer(SpecialOfferType.TWO_FOR_AMOUNT, toothbrush, 1.80)
+    teller.add_combinable_offer(SpecialOfferType.TWO_FOR_AMOUNT, toothbrush, 1.50)
+
+    receipt = check_out(teller, toothbrush, 2)
+
+    assert [d.description for d in receipt.discounts] == ["2 for 1.5"]
+    assert len(teller.combinable_offers[toothbrush]) == 1
+
+
+def test_special_offer_of_another_type_still_replaces_the_offer():
+    teller, toothbrush, _ = create_teller()
+    teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0)
+    teller.add_special_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, toothbrush, 10.0)
+
+    receipt = check_out(teller, toothbrush, 3)
+
+    assert teller.offers[toothbrush].offer_type == SpecialOfferType.TEN_PERCENT_DISCOUNT
+    assert [d.description for d in receipt.discounts] == ["10.0% off"]
+
+
+def test_combinable_offer_competes_with_special_offer():
+    teller, toothbrush, _ = create_teller()
+    teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0)
+    teller.add_combinable_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, toothbrush, 10.0)
+
+    receipt = check_out(teller, toothbrush, 4)
+
+    assert receipt.discounts[0].description == "3 for 2 + 10.0% off"
+    assert receipt.total_price() == pytest.approx(2 * 0.99 + 0.99 * 0.9)
+
+
+def test_competing_offers_split_units_for_best_saving():
+    teller, toothbrush, _ = create_teller()
+    teller.add_combinable_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0)
+    teller.add_combinable_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, toothbrush, 10.0)
+
+    receipt = check_out(teller, toothbrush, 7)
+
+    # Two trios at 3-for-2, the seventh toothbrush at 10% off
+    assert len(receipt.discounts) == 1
+    assert receipt.discounts[0].description == "3 for 2 + 10.0% off"
+    assert receipt.total_price() == pytest.approx(4 * 0.99 + 0.99 * 0.9)
+
+
+def test_competing_offers_only_use_offers_that_save():
+    teller, toothbrush, _ = create_teller()
+    teller.add_combinable_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0)
+    teller.add_combinable_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, toothbrush, 10.0)
+
+    receipt = check_out(teller, toothbrush, 3)
+
+    assert receipt.discounts[0].description == "3 for 2"
+    assert receipt.total_price() == pytest.approx(2 * 0.99)
+
+
+def test_stackable_offer_applies_on_top_to_whole_quantity():
+    teller, toothbrush, _ = create_teller()
+    teller.add_combinable_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0)
+    teller.add_combinable_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, toothbrush, 10.0, stackable=True)
+
+    receipt = check_out(teller, toothbrush, 3)
+
+    assert receipt.discounts[0].description == "3 for 2 + 10.0% off"
+    assert receipt.total_price() == pytest.approx(3 * 0.99 - 0.99 - 3 * 0.99 * 0.1)
+
+
+def test_weighed_remainder_goes_to_percent_offer():
+    teller, _, apples = create_teller()
+    teller.add_combinable_offer(SpecialOfferType.TWO_FOR_AMOUNT, apples, 3.00)
+    teller.add_combinable_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, apples, 10.0)
+
+    receipt = check_out(teller, apples, 2.5)
+
+    # Two kilos at 2 for 3.00, the remaining half kilo at 10% off
+    assert receipt.total_price() == pytest.approx(3.00 + 0.5 * 1.99 * 0.9)
+
+
+def test_competing_offers_with_integer_money():
+    teller, toothbrush, _ = create_teller(CENTS)
+    teller.add_combinable_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0)
+    teller.add_combinable_offer(SpecialOfferType.TWO_FOR_AMOUNT, toothbrush, 1.50)
+
+    receipt = check_out(teller, toothbrush, 5)
+
+    # A trio at 3-for-2 and a pair at 2 for 1.50 beat two pairs and a full-price unit
+    assert receipt.total_price() == 2 * 99 + 150
+
+
+def test_batch_checkout_uses_optimizer_for_products_with_several_offers():
+    teller, toothbrush, apples = create_teller()
+    teller.add_combinable_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0)
+    teller.add_combinable_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, toothbrush, 10.0)
+    teller.add_combinable_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, apples, 20.0)
+    carts = []
+    for quantity in range(1, 9):
+        cart = ShoppingCart()
+        cart.add_item_quantity(toothbrush, quantity)
+        cart.add_item_quantity(apples, quantity / 2)
+        carts.append(cart)
+
+    receipts = teller.checks_out_many(carts)
+
+    for cart, receipt in zip(carts, receipts):
+        expected = teller.checks_out_articles_from(cart)
+        assert receipt.discounts == expected.discounts
+        assert receipt.total_price() == expected.total_price()
+
+
+@pytest.mark.parametrize("units", [0, 1, 4, 7, 12, 23, 40])
+def test_unit_allocation_matches_brute_force(units):
+    bundles = [(3, 1.0), (2, 0.7), (5, 2.0), (1, 0.3)]
+
+    applications = _allocate_units(units, bundles)
+
+    best = max(sum(n * saving for n, (_, saving) in zip(counts, bundles))
+               for counts in cartesian(*(range(units // size + 1) for size, _ in bundles))
+               if sum(n * size for n, (size, _) in zip(counts, bundles)) <= units)
+    assert sum(n * size for n, (size, _) in zip(applications, bundles)) <= units
+    assert sum(n * saving for n, (_, saving) in zip(applications, bundles)) == pytest.approx(best)
+
+
+def test_unit_allocation_stays_small_for_huge_quantities():
+    applications = _allocate_units(10_000_003, [(3, 1.0), (2, 0.7)])
+
+    assert applications[0] * 3 + applications[1] * 2 <= 10_000_003
+    # Pairs save the most per unit; one trio uses up the odd unit
+    assert applications == [1, 5_000_000]
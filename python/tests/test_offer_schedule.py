@@ -0,0 +1,144 @@
+import pytest
+
+from model_objects import Offer, Product, ProductUnit, ScheduledOffer, SpecialOfferType
+from offer_schedule import OfferSchedule
+from shopping_cart import ShoppingCart
+from teller import Teller
+from tests.fake_catalog import FakeCatalog
+
+
+class FakeClock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+        self.calls = 0
+
+    def __call__(self) -> float:
+        self.calls += 1
+        return self.now
+
+
+def create_teller():
+    catalog = FakeCatalog()
+    toothbrush = Product("toothbrush", ProductUnit.EACH)
+    apples = Product("apples", ProductUnit.KILO)
+    catalog.add_product(toothbrush, 0.99)
+    catalog.add_product(apples, 1.99)
+    clock = FakeClock()
+    return Teller(catalog, clock=clock), clock, toothbrush, apples
+
+
+def check_out(teller, product, quantity):
+    cart = ShoppingCart()
+    cart.add_item_quantity(product, quantity)
+    return teller.checks_out_articles_from(cart)
+
+
+def test_schedule_finds_active_offers_and_window():
+    toothbrush = Product("toothbrush", ProductUnit.EACH)
+    happy_hour = Offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, toothbrush, 20.0)
+    flyer = Offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0)
+    schedule = OfferSchedule()
+    schedule.add(ScheduledOffer(flyer, 0, 100))
+    schedule.add(ScheduledOffer(happy_hour, 50, 60))
+
+    assert schedule.offers_for(toothbrush, -1) == ()
+    assert schedule.offers_for(toothbrush, 10) == (flyer,)
+    assert schedule.offers_for(toothbrush, 50) == (flyer, happy_hour)
+    assert schedule.offers_for(toothbrush, 60) == (flyer,)
+    assert schedule.offers_for(toothbrush, 100) == ()
+    assert schedule.window_at(55) == (50, 60)
+    assert schedule.window_at(100) == (100, float("inf"))
+    assert schedule.window_at(-5) == (float("-inf"), 0)
+    assert len(schedule) == 2
+    assert not OfferSchedule()
+
+
+def test_scheduled_offer_only_applies_in_its_window():
+    teller, clock, toothbrush, _ = create_teller()
+    teller.add_scheduled_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0, start=100, end=200)
+
+    assert check_out(teller, toothbrush, 3).total_price() == pytest.approx(3 * 0.99)
+    clock.now = 150
+    assert check_out(teller, toothbrush, 3).total_price() == pytest.approx(2 * 0.99)
+    clock.now = 200
+    assert check_out(teller, toothbrush, 3).total_price() == pytest.approx(3 * 0.99)
+
+
+def test_scheduled_offer_replaces_standing_offer_of_same_type():
+    teller, clock, _, apples = create_teller()
+    teller.add_special_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, apples, 10.0)
+    teller.add_scheduled_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, apples, 25.0, start=10, end=20)
+
+    assert check_out(teller, apples, 1).discounts[0].description == "10.0% off"
+    clock.now = 15
+    assert check_out(teller, apples, 1).discounts[0].description == "25.0% off"
+    assert teller.offers[apples].argument == 10.0
+
+
+def test_plan_is_only_rebuilt_when_window_ends():
+    teller, clock, toothbrush, _ = create_teller()
+    teller.add_scheduled_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0, start=100, end=200)
+    plan = teller.pricing_plan
+
+    clock.now = 99
+    assert teller.pricing_plan is plan
+    clock.now = 100
+    assert teller.pricing_plan is not plan
+
+
+def test_clock_not_read_without_scheduled_offers():
+    teller, clock, toothbrush, _ = create_teller()
+    teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0)
+
+    check_out(teller, toothbrush, 3)
+
+    assert clock.calls == 0
+
+
+def test_open_carts_are_repriced_when_offer_starts():
+    teller, clock, toothbrush, apples = create_teller()
+    teller.add_scheduled_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0, start=100, end=200)
+    cart = teller.new_cart()
+    cart.add_item_quantity(toothbrush, 3)
+    cart.add_item(apples)
+    deltas = []
+    teller.open_carts.add_listener(deltas.append)
+
+    clock.now = 100
+    cart.add_item(apples)
+
+    assert [delta.product for delta in deltas] == [toothbrush]
+    assert cart.running_total == pytest.approx(teller.checks_out_articles_from(cart).total_price())
+
+
+def test_open_carts_lose_discount_when_offer_ends():
+    teller, clock, toothbrush, _ = create_teller()
+    teller.add_scheduled_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0, start=10, end=20)
+    clock.now = 15
+    cart = teller.new_cart()
+    cart.add_item_quantity(toothbrush, 3)
+    assert cart.running_total == pytest.approx(2 * 0.99)
+
+    clock.now = 25
+
+    assert cart.running_total == pytest.approx(3 * 0.99)
+    assert cart.running_total == pytest.approx(teller.checks_out_articles_from(cart).total_price())
+
+
+def test_scheduled_offer_must_end_after_it_starts():
+    teller, _, toothbrush, _ = create_teller()
+    with pytest.raises(ValueError):
+        teller.add_scheduled_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0, start=10, end=10)
+
+
+def test_batch_checkout_applies_active_scheduled_offers():
+    teller, clock, toothbrush, apples = create_teller()
+    teller.add_scheduled_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, apples, 20.0, start=0, end=10)
+    cart = ShoppingCart()
+    cart.add_item_quantity(apples, 1.5)
+    cart.add_item(toothbrush)
+
+    receipt, = teller.checks_out_many([cart])
+
+    assert receipt.discounts == teller.checks_out_articles_from(cart).discounts
+    assert receipt.discounts[0].description == "20.0% off"
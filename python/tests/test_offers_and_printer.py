@@ -1,3 +1,5 @@
+import io
+
 import pytest
 
 from model_objects import Product, ProductUnit, SpecialOfferType
@@ -110,3 +112,25 @@ def test_receipt_printer_basic_output():
     assert "apples" in output
     assert "Total:" in output
     assert "1.5" in output or "1.500" in output  # Quantity line
+
+
+def test_receipt_printer_streams_to_text_and_binary_sinks():
+    catalog, toothbrush, apples, *_ = create_catalog_with_products()
+    teller = Teller(catalog)
+    teller.add_special_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, toothbrush, 10.0)
+    printer = ReceiptPrinter()
+
+    cart = ShoppingCart()
+    cart.add_item_quantity(toothbrush, 2)
+    cart.add_item_quantity(apples, 1.5)
+    receipt = teller.checks_out_articles_from(cart)
+    expected = printer.print_receipt(receipt)
+
+    text_sink = io.StringIO()
+    printer.write_receipt(receipt, text_sink)
+    binary_sink = io.BytesIO()
+    printer.write_receipt(receipt, binary_sink)
+
+    assert "".join(printer.iter_lines(receipt)) == expected
+    assert text_sink.getvalue() == expected
+    assert binary_sink.getvalue() == expected.encode("utf-8")
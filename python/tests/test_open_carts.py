@@ -0,0 +1,144 @@
+import gc
+
+import pytest
+
+from model_objects import Product, ProductUnit, SpecialOfferType
+from money import CENTS
+from teller import Teller
+from tests.fake_catalog import FakeCatalog
+
+
+class CountingCatalog(FakeCatalog):
+    def __init__(self):
+        super().__init__()
+        self.lookups = 0
+
+    def unit_price(self, product):
+        self.lookups += 1
+        return super().unit_price(product)
+
+
+def create_teller(money=None):
+    catalog = CountingCatalog()
+    toothbrush = Product("toothbrush", ProductUnit.EACH)
+    apples = Product("apples", ProductUnit.KILO)
+    catalog.add_product(toothbrush, 0.99)
+    catalog.add_product(apples, 1.99)
+    teller = Teller(catalog) if money is None else Teller(catalog, money)
+    return teller, catalog, toothbrush, apples
+
+
+def test_offer_change_emits_deltas_for_carts_holding_the_product():
+    teller, _, toothbrush, apples = create_teller()
+    with_toothbrush = teller.new_cart()
+    with_toothbrush.add_item_quantity(toothbrush, 3)
+    with_apples = teller.new_cart()
+    with_apples.add_item_quantity(apples, 1.5)
+    deltas = []
+    teller.open_carts.add_listener(deltas.append)
+
+    teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0)
+
+    assert len(deltas) == 1
+    delta = deltas[0]
+    assert delta.cart is with_toothbrush
+    assert delta.old_line_total == delta.new_line_total
+    assert delta.old_discount == 0
+    assert delta.new_discount == pytest.approx(-0.99)
+    assert delta.total_change == pytest.approx(-0.99)
+    assert with_toothbrush.running_total == pytest.approx(
+        teller.checks_out_articles_from(with_toothbrush).total_price())
+
+
+def test_price_change_only_reprices_affected_carts():
+    teller, catalog, toothbrush, apples = create_teller()
+    teller.add_special_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, apples, 10.0)
+    carts = [teller.new_cart() for _ in range(10)]
+    for number, cart in enumerate(carts):
+        cart.add_item_quantity(toothbrush, 2)
+        if number < 3:
+            cart.add_item_quantity(apples, 1.0)
+            cart.add_item_quantity(apples, 0.5)
+    catalog.lookups = 0
+
+    deltas = teller.update_price(apples, 2.49)
+
+    assert {delta.cart for delta in deltas} == set(carts[:3])
+    assert catalog.lookups == 3
+    for delta in deltas:
+        assert delta.new_line_total == pytest.approx(1.5 * 2.49)
+        assert delta.new_discount == pytest.approx(-1.5 * 2.49 * 0.1)
+    for cart in carts:
+        assert cart.running_total == pytest.approx(teller.checks_out_articles_from(cart).total_price())
+
+
+def test_price_change_with_integer_money_matches_fresh_checkout():
+    teller, _, toothbrush, apples = create_teller(CENTS)
+    teller.add_special_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, apples, 10.0)
+    cart = teller.new_cart()
+    cart.add_item_quantity(apples, 0.333)
+    cart.add_item_quantity(apples, 1.25)
+    cart.add_item(toothbrush)
+
+    teller.update_price(apples, 2.37)
+
+    assert cart.running_total == teller.checks_out_articles_from(cart).total_price()
+
+
+def test_closed_and_abandoned_carts_are_not_repriced():
+    teller, _, toothbrush, _ = create_teller()
+    closed = teller.new_cart()
+    closed.add_item(toothbrush)
+    closed.close()
+    abandoned = teller.new_cart()
+    abandoned.add_item(toothbrush)
+    del abandoned
+    gc.collect()
+
+    assert teller.open_carts.carts_with(toothbrush) == []
+    assert teller.update_price(toothbrush, 1.19) == []
+    # A closed cart keeps the prices it was scanned with
+    assert closed.running_total == pytest.approx(0.99)
+
+
+def test_scanning_an_unknown_product_leaves_the_cart_unchanged():
+    teller, _, toothbrush, _ = create_teller()
+    caviar = Product("caviar", ProductUnit.EACH)
+    cart = teller.new_cart()
+    cart.add_item(toothbrush)
+    other = teller.new_cart()
+    other.add_item_quantity(toothbrush, 3)
+
+    with pytest.raises(KeyError):
+        cart.add_item(caviar)
+
+    assert [line.product for line in cart.items] == [toothbrush]
+    assert caviar not in cart.product_quantities
+    assert teller.open_carts.carts_with(caviar) == []
+    teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, caviar, 0)
+    teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0)
+    assert other.running_total == pytest.approx(2 * 0.99)
+    assert cart.running_total == pytest.approx(0.99)
+
+
+def test_cart_failing_to_reprice_does_not_stop_the_others():
+    teller, catalog, toothbrush, _ = create_teller()
+    carts = [teller.new_cart() for _ in range(3)]
+    for cart in carts:
+        cart.add_item_quantity(toothbrush, 3)
+    lookups = []
+
+    def unit_price(product):
+        lookups.append(product)
+        if len(lookups) == 1:
+            raise KeyError(product.name)
+        return catalog.prices[product.name]
+
+    catalog.unit_price = unit_price
+
+    with pytest.raises(KeyError):
+        teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0)
+
+    assert len(lookups) == 3
+    repriced = [cart for cart in carts if cart.running_total == pytest.approx(2 * 0.99)]
+    assert len(repriced) == 2
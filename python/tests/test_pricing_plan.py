@@ -0,0 +1,46 @@
+import pytest
+
+from model_objects import Offer, Product, ProductUnit, SpecialOfferType
+from pricing_plan import PricingPlan, compile_offer
+from shopping_cart import ShoppingCart
+from teller import Teller
+from tests.fake_catalog import FakeCatalog
+
+
+def test_plan_pre_renders_descriptions():
+    gum = Product("gum", ProductUnit.EACH)
+    cereal = Product("cereal", ProductUnit.EACH)
+    plan = PricingPlan({
+        gum: Offer(SpecialOfferType.THREE_FOR_TWO, gum, 0),
+        cereal: Offer(SpecialOfferType.FIVE_FOR_AMOUNT, cereal, 18.0),
+    })
+
+    assert plan.rule_for(gum).description == "3 for 2"
+    assert plan.rule_for(cereal).description == "5 for 18.0"
+    assert plan.rule_for(Product("rice", ProductUnit.EACH)) is None
+
+
+def test_invalid_percentage_rejected_when_compiling():
+    apples = Product("apples", ProductUnit.KILO)
+
+    with pytest.raises(ValueError):
+        compile_offer(Offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, apples, 120))
+
+
+def test_teller_rebuilds_plan_after_new_offer():
+    catalog = FakeCatalog()
+    gum = Product("gum", ProductUnit.EACH)
+    catalog.add_product(gum, 0.75)
+    teller = Teller(catalog)
+
+    plan = teller.pricing_plan
+    assert teller.pricing_plan is plan
+
+    teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, gum, 0)
+    assert teller.pricing_plan is not plan
+
+    cart = ShoppingCart()
+    cart.add_item_quantity(gum, 3)
+    receipt = teller.checks_out_articles_from(cart)
+
+    assert receipt.total_price() == pytest.approx(1.50, 0.01)
@@ -0,0 +1,179 @@
+import os
+import threading
+
+import pytest
+
+from model_objects import Product, ProductUnit, SpecialOfferType
+from receipt_journal import ReceiptJournal, replay
+from shopping_cart import ShoppingCart
+from teller import Teller
+from tests.fake_catalog import FakeCatalog
+
+
+class CountingFsync:
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, fd: int):
+        with self.lock:
+            self.calls += 1
+        os.fsync(fd)
+
+
+def create_cart(number: int = 1):
+    catalog = FakeCatalog()
+    toothbrush = Product("toothbrush", ProductUnit.EACH)
+    catalog.add_product(toothbrush, 0.99)
+    cart = ShoppingCart()
+    cart.add_item_quantity(toothbrush, number)
+    return catalog, toothbrush, cart
+
+
+def test_teller_journals_every_receipt(tmp_path):
+    catalog, toothbrush, cart = create_cart(3)
+    with ReceiptJournal(tmp_path, commit_latency=0) as journal:
+        teller = Teller(catalog, journal=journal)
+        teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0)
+        receipts = [teller.checks_out_articles_from(cart) for _ in range(3)]
+
+    replayed = list(replay(tmp_path))
+
+    assert [sequence for sequence, _ in replayed] == [1, 2, 3]
+    for receipt, (_, restored) in zip(receipts, replayed):
+        assert restored.items == receipt.items
+        assert restored.discounts == receipt.discounts
+
+
+def test_concurrent_appends_share_fsyncs(tmp_path):
+    catalog, _, cart = create_cart()
+    receipt = Teller(catalog).checks_out_articles_from(cart)
+    fsync = CountingFsync()
+    journal = ReceiptJournal(tmp_path, commit_latency=0.05, fsync=fsync)
+    fsync.calls = 0
+    barrier = threading.Barrier(16)
+
+    def check_out():
+        barrier.wait()
+        for _ in range(5):
+            journal.append(receipt)
+
+    threads = [threading.Thread(target=check_out) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    journal.close()
+
+    assert journal.records == 80
+    assert journal.commits < 40
+    assert len(list(replay(tmp_path))) == 80
+
+
+def test_segments_rotate_and_replay_in_order(tmp_path):
+    catalog, _, cart = create_cart()
+    receipt = Teller(catalog).checks_out_articles_from(cart)
+    with ReceiptJournal(tmp_path, segment_bytes=200, commit_latency=0) as journal:
+        journal.append_many([receipt] * 10)
+        journal.append(receipt)
+
+    assert len(os.listdir(tmp_path)) > 1
+    assert [sequence for sequence, _ in replay(tmp_path)] == list(range(1, 12))
+    assert [sequence for sequence, _ in replay(tmp_path, after=9)] == [10, 11]
+
+
+def test_torn_tail_is_cut_off_on_reopen(tmp_path):
+    catalog, _, cart = create_cart()
+    receipt = Teller(catalog).checks_out_articles_from(cart)
+    with ReceiptJournal(tmp_path, commit_latency=0) as journal:
+        journal.append_many([receipt] * 3)
+    segment = os.path.join(tmp_path, sorted(os.listdir(tmp_path))[-1])
+    # A crash in the middle of writing the third record
+    os.truncate(segment, os.path.getsize(segment) - 5)
+
+    assert [sequence for sequence, _ in replay(tmp_path)] == [1, 2]
+    with ReceiptJournal(tmp_path, commit_latency=0) as journal:
+        assert journal.append(receipt) == 3
+    assert [sequence for sequence, _ in replay(tmp_path)] == [1, 2, 3]
+
+
+def test_corrupt_record_in_older_segment_is_reported(tmp_path):
+    catalog, _, cart = create_cart()
+    receipt = Teller(catalog).checks_out_articles_from(cart)
+    with ReceiptJournal(tmp_path, segment_bytes=100, commit_latency=0) as journal:
+        journal.append_many([receipt] * 4)
+    first = os.path.join(tmp_path, sorted(os.listdir(tmp_path))[0])
+    with open(first, "r+b") as f:
+        f.seek(20)
+        f.write(b"\xff")
+
+    with pytest.raises(ValueError):
+        list(replay(tmp_path))
+
+
+def test_closed_journal_rejects_appends(tmp_path):
+    catalog, _, cart = create_cart()
+    receipt = Teller(catalog).checks_out_articles_from(cart)
+    journal = ReceiptJournal(tmp_path)
+    journal.close()
+
+    with pytest.raises(ValueError):
+        journal.append(receipt)
+
+
+@pytest.mark.parametrize("segment_bytes", [100, 1 << 20])  # Failing on rotation, or on commit
+def test_failed_fsync_stops_the_journal(tmp_path, segment_bytes):
+    catalog, _, cart = create_cart()
+    receipt = Teller(catalog).checks_out_articles_from(cart)
+    failing = False
+
+    def fsync(fd: int):
+        if failing:
+            raise OSError("I/O error")
+        os.fsync(fd)
+
+    journal = ReceiptJournal(tmp_path, segment_bytes=segment_bytes, commit_latency=0, fsync=fsync)
+    journal.append(receipt)
+    failing = True
+    with pytest.raises(OSError, match="I/O error"):
+        journal.append_many([receipt] * 3)
+    failing = False
+
+    # Nothing after the failed commit may be reported durable, even if the disk recovers
+    with pytest.raises(OSError, match="failed fsync"):
+        journal.append(receipt)
+    assert journal.records == 1
+    journal.close()
+
+
+def test_corruption_before_the_tail_is_not_cut_off(tmp_path):
+    catalog, _, cart = create_cart()
+    receipt = Teller(catalog).checks_out_articles_from(cart)
+    with ReceiptJournal(tmp_path, commit_latency=0) as journal:
+        journal.append_many([receipt] * 3)
+    segment = os.path.join(tmp_path, sorted(os.listdir(tmp_path))[-1])
+    size = os.path.getsize(segment)
+    with open(segment, "r+b") as f:
+        f.seek(20)
+        f.write(b"\xff")
+
+    with pytest.raises(ValueError, match="Corrupt"):
+        ReceiptJournal(tmp_path)
+    with pytest.raises(ValueError, match="Corrupt"):
+        list(replay(tmp_path))
+    assert os.path.getsize(segment) == size
+
+
+def test_lone_appender_does_not_wait_for_company(tmp_path):
+    catalog, _, cart = create_cart()
+    receipt = Teller(catalog).checks_out_articles_from(cart)
+
+    with ReceiptJournal(tmp_path, commit_latency=3) as journal:
+        done = threading.Event()
+        thread = threading.Thread(target=lambda: (journal.append_many([receipt] * 3), journal.append(receipt),
+                                                  done.set()))
+        thread.start()
+        thread.join(1.5)
+
+        assert done.is_set()
+        assert journal.commits == 2 and journal.records == 4
@@ -0,0 +1,39 @@
+import pytest
+
+from model_objects import Product, ProductUnit, SpecialOfferType
+from reprice import chunked, reprice_basket, reprice_batch
+from teller import Teller
+from tests.fake_catalog import FakeCatalog
+
+
+def create_teller():
+    catalog = FakeCatalog()
+    gum = Product("gum", ProductUnit.EACH)
+    apples = Product("apples", ProductUnit.KILO)
+    catalog.add_product(gum, 0.75)
+    catalog.add_product(apples, 1.99)
+
+    teller = Teller(catalog)
+    teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, gum, 0)
+    return teller
+
+
+def test_chunked_splits_lazily():
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    with pytest.raises(ValueError):
+        list(chunked([], 0))
+
+
+def test_reprice_batch_matches_single_process_in_order():
+    baskets = [(n, [("gum", n % 4 + 1), ("apples", 0.5 * n + 0.5)]) for n in range(50)]
+
+    results = list(reprice_batch(baskets, create_teller, max_workers=2, chunk_size=7))
+
+    teller = create_teller()
+    assert [result.basket_id for result in results] == list(range(50))
+    for result, basket in zip(results, baskets):
+        basket_id, total, discount_total, line_count = reprice_basket(teller, basket)
+        assert result.total == pytest.approx(total)
+        assert result.discount_total == pytest.approx(discount_total)
+        assert result.line_count == line_count == 2
+    assert results[2].discount_total == pytest.approx(-0.75)
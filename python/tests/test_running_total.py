@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+from model_objects import Product, ProductUnit, SpecialOfferType
+from money import CENTS
+from shopping_cart import ShoppingCart
+from teller import Teller
+from tests.fake_catalog import FakeCatalog
+
+
+class CountingCatalog(FakeCatalog):
+    def __init__(self):
+        super().__init__()
+        self.lookups = 0
+
+    def unit_price(self, product):
+        self.lookups += 1
+        return super().unit_price(product)
+
+
+def create_teller(money=None):
+    catalog = CountingCatalog()
+    gum = Product("gum", ProductUnit.EACH)
+    apples = Product("apples", ProductUnit.KILO)
+    toothbrush = Product("toothbrush", ProductUnit.EACH)
+    catalog.add_product(gum, 0.75)
+    catalog.add_product(apples, 1.99)
+    catalog.add_product(toothbrush, 0.99)
+
+    teller = Teller(catalog) if money is None else Teller(catalog, money)
+    teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, gum, 0)
+    teller.add_special_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, apples, 10.0)
+    return teller, catalog, gum, apples, toothbrush
+
+
+def test_running_total_matches_receipt_after_every_scan():
+    teller, catalog, gum, apples, toothbrush = create_teller()
+    cart = teller.new_cart()
+
+    for product, quantity in [(gum, 1), (apples, 0.5), (gum, 1), (toothbrush, 1),
+                              (gum, 1), (apples, 1.25), (gum, 2)]:
+        cart.add_item_quantity(product, quantity)
+        receipt = teller.checks_out_articles_from(cart)
+        assert cart.running_total == pytest.approx(receipt.total_price())
+
+    # Only the first scan of each product goes to the catalog
+    assert catalog.lookups == 3
+
+
+def test_running_total_follows_new_offers():
+    teller, _, gum, apples, toothbrush = create_teller()
+    cart = teller.new_cart()
+    cart.add_item_quantity(toothbrush, 2)
+
+    teller.add_special_offer(SpecialOfferType.TWO_FOR_AMOUNT, toothbrush, 1.5)
+
+    assert cart.running_total == pytest.approx(1.5)
+
+
+def test_running_total_is_exact_with_integer_money():
+    teller, catalog, gum, apples, toothbrush = create_teller(CENTS)
+    rng = random.Random(7)
+    cart = teller.new_cart()
+
+    for scan in range(300):
+        product = rng.choice([gum, apples, toothbrush])
+        cart.add_item_quantity(product, round(rng.uniform(0.1, 2.0), 3) if product is apples else rng.randint(1, 4))
+        if scan % 50 == 25:
+            teller.update_price(rng.choice([gum, apples, toothbrush]), round(rng.uniform(0.5, 3.0), 2))
+        if scan % 50 == 40:
+            teller.add_special_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, toothbrush, rng.randint(5, 30))
+
+        assert cart.running_total == teller.checks_out_articles_from(cart).total_price()
+
+
+def test_running_total_requires_teller():
+    cart = ShoppingCart()
+
+    with pytest.raises(ValueError):
+        cart.running_total
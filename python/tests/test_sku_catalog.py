@@ -0,0 +1,79 @@
+import pytest
+
+from model_objects import Product, ProductTable, ProductUnit, SpecialOfferType
+from shopping_cart import ShoppingCart
+from sku_catalog import SkuCatalog
+from teller import Teller
+
+
+def create_catalog():
+    catalog = SkuCatalog()
+    apples = Product("apples", ProductUnit.KILO, 4011)
+    gum = Product("gum", ProductUnit.EACH, 5000112548167)
+    catalog.add_product(apples, 1.99)
+    catalog.add_product(gum, 0.75)
+    return catalog, apples, gum
+
+
+def test_prices_are_looked_up_by_sku():
+    catalog, apples, gum = create_catalog()
+
+    assert catalog.unit_price(apples) == 1.99
+    assert catalog.unit_prices([gum, apples, gum]) == {gum: 0.75, apples: 1.99}
+    assert [catalog.ordinal(apples), catalog.ordinal(gum)] == [0, 1]
+    assert catalog.product_with_sku(4011) is apples
+    assert catalog.products["gum"] is gum
+
+
+def test_same_name_with_different_skus_are_different_products():
+    catalog, apples, _ = create_catalog()
+    organic_apples = Product("apples", ProductUnit.KILO, 94011)
+    catalog.add_product(organic_apples, 2.99)
+
+    assert catalog.unit_price(apples) == 1.99
+    assert catalog.unit_price(organic_apples) == 2.99
+    assert apples != organic_apples
+
+
+def test_repricing_a_sku_replaces_its_entry():
+    catalog, apples, _ = create_catalog()
+    catalog.add_product(apples, 2.49)
+
+    assert len(catalog) == 2
+    assert catalog.unit_price(apples) == 2.49
+
+
+def test_products_need_a_sku():
+    with pytest.raises(ValueError):
+        SkuCatalog().add_product(Product("apples", ProductUnit.KILO), 1.99)
+
+
+def test_teller_checks_out_with_sku_catalog():
+    catalog, _, gum = create_catalog()
+    teller = Teller(catalog)
+    teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, gum, 0)
+    cart = ShoppingCart()
+    cart.add_item_quantity(gum, 3)
+
+    assert teller.checks_out_articles_from(cart).total_price() == pytest.approx(1.50)
+
+
+def test_product_table_interns_by_sku():
+    table = ProductTable()
+    apples = table.intern("apples", ProductUnit.KILO, 4011)
+
+    assert table.intern("apples", ProductUnit.KILO, 4011) is apples
+    assert table.get_by_sku(4011) is apples
+    assert table.intern("apples", ProductUnit.KILO, 94011) is not apples
+    assert len(table) == 2
+    with pytest.raises(ValueError):
+        table.intern("pears", ProductUnit.KILO, 4011)
+
+
+def test_next_sku_follows_the_highest_sku():
+    catalog, apples, gum = create_catalog()
+
+    assert catalog.next_sku() == gum.sku + 1
+    catalog.add_product(Product("rice", ProductUnit.EACH, 7), 2.49)
+    assert catalog.next_sku() == gum.sku + 1
+    assert SkuCatalog().next_sku() == 1
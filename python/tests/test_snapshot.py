@@ -0,0 +1,106 @@
+import pickle
+
+import pytest
+
+from benchmarks import generate_cart, generate_teller
+from model_objects import Product, ProductUnit, SpecialOfferType
+from money import CENTS
+from receipt import Receipt
+from shopping_cart import ShoppingCart
+from teller import Teller
+from tests.fake_catalog import FakeCatalog
+
+
+def create_teller(money=None):
+    catalog = FakeCatalog()
+    toothbrush = Product("toothbrush", ProductUnit.EACH, 1001)
+    apples = Product("äpples", ProductUnit.KILO)
+    catalog.add_product(toothbrush, 0.99)
+    catalog.add_product(apples, 1.99)
+    teller = Teller(catalog) if money is None else Teller(catalog, money)
+    teller.add_special_offer(SpecialOfferType.THREE_FOR_TWO, toothbrush, 0)
+    teller.add_special_offer(SpecialOfferType.TEN_PERCENT_DISCOUNT, apples, 10.0)
+    return teller, toothbrush, apples
+
+
+def fill(cart, toothbrush, apples, lines=3):
+    for number in range(lines):
+        cart.add_item_quantity(toothbrush, 1 + number % 3)
+        cart.add_item_quantity(apples, 0.25 * (number + 1))
+    return cart
+
+
+def test_cart_round_trips_lines_in_order():
+    teller, toothbrush, apples = create_teller()
+    cart = fill(ShoppingCart(), toothbrush, apples)
+
+    restored = ShoppingCart.from_bytes(cart.to_bytes())
+
+    assert restored.items == cart.items
+    assert restored.product_quantities == cart.product_quantities
+    assert restored.items[0].product.sku == 1001
+
+
+def test_decoded_products_are_interned():
+    teller, toothbrush, apples = create_teller()
+    data = fill(ShoppingCart(), toothbrush, apples).to_bytes()
+
+    first, second = ShoppingCart.from_bytes(data), ShoppingCart.from_bytes(data)
+
+    assert [line.product for line in first.items] == [line.product for line in second.items]
+    assert all(a.product is b.product for a, b in zip(first.items, second.items))
+
+
+def test_restored_cart_can_be_bound_to_a_teller():
+    teller, toothbrush, apples = create_teller()
+    cart = fill(ShoppingCart(), toothbrush, apples)
+
+    restored = ShoppingCart.from_bytes(memoryview(cart.to_bytes()), teller)
+
+    assert restored.running_total == pytest.approx(teller.checks_out_articles_from(cart).total_price())
+
+
+@pytest.mark.parametrize("money", [None, CENTS])
+def test_receipt_round_trips_exactly(money):
+    teller, toothbrush, apples = create_teller(money)
+    receipt = teller.checks_out_articles_from(fill(ShoppingCart(), toothbrush, apples))
+
+    restored = Receipt.from_bytes(receipt.to_bytes())
+
+    assert restored.items == receipt.items
+    assert restored.discounts == receipt.discounts
+    assert restored.total_price() == receipt.total_price()
+    assert type(restored.total_price()) is type(receipt.total_price())
+
+
+def test_snapshot_is_smaller_than_pickle():
+    teller, toothbrush, apples = create_teller(CENTS)
+    cart = fill(ShoppingCart(), toothbrush, apples, lines=500)
+    receipt = teller.checks_out_articles_from(cart)
+
+    assert len(cart.to_bytes()) < len(pickle.dumps(cart.items)) / 2
+    assert len(receipt.to_bytes()) < len(pickle.dumps(receipt)) / 2
+
+
+def test_float_money_snapshot_is_three_quarters_of_pickle():
+    teller, products = generate_teller(250, "mixed")
+    receipt = teller.checks_out_articles_from(generate_cart(products, 1000))
+
+    assert len(receipt.to_bytes()) < len(pickle.dumps(receipt)) * 0.8
+
+
+def test_empty_receipt_round_trips():
+    assert Receipt.from_bytes(Receipt().to_bytes()).items == []
+
+
+def test_wrong_or_truncated_snapshot_is_rejected():
+    teller, toothbrush, apples = create_teller()
+    cart = fill(ShoppingCart(), toothbrush, apples)
+    data = cart.to_bytes()
+
+    with pytest.raises(ValueError):
+        Receipt.from_bytes(data)
+    with pytest.raises(ValueError):
+        ShoppingCart.from_bytes(data[:40])
+    with pytest.raises(ValueError):
+        ShoppingCart.from_bytes(b"")
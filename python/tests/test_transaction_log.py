@@ -0,0 +1,79 @@
+import io
+
+import pytest
+
+from model_objects import ProductTable, ProductUnit
+from shopping_cart import cart_from_lines
+from tests.fake_catalog import FakeCatalog
+from teller import Teller
+from transaction_log import (checkout_baskets, group_baskets, load_catalog, load_offers,
+                             read_transactions, reprice_log)
+
+CATALOG_CSV = """name,unit,price
+toothbrush,EACH,0.99
+apples,KILO,1.99
+gum,EACH,0.75
+"""
+
+OFFERS_CSV = """name,offer,argument
+gum,THREE_FOR_TWO,0
+toothbrush,TEN_PERCENT_DISCOUNT,10.0
+"""
+
+TRANSACTIONS_CSV = """basket,name,quantity
+b1,gum,2
+b1,gum,1
+b1,apples,0.5
+b2,toothbrush,1
+b3,gum,1
+b3,apples,2.0
+"""
+
+
+def create_teller():
+    catalog = load_catalog(io.StringIO(CATALOG_CSV), FakeCatalog())
+    return load_offers(io.StringIO(OFFERS_CSV), Teller(catalog))
+
+
+def test_loaded_products_are_interned():
+    table = ProductTable()
+    catalog = load_catalog(io.StringIO(CATALOG_CSV), FakeCatalog(), table)
+
+    assert len(table) == 3
+    assert catalog.products["gum"] is table.intern("gum", ProductUnit.EACH)
+
+
+def test_cart_is_built_from_named_lines():
+    products = create_teller().catalog.products
+
+    cart = cart_from_lines(products, [("gum", 2), ("apples", 0.5), ("gum", 1)])
+
+    assert list(cart.lines()) == [(products["gum"], 2), (products["apples"], 0.5), (products["gum"], 1)]
+    assert cart.product_quantities[products["gum"]] == 3
+    with pytest.raises(KeyError):
+        cart_from_lines(products, [("caviar", 1)])
+
+
+def test_rows_are_grouped_into_baskets_on_the_fly():
+    baskets = list(group_baskets(read_transactions(io.StringIO(TRANSACTIONS_CSV))))
+
+    assert [basket_id for basket_id, _ in baskets] == ["b1", "b2", "b3"]
+    assert baskets[0][1] == [("gum", 2.0), ("gum", 1.0), ("apples", 0.5)]
+
+
+def test_baskets_are_checked_out_as_they_stream():
+    teller = create_teller()
+    baskets = group_baskets(read_transactions(io.StringIO(TRANSACTIONS_CSV)))
+
+    receipts = dict(checkout_baskets(baskets, teller))
+
+    assert receipts["b1"].total_price() == pytest.approx(1.50 + 0.995)
+    assert receipts["b2"].total_price() == pytest.approx(0.891)
+
+
+def test_log_is_repriced_in_chunks():
+    chunks = list(reprice_log(io.StringIO(TRANSACTIONS_CSV), create_teller(), chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert chunks[1][0].basket_id == "b3"
+    assert chunks[1][0].total == pytest.approx(0.75 + 3.98)
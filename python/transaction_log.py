@@ -0,0 +1,81 @@
+"""
+Streaming CSV ingestion for catalogs, offers and transaction logs.
+
+Everything here is a generator working row by row, so a multi-GB transaction
+log is checked out with memory bounded by the largest basket (plus one chunk
+when chunking), however big the file is. The CSV layouts match the texttest
+fixture files: catalog (name, unit, price), offers (name, offer, argument)
+and transactions (basket, name, quantity).
+"""
+import csv
+from itertools import groupby
+from operator import itemgetter
+from typing import Hashable, Iterable, Iterator, List, Tuple
+
+from catalog import SupermarketCatalog
+from model_objects import PRODUCTS, ProductTable, ProductUnit, SpecialOfferType
+from receipt import Receipt
+from reprice import Basket, RepricedBasket, chunked, reprice_basket
+from shopping_cart import cart_from_lines
+from teller import Teller
+
+
+def load_catalog(lines: Iterable[str], catalog: SupermarketCatalog,
+                 table: ProductTable = PRODUCTS) -> SupermarketCatalog:
+    """
+    Adds every product of a catalog CSV (name, unit, price) to the catalog.
+    :param lines: An open file or any iterable of CSV lines, header included
+    :param table: Table the products are interned in, the process-wide one by default
+    """
+    for row in csv.DictReader(lines):
+        product = table.intern(row["name"], ProductUnit[row["unit"]])
+        catalog.add_product(product, float(row["price"]))
+    return catalog
+
+
+def load_offers(lines: Iterable[str], teller: Teller) -> Teller:
+    """
+    Registers every offer of an offers CSV (name, offer, argument) with the teller.
+    Products are resolved by name through the teller's catalog.products.
+    """
+    products = teller.catalog.products
+    for row in csv.DictReader(lines):
+        teller.add_special_offer(SpecialOfferType[row["offer"]], products[row["name"]],
+                                 float(row["argument"]))
+    return teller
+
+
+def read_transactions(lines: Iterable[str]) -> Iterator[Tuple[str, str, float]]:
+    """
+    Yields (basket id, product name, quantity) for every row of a transaction log CSV.
+    """
+    for row in csv.DictReader(lines):
+        yield row["basket"], row["name"], float(row["quantity"])
+
+
+def group_baskets(transactions: Iterable[Tuple[Hashable, str, float]]) -> Iterator[Basket]:
+    """
+    Groups consecutive transaction rows into baskets of (basket id, [(name, quantity), ...]).
+    The log must list each basket's rows together; only the current basket is held in memory.
+    """
+    for basket_id, rows in groupby(transactions, key=itemgetter(0)):
+        yield basket_id, [(name, quantity) for _, name, quantity in rows]
+
+
+def checkout_baskets(baskets: Iterable[Basket], teller: Teller) -> Iterator[Tuple[Hashable, Receipt]]:
+    """
+    Checks out each basket through the teller as it arrives, yielding (basket id, receipt).
+    """
+    products = teller.catalog.products
+    for basket_id, lines in baskets:
+        yield basket_id, teller.checks_out_articles_from(cart_from_lines(products, lines))
+
+
+def reprice_log(lines: Iterable[str], teller: Teller, chunk_size: int = 1000) -> Iterator[List[RepricedBasket]]:
+    """
+    Re-prices a whole transaction log, yielding the basket totals in chunks.
+    The log is only read as fast as the consumer takes chunks, so a slow sink applies back-pressure.
+    """
+    baskets = group_baskets(read_transactions(lines))
+    for chunk in chunked(baskets, chunk_size):
+        yield [RepricedBasket(*reprice_basket(teller, basket)) for basket in chunk]